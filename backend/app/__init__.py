@@ -1,28 +1,108 @@
+import os
+
+import click
 from flask import Flask
 from flask_cors import CORS
 from .config import Config
-from .extensions import db, migrate
+from .extensions import cache, db
+from .json_provider import FastJSONProvider
+
+
+def dispose_engines_after_fork(app):
+    """
+    gunicorn --preload builds the app once in the master and forks the
+    workers: a child must open its own connections instead of sharing the
+    sockets of the parent's pool.
+    """
+    with app.app_context():
+        engines = list(db.engines.values())
+
+    def dispose():
+        for engine in engines:
+            engine.dispose(close=False)
+
+    os.register_at_fork(after_in_child=dispose)
+
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    app.json = FastJSONProvider(app)
+
+    from .metrics import init_metrics, metrics_response
+    init_metrics(app)
 
-    CORS(app, resources={r"/api/*": {"origins": "*"}})
+    # the frontend reads X-Read-Primary after its writes (app/replicas.py)
+    CORS(app, resources={r"/api/*": {"origins": "*"}}, expose_headers=["X-Read-Primary"])
 
     db.init_app(app)
-    migrate.init_app(app, db)
+
+    from .replicas import init_replicas, picker
+    init_replicas(app, db)
+    dispose_engines_after_fork(app)
+    # Flask-Migrate imports alembic (~25% of the import time): only for `flask db ...`
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    cache.init_app(app)
+
+    from .auth import init_auth
+    init_auth(app)
+
+    from .versions import register_versioning
+    register_versioning(db.session)
+
+    from .changes import register_change_log
+    register_change_log(db.session)
+
+    from .stats import register_summary_tracking
+    register_summary_tracking(db.session)
+
+    from .events import events_response, init_events
+    init_events(app, db)
+
+    from .suggest import init_suggest, suggest_response
+    init_suggest(app)
 
     # Register blueprints
     from .blueprints.users import users_bp
     from .blueprints.books import books_bp
     from .blueprints.loans import loans_bp
+    from .blueprints.changes import changes_bp
 
     app.register_blueprint(users_bp, url_prefix="/api/users")
     app.register_blueprint(books_bp, url_prefix="/api/books")
     app.register_blueprint(loans_bp, url_prefix="/api/loans")
+    app.register_blueprint(changes_bp, url_prefix="/api/changes")
+
+    from .cli import register_cli
+    register_cli(app)
 
     @app.get("/api/health")
     def health():
-        return {"status": "ok"}
+        replicas = picker()
+        if replicas is None:
+            return {"status": "ok"}
+        return {"status": "ok", "replicas": replicas.status()}
+
+    @app.get("/api/metrics")
+    def metrics():
+        return metrics_response()
+
+    @app.get("/api/events")
+    def events():
+        return events_response()
+
+    @app.get("/api/suggest")
+    def suggest():
+        return suggest_response()
+
+    @app.get("/api/cache/stats")
+    def cache_stats():
+        return {
+            "backend": type(cache.backend).__name__,
+            "namespaces": cache.stats,
+            "suggest": app.extensions["suggest"].stats(),
+        }
 
     return app
@@ -0,0 +1,254 @@
+"""
+Signed bearer tokens, so clients log in once instead of re-posting their
+password (one scrypt/pbkdf2 hash, ~50-100 ms of CPU) on every call.
+
+  POST /api/users/login    -> access_token + refresh_token
+  POST /api/users/refresh  -> new pair for a refresh_token (the old one is revoked)
+  POST /api/users/logout   -> revokes the bearer access token (+ refresh_token)
+
+Tokens are itsdangerous payloads HMAC-signed (SHA-256) with SECRET_KEY:
+checking one in before_request is a JSON decode and an HMAC, no database
+access. Anyone who knows SECRET_KEY can mint a token for any user, so it has
+no default: without it the app does not start (gunicorn, `flask run`),
+except in debug mode (a random key per process). Other CLI commands
+(`flask db`, `flask stats`, ...) issue no token and need none.
+
+Each token has a jti; logout/refresh insert a `revoked_token` row, kept
+until the token would have expired anyway:
+  - refresh tokens: rotation only issues a new pair if its insert won the
+    primary key, so of two concurrent refreshes with the same token, on
+    any workers, one wins.
+  - access tokens (checked on every call): each worker keeps the set of
+    revoked jtis in memory and reloads it from the table at most every
+    AUTH_REVOKED_SYNC seconds, so a logout reaches the other workers within
+    that delay. With CACHE_REDIS_URL the revocation is also put in Redis
+    and seen by all workers at once.
+
+AUTH_REQUIRED=1 rejects unauthenticated /api calls (except PUBLIC_ENDPOINTS).
+GET /api/events (EventSource) may pass the token as ?access_token= instead.
+Without it, anonymous calls keep working, but a bad token is still a 401.
+"""
+import hashlib
+import logging
+import math
+import secrets
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+import click
+from flask import current_app, g, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app.cache import make_backend
+from app.extensions import db
+from app.models.revoked_token import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+ACCESS = "access"
+REFRESH = "refresh"
+
+PUBLIC_ENDPOINTS = {"health", "metrics", "users.login", "users.refresh", "static"}
+# EventSource cannot set headers: ?access_token= instead
+QUERY_TOKEN_ENDPOINTS = {"events"}
+# CLI commands that serve requests, and so check and issue tokens
+SERVING_COMMANDS = {"run"}
+
+
+class AuthError(Exception):
+    pass
+
+
+def _serializer(kind: str) -> URLSafeTimedSerializer:
+    key = current_app.config.get("SECRET_KEY")
+    if not key:
+        raise RuntimeError("SECRET_KEY is not set: tokens can be neither issued nor checked")
+    # distinct salts: a refresh token is never accepted as an access token
+    return URLSafeTimedSerializer(
+        key,
+        salt=f"lm-{kind}",
+        signer_kwargs={"digest_method": hashlib.sha256},
+    )
+
+
+def _ttl(kind: str) -> int:
+    return current_app.config["AUTH_ACCESS_TTL" if kind == ACCESS else "AUTH_REFRESH_TTL"]
+
+
+def issue(kind: str, user_id: int) -> str:
+    return _serializer(kind).dumps({"sub": user_id, "jti": uuid.uuid4().hex})
+
+
+def issue_pair(user_id: int) -> dict:
+    return {
+        "token_type": "Bearer",
+        "access_token": issue(ACCESS, user_id),
+        "refresh_token": issue(REFRESH, user_id),
+        "expires_in": _ttl(ACCESS),
+    }
+
+
+def verify(kind: str, token: str) -> dict:
+    """
+    Payload of a valid, unexpired token. Raises AuthError. Revoked access
+    tokens are rejected here, refresh tokens by revoke() (rotation).
+    """
+    try:
+        payload, issued_at = _serializer(kind).loads(token, max_age=_ttl(kind), return_timestamp=True)
+    except SignatureExpired:
+        raise AuthError("token expired")
+    except BadSignature:
+        raise AuthError("invalid token")
+    if kind == ACCESS and revocations().is_revoked(payload["jti"]):
+        raise AuthError("token revoked")
+    payload["kind"] = kind
+    payload["exp"] = issued_at.timestamp() + _ttl(kind)
+    return payload
+
+
+def revoke(payload: dict) -> bool:
+    """False if the token was already revoked (atomic: see claim())."""
+    if not claim(payload["kind"], payload["jti"], payload["exp"]):
+        return False
+    if payload["kind"] == ACCESS:
+        revocations().add(payload["jti"], payload["exp"])
+    return True
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def claim(kind: str, jti: str, expires_at: float) -> bool:
+    """
+    Inserts the revoked_token row of a token; False if it exists. Own
+    transaction on the primary, committed before a new pair is issued: a
+    concurrent insert of the same jti waits for it, then fails. Prunes the
+    expired rows of that kind on the way.
+    """
+    t = RevokedToken.__table__
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(delete(t).where(t.c.kind == kind, t.c.expires_at < _utcnow()))
+            conn.execute(insert(t).values(
+                jti=jti,
+                kind=kind,
+                expires_at=datetime.fromtimestamp(expires_at, timezone.utc).replace(tzinfo=None),
+            ))
+    except IntegrityError:
+        return False
+    return True
+
+
+# -----------------------
+# Revocation list
+# -----------------------
+
+class Revocations:
+    """
+    Revoked access-token jtis as seen by this worker: the unexpired
+    revoked_token rows, reloaded every `sync` seconds, plus Redis if any.
+    """
+
+    def __init__(self, backend=None, sync=5):
+        self.backend = backend
+        self.sync = sync
+        self._jtis = frozenset()
+        self._loaded_at = None  # monotonic time
+        self._lock = threading.Lock()
+
+    def add(self, jti: str, expires_at: float) -> None:
+        # the row is already committed (claim()): this worker sees it at once
+        with self._lock:
+            self._jtis = self._jtis | {jti}
+        ttl = expires_at - time.time()
+        if self.backend is not None and ttl > 0:
+            self.backend.set(f"revoked:{jti}", True, math.ceil(ttl))
+
+    def is_revoked(self, jti: str) -> bool:
+        if self.backend is not None:
+            hit, _ = self.backend.get(f"revoked:{jti}")
+            if hit:
+                return True
+        self._reload()
+        return jti in self._jtis
+
+    def _stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.sync
+
+    def _reload(self):
+        if not self._stale():
+            return
+        with self._lock:
+            if not self._stale():
+                return
+            t = RevokedToken.__table__
+            # primary, outside the request's session (and its replica)
+            with db.engine.connect() as conn:
+                self._jtis = frozenset(conn.execute(
+                    select(t.c.jti).where(t.c.kind == ACCESS, t.c.expires_at >= _utcnow())
+                ).scalars())
+            self._loaded_at = time.monotonic()
+
+
+def revocations() -> Revocations:
+    return current_app.extensions["auth_revocations"]
+
+
+# -----------------------
+# before_request
+# -----------------------
+
+def bearer_token():
+    header = request.headers.get("Authorization", "")
+    scheme, _, token = header.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        if request.endpoint in QUERY_TOKEN_ENDPOINTS:
+            return request.args.get("access_token") or None
+        return None
+    return token.strip()
+
+
+def load_token():
+    """g.auth = access token payload (or None). Returns a 401 response on failure."""
+    g.auth = None
+    if request.method == "OPTIONS" or not request.path.startswith("/api/"):
+        return None
+
+    token = bearer_token()
+    if token is None:
+        if current_app.config["AUTH_REQUIRED"] and request.endpoint not in PUBLIC_ENDPOINTS:
+            return {"error": "Authentication required"}, 401
+        return None
+
+    try:
+        g.auth = verify(ACCESS, token)
+    except AuthError as e:
+        if request.endpoint in PUBLIC_ENDPOINTS:
+            return None
+        return {"error": str(e)}, 401
+    return None
+
+
+def check_secret_key(app):
+    if app.config.get("SECRET_KEY"):
+        return
+    if app.debug:
+        app.config["SECRET_KEY"] = secrets.token_urlsafe(32)
+        logger.warning("SECRET_KEY is not set: random key for this debug run (tokens die with the process)")
+        return
+    # `flask db`, `flask stats`, ... load the app but serve no request
+    ctx = click.get_current_context(silent=True)
+    if ctx is None or ctx.info_name in SERVING_COMMANDS:
+        raise RuntimeError("SECRET_KEY is not set: tokens signed with a known key can be forged (see .env.example)")
+
+
+def init_auth(app):
+    check_secret_key(app)
+    backend = make_backend(app.config) if app.config.get("CACHE_REDIS_URL") else None
+    app.extensions["auth_revocations"] = Revocations(backend, sync=app.config["AUTH_REVOKED_SYNC"])
+    app.before_request(load_token)
@@ -1,10 +1,21 @@
+import io
+
 from flask import request
-from sqlalchemy import or_
+from sqlalchemy import func, select
 from sqlalchemy.exc import IntegrityError
-from app.extensions import db
+from app.extensions import cache, db
 from app.models.categorie import Categorie
-from app.models.auteur import Auteur
+from app.models.auteur import Auteur, Livre_Auteur
 from app.models.livre import Livre
+from app.queries import authors_by_book, book_options, book_rows, loan_counts, loan_history, nested
+from app.pagination import ListArgsError, jsonable_row, list_page, multi_get, parse_ids
+from app.search import search_books
+from app.catalog_import import FORMATS, import_catalog
+from app.export import FORMATS as EXPORT_FORMATS, export_response
+from app.cache import list_key
+from app.versions import etagged, versioned_key
+from app.stock import set_available, set_total
+from app.models.emprunt import Emprunt
 
 
 def ok(data, status=200):
@@ -30,18 +41,72 @@ def serialize_author(a: Auteur):
     return {"id_auteur": a.id_auteur, "nom_auteur": a.nom_auteur, "prenom_auteur": a.prenom_auteur}
 
 
+CATEGORY_COLUMNS = {
+    "id_cat": Categorie.id_cat,
+    "nom_cat": Categorie.nom_cat,
+    "champ": Categorie.champ,
+}
+
+AUTHOR_COLUMNS = {
+    "id_auteur": Auteur.id_auteur,
+    "nom_auteur": Auteur.nom_auteur,
+    "prenom_auteur": Auteur.prenom_auteur,
+}
+
+BOOK_COLUMNS = {
+    "id_livre": Livre.id_livre,
+    "isbn": Livre.isbn,
+    "titre": Livre.titre,
+    "quantite": Livre.quantite,
+    "quantite_totale": Livre.quantite_totale,
+    "nb_en_pret": Livre.nb_en_pret,
+    "cat_id": Livre.cat_id,
+}
+BOOK_NESTED = ("categorie", "auteurs")
+
+
 def serialize_book(b: Livre):
     return {
         "id_livre": b.id_livre,
         "isbn": b.isbn,
         "titre": b.titre,
         "quantite": b.quantite,
+        "quantite_totale": b.quantite_totale,
+        "nb_en_pret": b.nb_en_pret,
         "cat_id": b.cat_id,
         "categorie": serialize_category(b.categorie) if b.categorie else None,
         "auteurs": [serialize_author(a) for a in (b.auteurs or [])],
     }
 
 
+def serialize_book_rows(rows):
+    """serialize_book for a page of book_rows() rows (authors in one SELECT)"""
+    auteurs = authors_by_book([r["id_livre"] for r in rows])
+    return [
+        {
+            "id_livre": r["id_livre"],
+            "isbn": r["isbn"],
+            "titre": r["titre"],
+            "quantite": r["quantite"],
+            "quantite_totale": r["quantite_totale"],
+            "nb_en_pret": r["nb_en_pret"],
+            "cat_id": r["cat_id"],
+            "categorie": nested(r, "categorie"),
+            "auteurs": auteurs.get(r["id_livre"], []),
+        }
+        for r in map(jsonable_row, rows)
+    ]
+
+
+def category_exists(cat_id) -> bool:
+    # unknown ids are not cached: they would crowd out the real ones
+    return cache.get_or_set(
+        versioned_key(f"categories:exists:{cat_id}", "categorie"),
+        lambda: Categorie.query.get(cat_id) is not None,
+        keep=bool,
+    )
+
+
 # -----------------------
 # CATEGORIES
 # -----------------------
@@ -50,9 +115,15 @@ from . import books_bp
 
 
 @books_bp.get("/categories")
+@etagged('categorie')
 def list_categories():
-    cats = Categorie.query.order_by(Categorie.id_cat.desc()).all()
-    return ok([serialize_category(c) for c in cats])
+    try:
+        return ok(cache.get_or_set(
+            versioned_key(list_key("categories"), "categorie"),
+            lambda: list_page(Categorie.query, [Categorie.id_cat], CATEGORY_COLUMNS),
+        ))
+    except ListArgsError as e:
+        return err(str(e))
 
 
 @books_bp.post("/categories")
@@ -67,6 +138,7 @@ def create_category():
     c = Categorie(nom_cat=nom_cat, champ=champ)
     db.session.add(c)
     db.session.commit()
+    cache.invalidate("categories")
     return ok(serialize_category(c), 201)
 
 
@@ -83,6 +155,7 @@ def update_category(cat_id: int):
         c.champ = data["champ"]
 
     db.session.commit()
+    cache.invalidate("categories")
     return ok(serialize_category(c))
 
 
@@ -94,6 +167,7 @@ def delete_category(cat_id: int):
 
     db.session.delete(c)
     db.session.commit()
+    cache.invalidate("categories")
     return ok({"status": "deleted"})
 
 
@@ -102,9 +176,15 @@ def delete_category(cat_id: int):
 # -----------------------
 
 @books_bp.get("/authors")
+@etagged('auteur')
 def list_authors():
-    authors = Auteur.query.order_by(Auteur.id_auteur.desc()).all()
-    return ok([serialize_author(a) for a in authors])
+    try:
+        return ok(cache.get_or_set(
+            versioned_key(list_key("authors"), "auteur"),
+            lambda: list_page(Auteur.query, [Auteur.id_auteur], AUTHOR_COLUMNS),
+        ))
+    except ListArgsError as e:
+        return err(str(e))
 
 
 @books_bp.post("/authors")
@@ -119,6 +199,7 @@ def create_author():
     a = Auteur(nom_auteur=nom, prenom_auteur=prenom)
     db.session.add(a)
     db.session.commit()
+    cache.invalidate("authors")
     return ok(serialize_author(a), 201)
 
 
@@ -135,6 +216,7 @@ def update_author(author_id: int):
         a.prenom_auteur = data["prenom_auteur"]
 
     db.session.commit()
+    cache.invalidate("authors")
     return ok(serialize_author(a))
 
 
@@ -146,6 +228,7 @@ def delete_author(author_id: int):
 
     db.session.delete(a)
     db.session.commit()
+    cache.invalidate("authors")
     return ok({"status": "deleted"})
 
 
@@ -154,44 +237,142 @@ def delete_author(author_id: int):
 # -----------------------
 
 @books_bp.get("/books")
+@etagged('livre', 'categorie', 'auteur', 'livre_auteur')
 def list_books():
     """
     Optional query params:
       - catId=int
-      - q=str (search in titre, isbn, author name)
+      - q=str (search in titre, isbn, author name; ranked on PostgreSQL)
+      - available=true|false (a copy is on the shelf: livre.quantite > 0)
+      - limit/after/fields (see app/pagination.py)
+      - ids=1,2,3: these books only, in that order (other filters ignored),
+        as {items, missing}; see also POST /books/batch
     """
+    if "ids" in request.args:
+        return get_books(request.args["ids"])
+
     cat_id = request.args.get("catId", type=int)
     q = (request.args.get("q") or "").strip()
+    available = request.args.get("available")
 
     query = Livre.query
 
     if cat_id:
         query = query.filter(Livre.cat_id == cat_id)
 
+    if available is not None:
+        if available.lower() in ("1", "true", "yes"):
+            # partial index ix_livre_disponibles
+            query = query.filter(Livre.quantite > 0)
+        elif available.lower() in ("0", "false", "no"):
+            query = query.filter(func.coalesce(Livre.quantite, 0) <= 0)
+        else:
+            return err("available must be true or false")
+
+    keys = [Livre.id_livre]
     if q:
-        like = f"%{q}%"
-        # join authors so searching author works
-        query = query.outerjoin(Livre.auteurs).filter(
-            or_(
-                Livre.titre.ilike(like),
-                Livre.isbn.ilike(like),
-                Auteur.nom_auteur.ilike(like),
-                Auteur.prenom_auteur.ilike(like),
-            )
-        ).distinct()
+        # ranked full-text search on PostgreSQL, ILIKE elsewhere
+        query, keys = search_books(query, q)
+
+    try:
+        return ok(list_page(
+            query, keys, BOOK_COLUMNS,
+            nested=BOOK_NESTED, rows=book_rows, serialize_rows=serialize_book_rows,
+        ))
+    except ListArgsError as e:
+        return err(str(e))
+
+
+def get_books(ids):
+    try:
+        return ok(multi_get(
+            Livre.query, Livre.id_livre, parse_ids(ids), BOOK_COLUMNS,
+            nested=BOOK_NESTED, rows=book_rows, serialize_rows=serialize_book_rows,
+        ))
+    except ListArgsError as e:
+        return err(str(e))
+
 
-    books = query.order_by(Livre.id_livre.desc()).all()
-    return ok([serialize_book(b) for b in books])
+@books_bp.post("/books/batch")
+def batch_books():
+    """Body: {"ids": [1, 2, 3]} (id lists too long for ?ids=); ?fields= as usual."""
+    return get_books(get_json().get("ids"))
+
+
+@books_bp.get("/books/export")
+@etagged('livre', 'categorie', 'auteur', 'livre_auteur')
+def export_books():
+    """
+    Streaming catalogue dump.
+    Optional query params:
+      - format=ndjson|csv (default ndjson)
+      - catId=int
+    """
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return err(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    cat_id = request.args.get("catId", type=int)
+
+    # "Nom Prénom; Nom2 Prénom2", one correlated lookup per streamed row
+    full_name = Auteur.nom_auteur + " " + Auteur.prenom_auteur
+    agg = func.string_agg if db.engine.dialect.name == "postgresql" else func.group_concat
+    auteurs = (
+        select(agg(full_name, "; "))
+        .select_from(Livre_Auteur.join(Auteur, Auteur.id_auteur == Livre_Auteur.c.auteur_id))
+        .where(Livre_Auteur.c.livre_id == Livre.id_livre)
+        .scalar_subquery()
+    )
+
+    stmt = (
+        select(
+            Livre.id_livre,
+            Livre.isbn,
+            Livre.titre,
+            Livre.quantite,
+            Livre.quantite_totale,
+            Livre.nb_en_pret,
+            Livre.cat_id,
+            Categorie.nom_cat,
+            auteurs.label("auteurs"),
+        )
+        .outerjoin(Categorie, Categorie.id_cat == Livre.cat_id)
+        .order_by(Livre.id_livre.asc())
+    )
+    if cat_id:
+        stmt = stmt.where(Livre.cat_id == cat_id)
+
+    return export_response(stmt, fmt, "livres")
 
 
 @books_bp.get("/books/<int:book_id>")
+@etagged('livre', 'categorie', 'auteur', 'livre_auteur')
 def get_book(book_id: int):
-    b = Livre.query.get(book_id)
+    b = Livre.query.options(*book_options()).get(book_id)
     if not b:
         return err("Book not found", 404)
     return ok(serialize_book(b))
 
 
+@books_bp.get("/books/<int:book_id>/loans")
+@etagged('emprunt', 'livre', 'membre', daily=True)
+def list_book_loans(book_id: int):
+    """Loans of one book, most recent first (status / limit / after / fields)."""
+    if db.session.get(Livre, book_id) is None:
+        return err("Book not found", 404)
+    try:
+        return ok(loan_history(Emprunt.livre_id == book_id))
+    except ListArgsError as e:
+        return err(str(e))
+
+
+@books_bp.get("/books/<int:book_id>/loans/count")
+@etagged('emprunt', 'livre', daily=True)
+def count_book_loans(book_id: int):
+    if db.session.get(Livre, book_id) is None:
+        return err("Book not found", 404)
+    return ok(loan_counts(Emprunt.livre_id == book_id))
+
+
 @books_bp.post("/books")
 def create_book():
     """
@@ -199,7 +380,7 @@ def create_book():
     {
       "titre": "...",
       "isbn": "...",
-      "quantite": 3,
+      "quantite": 3,          // copies owned, all on the shelf
       "cat_id": 1,
       "auteur_ids": [1,2]
     }
@@ -218,8 +399,7 @@ def create_book():
     if not isinstance(quantite, int) or quantite < 0:
         return err("quantite must be a non-negative integer")
 
-    cat = Categorie.query.get(cat_id)
-    if not cat:
+    if not category_exists(cat_id):
         return err("cat_id does not exist")
 
     auteurs = []
@@ -250,7 +430,8 @@ def update_book(book_id: int):
     {
       "titre": "...",
       "isbn": "...",
-      "quantite": 5,
+      "quantite_totale": 5,   // copies owned (>= nb_en_pret)
+      "quantite": 5,          // or: copies on the shelf (loans keep theirs)
       "cat_id": 2,
       "auteur_ids": [3,4]
     }
@@ -269,15 +450,23 @@ def update_book(book_id: int):
     if "isbn" in data:
         b.isbn = data["isbn"]
 
-    if "quantite" in data:
+    # stock columns: one guarded UPDATE, so concurrent checkouts are kept
+    if "quantite_totale" in data:
+        total = data["quantite_totale"]
+        if not isinstance(total, int) or total < 0:
+            return err("quantite_totale must be a non-negative integer")
+        if not set_total(book_id, total):
+            db.session.rollback()
+            return err("quantite_totale is lower than the copies on loan",
+                       details={"nb_en_pret": b.nb_en_pret})
+    elif "quantite" in data:
         qte = data["quantite"]
         if not isinstance(qte, int) or qte < 0:
             return err("quantite must be a non-negative integer")
-        b.quantite = qte
+        set_available(book_id, qte)
 
     if "cat_id" in data:
-        new_cat = Categorie.query.get(data["cat_id"])
-        if not new_cat:
+        if not category_exists(data["cat_id"]):
             return err("cat_id does not exist")
         b.cat_id = data["cat_id"]
 
@@ -310,3 +499,32 @@ def delete_book(book_id: int):
     db.session.delete(b)
     db.session.commit()
     return ok({"status": "deleted"})
+
+
+@books_bp.post("/import")
+def import_books():
+    """
+    Streaming catalogue import, raw request body (not JSON-wrapped).
+    Query params:
+      - format=csv|ndjson (default: from Content-Type, else ndjson)
+    Columns/keys: see app/catalog_import.py
+    201 if books were created, 200 if none were (e.g. a re-import: every ISBN
+    already exists), 400 if no record could be read; the body is the report.
+    """
+    fmt = request.args.get("format")
+    if fmt is None:
+        fmt = "csv" if request.mimetype == "text/csv" else "ndjson"
+    if fmt not in FORMATS:
+        return err(f"format must be one of {', '.join(FORMATS)}")
+
+    stream = io.TextIOWrapper(request.stream, encoding="utf-8-sig", newline="")
+    report = import_catalog(stream, fmt)
+    cache.invalidate("categories")
+    cache.invalidate("authors")
+    if report["books_created"]:
+        status = 201
+    elif report["rows_read"] == report["rows_invalid"]:
+        status = 400
+    else:
+        status = 200
+    return ok(report, status)
@@ -0,0 +1,5 @@
+from flask import Blueprint
+
+changes_bp = Blueprint("changes", __name__)
+
+from . import routes  # noqa: E402,F401
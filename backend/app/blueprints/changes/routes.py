@@ -0,0 +1,75 @@
+from flask import request
+
+from app.changes import FEED_TABLES, changes_since, head, horizon
+from app.pagination import MAX_LIMIT
+from app.versions import etagged
+from . import changes_bp
+
+
+def ok(data, status=200):
+    return data, status
+
+
+def err(message, status=400, details=None):
+    payload = {"error": message}
+    if details is not None:
+        payload["details"] = details
+    return payload, status
+
+
+def serialize_change(c):
+    return {
+        "seq": c.seq,
+        "table": c.table_name,
+        "id": c.row_id,
+        "op": c.op,
+        "at": c.changed_at.isoformat(),
+    }
+
+
+# -------------------------
+# Change feed (see app/changes.py)
+# -------------------------
+@changes_bp.get("")
+@etagged('change_log', 'change_log_horizon')
+def list_changes():
+    """
+    Query params:
+      - since=int   next_since of the previous call. Without it: no items,
+                    only the current next_since (take it before the first
+                    full download, then poll from it)
+      - limit=int   1..MAX_LIMIT (default MAX_LIMIT)
+      - tables=livre,emprunt  only these tables
+    Response: { "items": [{seq, table, id, op, at}], "next_since": int, "has_more": bool }
+    op: insert | update | delete | reset (id null: reload the whole table)
+    410 when `since` is older than the compacted entries.
+    """
+    since = request.args.get("since")
+    if since is None:
+        return ok({"items": [], "next_since": head(), "has_more": False})
+    try:
+        since = int(since)
+    except ValueError:
+        return err("since must be a non-negative integer")
+    if since < 0:
+        return err("since must be a non-negative integer")
+
+    limit = request.args.get("limit", MAX_LIMIT, type=int)
+    if not 1 <= limit <= MAX_LIMIT:
+        return err(f"limit must be between 1 and {MAX_LIMIT}")
+
+    tables = [t.strip() for t in (request.args.get("tables") or "").split(",") if t.strip()]
+    unknown = [t for t in tables if t not in FEED_TABLES]
+    if unknown:
+        return err(f"Unknown tables: {', '.join(unknown)}")
+
+    purged = horizon()
+    if since < purged:
+        return err("Changes before this point were compacted: reload the lists", 410, {"horizon": purged})
+
+    rows, has_more = changes_since(since, limit, tables)
+    return ok({
+        "items": [serialize_change(c) for c in rows],
+        "next_since": rows[-1].seq if rows else since,
+        "has_more": has_more,
+    })
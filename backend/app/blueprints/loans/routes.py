@@ -1,11 +1,18 @@
 from datetime import datetime, date
 from flask import request
+from sqlalchemy import insert, select
 from sqlalchemy.exc import IntegrityError
 
 from app.extensions import db
 from app.models.emprunt import Emprunt
 from app.models.livre import Livre
 from app.models.membre import Membre
+from app.queries import EMPRUNT_COLUMNS, EMPRUNT_NESTED, emprunt_rows, serialize_emprunt_rows
+from app.pagination import ListArgsError, list_page, multi_get, parse_ids
+from app.stock import put_back, return_loans, take_copies, take_copy
+from app.export import FORMATS as EXPORT_FORMATS, export_response
+from app.versions import etagged
+from app import stats
 from . import loans_bp
 
 
@@ -39,6 +46,13 @@ def parse_date(value, field_name: str) -> date | None:
     return datetime.strptime(value, "%Y-%m-%d").date()
 
 
+def parse_id(value) -> int:
+    """int(value); JSON true/false are not ids. Raises ValueError if invalid."""
+    if isinstance(value, bool):
+        raise ValueError("boolean id")
+    return int(value)
+
+
 def serialize_emprunt(e: Emprunt):
     return {
         "id_emprunt": e.id_emprunt,
@@ -65,9 +79,159 @@ def serialize_emprunt(e: Emprunt):
 # GET /api/loans
 # -------------------------
 @loans_bp.get("/")
+@etagged('emprunt', 'livre', 'membre')
 def list_emprunts():
-    emprunts = Emprunt.query.order_by(Emprunt.id_emprunt.asc()).all()
-    return ok([serialize_emprunt(e) for e in emprunts])
+    """limit/after/fields (see app/pagination.py); ids=1,2,3 -> {items, missing}"""
+    if "ids" in request.args:
+        return get_emprunts(request.args["ids"])
+    try:
+        return ok(list_page(
+            Emprunt.query, [Emprunt.id_emprunt], EMPRUNT_COLUMNS,
+            nested=EMPRUNT_NESTED, rows=emprunt_rows, serialize_rows=serialize_emprunt_rows,
+            descending=False,
+        ))
+    except ListArgsError as e:
+        return err(str(e))
+
+
+def get_emprunts(ids):
+    try:
+        return ok(multi_get(
+            Emprunt.query, Emprunt.id_emprunt, parse_ids(ids), EMPRUNT_COLUMNS,
+            nested=EMPRUNT_NESTED, rows=emprunt_rows, serialize_rows=serialize_emprunt_rows,
+        ))
+    except ListArgsError as e:
+        return err(str(e))
+
+
+@loans_bp.post("/batch")
+def batch_emprunts():
+    """Body: {"ids": [1, 2, 3]} (id lists too long for ?ids=); ?fields= as usual."""
+    return get_emprunts(get_json().get("ids"))
+
+
+# -------------------------
+# GET /api/loans/export
+# Streaming dump (NDJSON / CSV)
+# -------------------------
+@loans_bp.get("/export")
+@etagged('emprunt', 'livre', 'membre')
+def export_emprunts():
+    """
+    Optional query params:
+      - format=ndjson|csv (default ndjson)
+      - from=YYYY-MM-DD, to=YYYY-MM-DD (inclusive, on date_emprunt)
+    """
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return err(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+
+    try:
+        d_from = parse_date(request.args.get("from"), "from")
+        d_to = parse_date(request.args.get("to"), "to")
+    except ValueError:
+        return err("from/to invalides (YYYY-MM-DD)")
+
+    stmt = (
+        select(
+            Emprunt.id_emprunt,
+            Emprunt.livre_id,
+            Emprunt.membre_id,
+            Emprunt.date_emprunt,
+            Emprunt.date_retour,
+            Livre.titre,
+            Livre.isbn,
+            Membre.nom_mbre,
+            Membre.prenom_mbre,
+            Membre.email_mbre,
+        )
+        .outerjoin(Livre, Livre.id_livre == Emprunt.livre_id)
+        .outerjoin(Membre, Membre.id_mbre == Emprunt.membre_id)
+        .order_by(Emprunt.id_emprunt.asc())
+    )
+    if d_from:
+        stmt = stmt.where(Emprunt.date_emprunt >= d_from)
+    if d_to:
+        stmt = stmt.where(Emprunt.date_emprunt <= d_to)
+
+    return export_response(stmt, fmt, "emprunts")
+
+
+# -------------------------
+# GET /api/loans/stats/*
+# Dashboards, aggregated in SQL
+# Common query params: from=YYYY-MM-DD, to=YYYY-MM-DD (on date_emprunt)
+# -------------------------
+def stats_args():
+    """(from, to, limit). Raises ValueError on bad dates."""
+    d_from = parse_date(request.args.get("from"), "from")
+    d_to = parse_date(request.args.get("to"), "to")
+    limit = min(max(request.args.get("limit", 10, type=int), 1), 100)
+    return d_from, d_to, limit
+
+
+@loans_bp.get("/stats/overdue")
+@etagged("emprunt", "livre", "membre", daily=True)
+def stats_overdue():
+    """
+    Open loans older than LOAN_PERIOD_DAYS, oldest first.
+    Same items and limit/after/fields params as GET /api/loans.
+    """
+    try:
+        d_from, d_to, _ = stats_args()
+    except ValueError:
+        return err("from/to invalides (YYYY-MM-DD)")
+
+    query = Emprunt.query.filter(
+        Emprunt.date_retour.is_(None),
+        Emprunt.date_emprunt < stats.overdue_cutoff(),
+    )
+    if d_from:
+        query = query.filter(Emprunt.date_emprunt >= d_from)
+    if d_to:
+        query = query.filter(Emprunt.date_emprunt <= d_to)
+
+    try:
+        return ok(list_page(
+            query, [Emprunt.id_emprunt], EMPRUNT_COLUMNS,
+            nested=EMPRUNT_NESTED, rows=emprunt_rows, serialize_rows=serialize_emprunt_rows,
+            descending=False,
+        ))
+    except ListArgsError as e:
+        return err(str(e))
+
+
+@loans_bp.get("/stats/top-books")
+@etagged("emprunt", "emprunt_stat", "livre")
+def stats_top_books():
+    """Most borrowed books (limit=10 by default, max 100)."""
+    try:
+        d_from, d_to, limit = stats_args()
+    except ValueError:
+        return err("from/to invalides (YYYY-MM-DD)")
+    return ok(stats.top_books(d_from, d_to, limit))
+
+
+@loans_bp.get("/stats/active-members")
+@etagged("emprunt", "membre")
+def stats_active_members():
+    """Members with the most loans (limit=10 by default, max 100)."""
+    try:
+        d_from, d_to, limit = stats_args()
+    except ValueError:
+        return err("from/to invalides (YYYY-MM-DD)")
+    return ok(stats.active_members(d_from, d_to, limit))
+
+
+@loans_bp.get("/stats/categories")
+@etagged("emprunt", "emprunt_stat", "livre", "categorie")
+def stats_categories():
+    """Loans per category, with each category's share of the total."""
+    try:
+        d_from, d_to, _ = stats_args()
+    except ValueError:
+        return err("from/to invalides (YYYY-MM-DD)")
+    return ok(stats.categories(d_from, d_to))
 
 
 # -------------------------
@@ -83,8 +247,8 @@ def create_emprunt():
         return err("Champs obligatoires manquants", details={"required": required})
 
     try:
-        livre_id = int(data["livre_id"])
-        membre_id = int(data["membre_id"])
+        livre_id = parse_id(data["livre_id"])
+        membre_id = parse_id(data["membre_id"])
         d_emprunt = parse_date(data["date_emprunt"], "date_emprunt")
         d_retour = parse_date(data.get("date_retour"), "date_retour")
 
@@ -92,23 +256,29 @@ def create_emprunt():
             return err("date_emprunt is required")
 
         # Validate FK existence
-        livre = Livre.query.get(livre_id)
-        if not livre:
-            return err("ID livre inexistant", 400)
-
         membre = Membre.query.get(membre_id)
         if not membre:
             return err("ID membre inexistant", 400)
 
-        # Business rule: must have stock
-        if (livre.quantite or 0) <= 0:
-            return err("Aucune quantité disponible pour ce livre", 400)
-
         # If the loan is created already returned (date_retour provided),
         # we won't decrement stock (optional policy).
         # Most libraries: a returned loan should not affect stock.
         decrement_stock = d_retour is None
 
+        # Business rule: must have stock.
+        # Checked and decremented by one conditional UPDATE (race-free).
+        if decrement_stock:
+            taken = take_copy(livre_id)
+        else:
+            livre = Livre.query.get(livre_id)
+            taken = livre is not None and (livre.quantite or 0) > 0
+
+        if not taken:
+            db.session.rollback()
+            if not Livre.query.get(livre_id):
+                return err("ID livre inexistant", 400)
+            return err("Aucune quantité disponible pour ce livre", 400)
+
         new_emprunt = Emprunt(
             livre_id=livre_id,
             membre_id=membre_id,
@@ -117,10 +287,6 @@ def create_emprunt():
         )
 
         db.session.add(new_emprunt)
-
-        if decrement_stock:
-            livre.quantite = (livre.quantite or 0) - 1
-
         db.session.commit()
         return ok(serialize_emprunt(new_emprunt), 201)
 
@@ -135,44 +301,257 @@ def create_emprunt():
         return err("Erreur serveur", 500, details=str(e))
 
 
+# -------------------------
+# POST /api/loans/bulk
+# Create many loans at once (class checkout)
+# -------------------------
+@loans_bp.post("/bulk")
+def create_emprunts():
+    """
+    JSON:
+    {
+      "loans": [
+        { "livre_id": 1, "membre_id": 2, "date_emprunt": "YYYY-MM-DD", "date_retour": null },
+        ...
+      ],
+      "atomic": false   // true: any error -> nothing is created
+    }
+    Returns { "created": [{index, id_emprunt}], "errors": [{index, error}] }
+    (Bulk returns: POST /api/loans/return)
+    """
+    data = get_json()
+    items = data.get("loans")
+    atomic = data.get("atomic", False)
+
+    if not isinstance(items, list) or not items:
+        return err("loans doit être une liste non vide")
+    if not isinstance(atomic, bool):
+        return err("atomic doit être un booléen (true/false)")
+
+    errors = []
+    parsed = []  # (index, livre_id, membre_id, d_emprunt, d_retour)
+    for i, item in enumerate(items):
+        if not isinstance(item, dict) or not all(k in item for k in ("livre_id", "membre_id", "date_emprunt")):
+            errors.append({"index": i, "error": "Champs obligatoires manquants"})
+            continue
+        try:
+            d_emprunt = parse_date(item["date_emprunt"], "date_emprunt")
+            if d_emprunt is None:
+                errors.append({"index": i, "error": "date_emprunt is required"})
+                continue
+            parsed.append((
+                i,
+                parse_id(item["livre_id"]),
+                parse_id(item["membre_id"]),
+                d_emprunt,
+                parse_date(item.get("date_retour"), "date_retour"),
+            ))
+        except (TypeError, ValueError):
+            errors.append({"index": i, "error": "Format invalide (ID entier, date YYYY-MM-DD)"})
+
+    try:
+        # one IN (...) per table; livre rows are locked until commit
+        livre_ids = {p[1] for p in parsed}
+        membre_ids = {p[2] for p in parsed}
+        stock = dict(
+            db.session.execute(
+                select(Livre.id_livre, Livre.quantite)
+                .where(Livre.id_livre.in_(livre_ids))
+                .with_for_update()
+            ).all()
+        ) if livre_ids else {}
+        membres = set(
+            db.session.execute(select(Membre.id_mbre).where(Membre.id_mbre.in_(membre_ids))).scalars()
+        ) if membre_ids else set()
+
+        counts = {}
+        rows = []
+        indexes = []
+        for i, livre_id, membre_id, d_emprunt, d_retour in parsed:
+            if livre_id not in stock:
+                errors.append({"index": i, "error": "ID livre inexistant"})
+                continue
+            if membre_id not in membres:
+                errors.append({"index": i, "error": "ID membre inexistant"})
+                continue
+            left = (stock[livre_id] or 0) - counts.get(livre_id, 0)
+            if left <= 0:
+                errors.append({"index": i, "error": "Aucune quantité disponible pour ce livre"})
+                continue
+            # same policy as create_emprunt: a returned loan does not take stock
+            if d_retour is None:
+                counts[livre_id] = counts.get(livre_id, 0) + 1
+            rows.append({
+                "livre_id": livre_id,
+                "membre_id": membre_id,
+                "date_emprunt": d_emprunt,
+                "date_retour": d_retour,
+            })
+            indexes.append(i)
+
+        errors.sort(key=lambda e: e["index"])
+        if errors and atomic:
+            db.session.rollback()
+            return err("Aucun emprunt créé (atomic)", details={"errors": errors})
+
+        if not rows:
+            db.session.rollback()
+            return err("Aucun emprunt créé", details={"errors": errors})
+
+        if not take_copies(counts):
+            db.session.rollback()
+            return err("Stock modifié pendant la requête, réessayez", 409)
+
+        new_ids = db.session.execute(
+            insert(Emprunt).returning(Emprunt.id_emprunt, sort_by_parameter_order=True),
+            rows,
+        ).scalars().all()
+        db.session.commit()
+
+    except IntegrityError as e:
+        db.session.rollback()
+        return err("Erreur d'intégrité (contrainte DB)", details=str(e.orig))
+    except Exception as e:
+        db.session.rollback()
+        return err("Erreur serveur", 500, details=str(e))
+
+    return ok({
+        "created": [{"index": i, "id_emprunt": new_id} for i, new_id in zip(indexes, new_ids)],
+        "errors": errors,
+    }, 201)
+
+
+# -------------------------
+# POST /api/loans/<id>/return
+# Close a loan + increment livre.quantite (idempotent)
+# -------------------------
+@loans_bp.post("/<int:emprunt_id>/return")
+def return_emprunt(emprunt_id: int):
+    """
+    JSON (optional): { "date_retour": "YYYY-MM-DD" }  (default: today)
+    Returning an already returned loan changes nothing.
+    """
+    e = Emprunt.query.get(emprunt_id)
+    if not e:
+        return err("Emprunt introuvable", 404)
+
+    data = get_json()
+
+    try:
+        d_retour = parse_date(data.get("date_retour"), "date_retour") or date.today()
+    except ValueError:
+        return err("date_retour invalide (YYYY-MM-DD)")
+
+    try:
+        return_loans([emprunt_id], d_retour)
+        db.session.commit()
+        return ok(serialize_emprunt(e))
+    except Exception as ex:
+        db.session.rollback()
+        return err("Erreur serveur", 500, details=str(ex))
+
+
+# -------------------------
+# POST /api/loans/return
+# Close many loans at once (returns bin)
+# -------------------------
+@loans_bp.post("/return")
+def return_emprunts():
+    """
+    JSON:
+    {
+      "ids": [1, 2, 3],
+      "date_retour": "YYYY-MM-DD"   // optional, default: today
+    }
+    Returns { "returned": [...], "already_returned": [...], "missing": [...] }
+    """
+    data = get_json()
+    ids = data.get("ids")
+
+    if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return err("ids doit être une liste d'ID entiers")
+
+    try:
+        d_retour = parse_date(data.get("date_retour"), "date_retour") or date.today()
+    except ValueError:
+        return err("date_retour invalide (YYYY-MM-DD)")
+
+    ids = list(dict.fromkeys(ids))
+
+    try:
+        existing = set(
+            db.session.execute(
+                select(Emprunt.id_emprunt).where(Emprunt.id_emprunt.in_(ids))
+            ).scalars()
+        )
+        returned = set(return_loans(existing, d_retour)) if existing else set()
+        db.session.commit()
+    except Exception as ex:
+        db.session.rollback()
+        return err("Erreur serveur", 500, details=str(ex))
+
+    return ok({
+        "returned": [i for i in ids if i in returned],
+        "already_returned": [i for i in ids if i in existing and i not in returned],
+        "missing": [i for i in ids if i not in existing],
+    })
+
+
 # -------------------------
 # PUT /api/loans/<id>
-# Update loan safely
-# (Does NOT modify stock automatically)
+# Update loan safely: the stock follows the loan
+#   - date_retour set on an open loan: returned (copy back on the shelf)
+#   - date_retour cleared on a returned loan: reopened (takes a copy)
+#   - livre_id changed on an open loan: copy back on the old book's
+#     shelf, one taken from the new book
 # -------------------------
 @loans_bp.put("/<int:emprunt_id>")
 def update_emprunt(emprunt_id: int):
-    e = Emprunt.query.get(emprunt_id)
+    # locked until commit: two PUTs cannot both return / reopen the loan
+    e = db.session.get(Emprunt, emprunt_id, with_for_update=True)
     if not e:
         return err("Emprunt introuvable", 404)
 
     data = get_json()
 
     try:
-        # If you change livre_id or membre_id, validate existence
+        livre_id = e.livre_id
         if "livre_id" in data:
-            new_livre_id = int(data["livre_id"])
-            livre = Livre.query.get(new_livre_id)
-            if not livre:
+            livre_id = parse_id(data["livre_id"])
+            if not Livre.query.get(livre_id):
                 return err("ID livre inexistant")
-            e.livre_id = new_livre_id
 
+        membre_id = e.membre_id
         if "membre_id" in data:
-            new_membre_id = int(data["membre_id"])
-            membre = Membre.query.get(new_membre_id)
-            if not membre:
+            membre_id = parse_id(data["membre_id"])
+            if not Membre.query.get(membre_id):
                 return err("ID membre inexistant")
-            e.membre_id = new_membre_id
 
+        d_emprunt = e.date_emprunt
         if "date_emprunt" in data:
             d_emprunt = parse_date(data["date_emprunt"], "date_emprunt")
             if d_emprunt is None:
                 return err("date_emprunt cannot be empty")
-            e.date_emprunt = d_emprunt
 
+        d_retour = e.date_retour
         if "date_retour" in data:
-            e.date_retour = parse_date(data["date_retour"], "date_retour")
-
+            d_retour = parse_date(data["date_retour"], "date_retour")
+
+        # stock first: the attributes below would be flushed by these statements
+        was_open = e.date_retour is None
+        if was_open and d_retour is not None:
+            return_loans([emprunt_id], d_retour)  # back on the shelf of the current book
+        elif was_open and livre_id != e.livre_id and e.livre_id is not None:
+            put_back({e.livre_id: 1})
+        if d_retour is None and (not was_open or livre_id != e.livre_id):
+            if not take_copy(livre_id):
+                db.session.rollback()
+                return err("Aucune quantité disponible pour ce livre", 400)
+
+        e.livre_id = livre_id
+        e.membre_id = membre_id
+        e.date_emprunt = d_emprunt
+        e.date_retour = d_retour
         db.session.commit()
         return ok(serialize_emprunt(e))
 
@@ -1,12 +1,18 @@
 from datetime import date
-from flask import request
+from flask import g, request
 from sqlalchemy.exc import IntegrityError
 from werkzeug.security import generate_password_hash, check_password_hash
 
-from app.extensions import db
+from app.extensions import cache, db
 from app.models.profil import Profil
 from app.models.membre import Membre
 from app.models.utilisateur import Utilisateur
+from app.queries import loan_counts, loan_history, nested, utilisateur_rows
+from app.pagination import ListArgsError, jsonable_row, list_page, multi_get, parse_ids
+from app.cache import list_key
+from app.versions import etagged, versioned_key
+from app.models.emprunt import Emprunt
+from app import auth
 from . import users_bp
 
 
@@ -25,6 +31,29 @@ def get_json():
     return request.get_json(silent=True) or {}
 
 
+PROFIL_COLUMNS = {
+    "id_profil": Profil.id_profil,
+    "nom_p": Profil.nom_p,
+    "description_p": Profil.description_p,
+}
+
+MEMBRE_COLUMNS = {
+    "id_mbre": Membre.id_mbre,
+    "nom_mbre": Membre.nom_mbre,
+    "prenom_mbre": Membre.prenom_mbre,
+    "email_mbre": Membre.email_mbre,
+    "date_adhesion": Membre.date_adhesion,
+}
+
+UTILISATEUR_COLUMNS = {
+    "id_user": Utilisateur.id_user,
+    "login": Utilisateur.login,
+    "profil_id": Utilisateur.profil_id,
+    "mbre_id": Utilisateur.mbre_id,
+}
+UTILISATEUR_NESTED = ("profil", "membre")
+
+
 def serialize_profil(p: Profil):
     return {
         "id_profil": p.id_profil,
@@ -54,14 +83,44 @@ def serialize_utilisateur(u: Utilisateur):
     }
 
 
+def serialize_utilisateur_rows(rows):
+    """serialize_utilisateur for a page of utilisateur_rows() rows"""
+    return [
+        {
+            "id_user": r["id_user"],
+            "login": r["login"],
+            "profil_id": r["profil_id"],
+            "mbre_id": r["mbre_id"],
+            "profil": nested(r, "profil"),
+            "membre": nested(r, "membre"),
+        }
+        for r in map(jsonable_row, rows)
+    ]
+
+
+def profil_exists(profil_id) -> bool:
+    # unknown ids are not cached: they would crowd out the real ones
+    return cache.get_or_set(
+        versioned_key(f"profils:exists:{profil_id}", "profil"),
+        lambda: Profil.query.get(profil_id) is not None,
+        keep=bool,
+    )
+
+
 # -----------------------
 # PROFILS (roles)
 # -----------------------
 
 @users_bp.get("/profils")
+@etagged('profil')
 def list_profils():
-    profils = Profil.query.order_by(Profil.id_profil.desc()).all()
-    return ok([serialize_profil(p) for p in profils])
+    try:
+        return ok(cache.get_or_set(
+            versioned_key(list_key("profils"), "profil"),
+            lambda: list_page(Profil.query, [Profil.id_profil], PROFIL_COLUMNS),
+        ))
+    except ListArgsError as e:
+        return err(str(e))
 
 
 @users_bp.post("/profils")
@@ -76,6 +135,7 @@ def create_profil():
     p = Profil(nom_p=nom_p, description_p=description_p)
     db.session.add(p)
     db.session.commit()
+    cache.invalidate("profils")
     return ok(serialize_profil(p), 201)
 
 
@@ -94,6 +154,7 @@ def update_profil(profil_id: int):
         p.description_p = data["description_p"]
 
     db.session.commit()
+    cache.invalidate("profils")
     return ok(serialize_profil(p))
 
 
@@ -105,6 +166,7 @@ def delete_profil(profil_id: int):
 
     db.session.delete(p)
     db.session.commit()
+    cache.invalidate("profils")
     return ok({"status": "deleted"})
 
 
@@ -113,12 +175,32 @@ def delete_profil(profil_id: int):
 # -----------------------
 
 @users_bp.get("/members")
+@etagged('membre')
 def list_members():
-    members = Membre.query.order_by(Membre.id_mbre.desc()).all()
-    return ok([serialize_membre(m) for m in members])
+    """limit/after/fields (see app/pagination.py); ids=1,2,3 -> {items, missing}"""
+    if "ids" in request.args:
+        return get_members(request.args["ids"])
+    try:
+        return ok(list_page(Membre.query, [Membre.id_mbre], MEMBRE_COLUMNS))
+    except ListArgsError as e:
+        return err(str(e))
+
+
+def get_members(ids):
+    try:
+        return ok(multi_get(Membre.query, Membre.id_mbre, parse_ids(ids), MEMBRE_COLUMNS))
+    except ListArgsError as e:
+        return err(str(e))
+
+
+@users_bp.post("/members/batch")
+def batch_members():
+    """Body: {"ids": [1, 2, 3]} (id lists too long for ?ids=); ?fields= as usual."""
+    return get_members(get_json().get("ids"))
 
 
 @users_bp.get("/members/<int:membre_id>")
+@etagged('membre')
 def get_member(membre_id: int):
     m = Membre.query.get(membre_id)
     if not m:
@@ -126,6 +208,26 @@ def get_member(membre_id: int):
     return ok(serialize_membre(m))
 
 
+@users_bp.get("/members/<int:membre_id>/loans")
+@etagged('emprunt', 'livre', 'membre', daily=True)
+def list_member_loans(membre_id: int):
+    """Loans of one member, most recent first (status / limit / after / fields)."""
+    if db.session.get(Membre, membre_id) is None:
+        return err("Member not found", 404)
+    try:
+        return ok(loan_history(Emprunt.membre_id == membre_id))
+    except ListArgsError as e:
+        return err(str(e))
+
+
+@users_bp.get("/members/<int:membre_id>/loans/count")
+@etagged('emprunt', 'membre', daily=True)
+def count_member_loans(membre_id: int):
+    if db.session.get(Membre, membre_id) is None:
+        return err("Member not found", 404)
+    return ok(loan_counts(Emprunt.membre_id == membre_id))
+
+
 @users_bp.post("/members")
 def create_member():
     data = get_json()
@@ -195,9 +297,15 @@ def delete_member(membre_id: int):
 # -----------------------
 
 @users_bp.get("/accounts")
+@etagged('utilisateur', 'profil', 'membre')
 def list_accounts():
-    accounts = Utilisateur.query.order_by(Utilisateur.id_user.desc()).all()
-    return ok([serialize_utilisateur(u) for u in accounts])
+    try:
+        return ok(list_page(
+            Utilisateur.query, [Utilisateur.id_user], UTILISATEUR_COLUMNS,
+            nested=UTILISATEUR_NESTED, rows=utilisateur_rows, serialize_rows=serialize_utilisateur_rows,
+        ))
+    except ListArgsError as e:
+        return err(str(e))
 
 
 @users_bp.post("/accounts")
@@ -222,8 +330,7 @@ def create_account():
     if profil_id is None:
         return err("profil_id is required")
 
-    profil = Profil.query.get(profil_id)
-    if not profil:
+    if not profil_exists(profil_id):
         return err("profil_id does not exist")
 
     if mbre_id is not None:
@@ -264,8 +371,7 @@ def update_account(user_id: int):
         u.password = generate_password_hash(data["password"])
 
     if "profil_id" in data:
-        profil = Profil.query.get(data["profil_id"])
-        if not profil:
+        if not profil_exists(data["profil_id"]):
             return err("profil_id does not exist")
         u.profil_id = data["profil_id"]
 
@@ -300,15 +406,16 @@ def delete_account(user_id: int):
 
 
 # -----------------------
-# AUTH (simple login)
+# AUTH (bearer tokens, see app/auth.py)
 # -----------------------
 
 @users_bp.post("/login")
 def login():
     """
     JSON: { "login": "...", "password": "..." }
-    Returns user info if OK.
-    (No JWT here to keep it simple; you can add later.)
+    Returns user info + tokens. Send the access token as
+    "Authorization: Bearer <access_token>"; when it expires, POST the
+    refresh token to /api/users/refresh instead of logging in again.
     """
     data = get_json()
     login = data.get("login")
@@ -324,4 +431,60 @@ def login():
     if not check_password_hash(u.password, password):
         return err("Invalid credentials", 401)
 
-    return ok({"message": "login_ok", "user": serialize_utilisateur(u)})
+    return ok({"message": "login_ok", "user": serialize_utilisateur(u), **auth.issue_pair(u.id_user)})
+
+
+@users_bp.post("/refresh")
+def refresh():
+    """
+    JSON: { "refresh_token": "..." }
+    Returns a new access/refresh pair; the old refresh token is revoked.
+    """
+    token = get_json().get("refresh_token")
+    if not token:
+        return err("refresh_token is required")
+
+    try:
+        payload = auth.verify(auth.REFRESH, token)
+    except auth.AuthError as e:
+        return err(str(e), 401)
+
+    # the account may have been deleted since login
+    if db.session.get(Utilisateur, payload["sub"]) is None:
+        return err("Account not found", 401)
+
+    # one rotation per refresh token, even for concurrent calls
+    if not auth.revoke(payload):
+        return err("token revoked", 401)
+    return ok(auth.issue_pair(payload["sub"]))
+
+
+@users_bp.post("/logout")
+def logout():
+    """
+    Header: Authorization: Bearer <access_token>
+    JSON (optional): { "refresh_token": "..." }
+    Both tokens are revoked.
+    """
+    if g.auth is None:
+        return err("Authentication required", 401)
+    auth.revoke(g.auth)
+
+    token = get_json().get("refresh_token")
+    if token:
+        try:
+            auth.revoke(auth.verify(auth.REFRESH, token))
+        except auth.AuthError:
+            pass
+    return ok({"status": "logged_out"})
+
+
+@users_bp.get("/me")
+def me():
+    """The account of the bearer token."""
+    if g.auth is None:
+        return err("Authentication required", 401)
+    rows = utilisateur_rows(Utilisateur.query.filter(Utilisateur.id_user == g.auth["sub"])).all()
+    if not rows:
+        return err("Account not found", 404)
+    return ok(serialize_utilisateur_rows([r._asdict() for r in rows])[0])
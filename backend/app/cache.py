@@ -0,0 +1,137 @@
+"""
+Read-through cache for near-static reference data (categories, authors,
+profils).
+
+Backends:
+  - in-process LRU with TTL (default). One per worker: invalidate() only
+    reaches the worker that calls it, see versioned_key() below.
+  - Redis, shared by all workers, when CACHE_REDIS_URL is set
+    (needs the `redis` package; "fakeredis://" uses `fakeredis` for local runs)
+
+Keys are "<namespace>:<rest>". Entries that other workers must not serve
+stale are keyed with app.versions.versioned_key() (table versions, bumped
+by every commit). Write handlers also call cache.invalidate(namespace)
+after their commit, which frees the local (or Redis) entries early.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import request
+
+
+class LRUCache:
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns (hit, value)."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return False, None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCache:
+    def __init__(self, client, key_prefix="lm:"):
+        self.client = client
+        self.key_prefix = key_prefix
+
+    def get(self, key):
+        raw = self.client.get(self.key_prefix + key)
+        if raw is None:
+            return False, None
+        return True, json.loads(raw)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.key_prefix + key, json.dumps(value), ex=int(ttl))
+
+    def delete(self, key):
+        self.client.delete(self.key_prefix + key)
+
+    def delete_prefix(self, prefix):
+        keys = list(self.client.scan_iter(match=self.key_prefix + prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+def make_backend(config):
+    url = config.get("CACHE_REDIS_URL")
+    if not url:
+        return LRUCache(config.get("CACHE_MAX_ENTRIES", 1024))
+    if url.startswith("fakeredis://"):
+        import fakeredis
+        return RedisCache(fakeredis.FakeStrictRedis())
+    import redis
+    return RedisCache(redis.Redis.from_url(url))
+
+
+class Cache:
+    def __init__(self):
+        self.backend = None
+        self.ttl = 300
+        self._stats_lock = threading.Lock()
+        self.stats = {}  # namespace -> {"hits": n, "misses": n}
+
+    def init_app(self, app):
+        self.backend = make_backend(app.config)
+        self.ttl = app.config.get("CACHE_TTL", 300)
+        app.extensions["cache"] = self
+
+    def _count(self, key, field):
+        namespace = key.split(":", 1)[0]
+        with self._stats_lock:
+            ns = self.stats.setdefault(namespace, {"hits": 0, "misses": 0})
+            ns[field] += 1
+
+    def get_or_set(self, key, compute, ttl=None, keep=None):
+        """keep(value) false: the value is returned but not stored."""
+        hit, value = self.backend.get(key)
+        if hit:
+            self._count(key, "hits")
+            return value
+        self._count(key, "misses")
+        value = compute()
+        if keep is None or keep(value):
+            self.backend.set(key, value, ttl or self.ttl)
+        return value
+
+    def invalidate(self, namespace):
+        self.backend.delete_prefix(namespace + ":")
+
+
+def list_key(namespace: str) -> str:
+    """
+    Cache key of a list endpoint: depends on limit/after/fields. Wrap it in
+    versioned_key(): the ETag of the response comes from the table versions,
+    the body must not be older than them.
+    """
+    return f"{namespace}:list:{request.query_string.decode()}"
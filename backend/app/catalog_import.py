@@ -0,0 +1,265 @@
+"""
+Streaming catalogue import (books + authors + categories).
+
+Used by POST /api/books/import and `flask catalog import FILE`.
+The input is read record by record and written in chunks, so memory use
+depends on the chunk size, not on the file size.
+
+Formats:
+  ndjson: one JSON object per line
+    {"titre": "...", "isbn": "...", "quantite": 3,
+     "nom_cat": "Roman", "champ": "Littérature",
+     "auteurs": [{"nom_auteur": "Hugo", "prenom_auteur": "Victor"}]}
+
+  csv: header row with titre,isbn,quantite,nom_cat,champ,auteurs
+    auteurs = "Nom, Prénom; Nom2, Prénom2"
+
+Categories are matched on nom_cat and authors on (nom_auteur, prenom_auteur);
+the missing ones are created once and reused for the rest of the file.
+"""
+import csv
+import json
+import time
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.extensions import db
+from app.models.auteur import Auteur, Livre_Auteur
+from app.models.categorie import Categorie
+from app.models.livre import Livre
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+FORMATS = ("csv", "ndjson")
+
+
+class ImportRecordError(ValueError):
+    pass
+
+
+def iter_records(stream, fmt: str):
+    """Yield (line_no, raw_record) from a text stream."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_no, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError:
+                yield line_no, None
+
+
+def text(value) -> str:
+    return "" if value is None else str(value).strip()
+
+
+def parse_authors(value):
+    """CSV "Nom, Prénom; Nom2, Prénom2" or a JSON list -> [(nom, prenom)]"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        names = []
+        for part in value.split(";"):
+            if not part.strip():
+                continue
+            nom, _, prenom = part.partition(",")
+            names.append({"nom_auteur": nom, "prenom_auteur": prenom})
+        value = names
+    if not isinstance(value, list):
+        raise ImportRecordError("auteurs must be a list")
+
+    authors = []
+    for a in value:
+        if not isinstance(a, dict):
+            raise ImportRecordError("auteurs must be a list of objects")
+        nom = text(a.get("nom_auteur"))
+        prenom = text(a.get("prenom_auteur"))
+        if not nom or not prenom:
+            raise ImportRecordError("nom_auteur and prenom_auteur are required")
+        authors.append((nom, prenom))
+    return authors
+
+
+def parse_record(raw):
+    if not isinstance(raw, dict):
+        raise ImportRecordError("invalid record")
+
+    titre = text(raw.get("titre"))
+    if not titre:
+        raise ImportRecordError("titre is required")
+
+    nom_cat = text(raw.get("nom_cat"))
+    if not nom_cat:
+        raise ImportRecordError("nom_cat is required")
+
+    quantite = raw.get("quantite")
+    if quantite in (None, ""):
+        quantite = 1
+    try:
+        quantite = int(quantite)
+    except (TypeError, ValueError):
+        raise ImportRecordError("quantite must be a non-negative integer")
+    if quantite < 0:
+        raise ImportRecordError("quantite must be a non-negative integer")
+
+    return {
+        "titre": titre,
+        "isbn": text(raw.get("isbn")) or None,
+        "quantite": quantite,
+        "nom_cat": nom_cat,
+        "champ": text(raw.get("champ")) or None,
+        "auteurs": parse_authors(raw.get("auteurs")),
+    }
+
+
+class CatalogImporter:
+    def __init__(self, chunk_size: int = CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.load_maps()
+        self.seen_isbns = set()
+        self.report = {
+            "rows_read": 0,
+            "books_created": 0,
+            "categories_created": 0,
+            "authors_created": 0,
+            "rows_invalid": 0,
+            "error_count": 0,
+            "errors": [],
+        }
+
+    def load_maps(self):
+        self.categories = dict(db.session.execute(select(Categorie.nom_cat, Categorie.id_cat)).all())
+        self.authors = {
+            (nom, prenom): id_auteur
+            for id_auteur, nom, prenom in db.session.execute(
+                select(Auteur.id_auteur, Auteur.nom_auteur, Auteur.prenom_auteur)
+            ).all()
+        }
+
+    def error(self, line_no, message):
+        self.report["error_count"] += 1
+        if len(self.report["errors"]) < MAX_REPORTED_ERRORS:
+            self.report["errors"].append({"line": line_no, "error": message})
+
+    def run(self, stream, fmt: str) -> dict:
+        started = time.perf_counter()
+        chunk = []
+
+        for line_no, raw in iter_records(stream, fmt):
+            self.report["rows_read"] += 1
+            try:
+                chunk.append((line_no, parse_record(raw)))
+            except ImportRecordError as e:
+                self.report["rows_invalid"] += 1
+                self.error(line_no, str(e))
+                continue
+            if len(chunk) >= self.chunk_size:
+                self.safe_flush(chunk)
+                chunk = []
+
+        if chunk:
+            self.safe_flush(chunk)
+
+        elapsed = time.perf_counter() - started
+        self.report["seconds"] = round(elapsed, 3)
+        self.report["rows_per_second"] = round(self.report["rows_read"] / elapsed, 1) if elapsed else None
+        return self.report
+
+    def safe_flush(self, chunk):
+        try:
+            self.flush(chunk)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            # ids created by the failed chunk are gone
+            self.load_maps()
+            for line_no, _ in chunk:
+                self.error(line_no, f"chunk rejected by the database: {e.__class__.__name__}")
+
+    def flush(self, chunk):
+        # ISBNs already in the DB or earlier in the file
+        isbns = {r["isbn"] for _, r in chunk if r["isbn"]}
+        existing = set(
+            db.session.execute(select(Livre.isbn).where(Livre.isbn.in_(isbns))).scalars()
+        ) if isbns else set()
+
+        records = []
+        chunk_isbns = set()  # kept in seen_isbns once the chunk is committed
+        for line_no, r in chunk:
+            isbn = r["isbn"]
+            if isbn and (isbn in existing or isbn in self.seen_isbns or isbn in chunk_isbns):
+                self.error(line_no, f"duplicate isbn {isbn}")
+                continue
+            if isbn:
+                chunk_isbns.add(isbn)
+            records.append(r)
+
+        if not records:
+            return
+
+        categories_created = self.create_categories(records)
+        authors_created = self.create_authors(records)
+
+        livre_ids = db.session.execute(
+            insert(Livre).returning(Livre.id_livre, sort_by_parameter_order=True),
+            [
+                {
+                    "titre": r["titre"],
+                    "isbn": r["isbn"],
+                    "quantite": r["quantite"],
+                    "quantite_totale": r["quantite"],
+                    "cat_id": self.categories[r["nom_cat"]],
+                }
+                for r in records
+            ],
+        ).scalars().all()
+
+        links = [
+            {"livre_id": livre_id, "auteur_id": self.authors[a]}
+            for livre_id, r in zip(livre_ids, records)
+            for a in dict.fromkeys(r["auteurs"])
+        ]
+        if links:
+            db.session.execute(insert(Livre_Auteur), links)
+
+        db.session.commit()
+        self.seen_isbns |= chunk_isbns
+        self.report["books_created"] += len(livre_ids)
+        self.report["categories_created"] += categories_created
+        self.report["authors_created"] += authors_created
+
+    def create_categories(self, records) -> int:
+        new = {}
+        for r in records:
+            if r["nom_cat"] not in self.categories:
+                new.setdefault(r["nom_cat"], r["champ"])
+        if not new:
+            return 0
+        ids = db.session.execute(
+            insert(Categorie).returning(Categorie.id_cat, sort_by_parameter_order=True),
+            [{"nom_cat": nom, "champ": champ} for nom, champ in new.items()],
+        ).scalars().all()
+        self.categories.update(zip(new, ids))
+        return len(ids)
+
+    def create_authors(self, records) -> int:
+        new = list(dict.fromkeys(a for r in records for a in r["auteurs"] if a not in self.authors))
+        if not new:
+            return 0
+        ids = db.session.execute(
+            insert(Auteur).returning(Auteur.id_auteur, sort_by_parameter_order=True),
+            [{"nom_auteur": nom, "prenom_auteur": prenom} for nom, prenom in new],
+        ).scalars().all()
+        self.authors.update(zip(new, ids))
+        return len(ids)
+
+
+def import_catalog(stream, fmt: str, chunk_size: int = CHUNK_SIZE) -> dict:
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    return CatalogImporter(chunk_size).run(stream, fmt)
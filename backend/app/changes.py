@@ -0,0 +1,285 @@
+"""
+Change feed for client-side sync (GET /api/changes?since=<seq>).
+
+Every committed transaction that inserted, updated or deleted rows of
+FEED_TABLES appends one `change_log` row per (table, row id) to the feed,
+in the same transaction. The rows are collected like the table versions of
+app/versions.py:
+  - the unit of work (session.new / dirty / deleted, after_flush)
+  - bulk DML run through the session (do_orm_execute): the ids come from a
+    `pk = x` / `pk IN (...)` WHERE term, the INSERT parameters or its
+    RETURNING of the primary key. Other bulk statements log one "reset"
+    entry (row_id NULL): clients reload that table.
+A transaction that changed more than MAX_ROWS rows of a table (imports,
+seeding) logs one "reset" for it instead of a row each.
+
+A client keeps the `next_since` of its last call and fetches the rows it
+was told about with the multi-get endpoints (?ids=...). Entries only name
+rows, so replaying a change twice is harmless.
+
+Entries are written without a seq (writers never wait on each other for
+the feed) and numbered after their commit, by sequence(): a short
+transaction of its own that gives every committed entry still without one
+a seq above the current head. Numberings run one at a time (an advisory
+lock on PostgreSQL, the single writer on SQLite), so an entry never gets a
+seq below one a reader may already have seen. The writer runs it right
+after its commit (and numbers what a writer that died in between left
+over); the stats refresh runs it before reading the head.
+
+`flask changes compact --days N` deletes the entries older than N days; a
+client whose `since` is older than that gets 410 and reloads everything.
+"""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, event, func, insert, inspect, select, text, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.expression import BinaryExpression, BindParameter, BooleanClauseList
+
+from app import versions
+from app.extensions import db
+from app.models.change_log import ChangeLog, ChangeLogHorizon
+
+FEED_TABLES = ("auteur", "categorie", "emprunt", "livre", "membre")
+INFO_KEY = "change_log"
+ROWS_KEY = "change_log_rows"  # {table: entries noted}
+# {(table, row_id): op} written by this commit, for later before_commit hooks (app/events.py)
+COMMITTED_KEY = "change_log_committed"
+SEQUENCE_KEY = "change_log_sequence"  # committed entries to number
+HORIZON = "change_log"
+LOCK_KEY = 0x6C6D6368  # pg_advisory_xact_lock key of sequence()
+# more rows than this of one table in one transaction: a single "reset"
+MAX_ROWS = 1000
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# -----------------------
+# Collecting changes (session events)
+# -----------------------
+
+def note(session, table, row_id, op):
+    pending = session.info.setdefault(INFO_KEY, {})
+    if (table, None) in pending:
+        return  # the table is reloaded anyway
+    if row_id is None:
+        for key in [key for key in pending if key[0] == table]:
+            del pending[key]
+        pending[(table, None)] = "reset"
+        return
+
+    key = (table, row_id)
+    # insert + update is still an insert for the readers
+    if op == "update" and key in pending:
+        return
+    if key not in pending:
+        rows = session.info.setdefault(ROWS_KEY, {})
+        rows[table] = rows.get(table, 0) + 1
+        if rows[table] > MAX_ROWS:
+            note(session, table, None, "reset")
+            return
+    pending[key] = op
+
+
+def note_many(session, table, row_ids, op):
+    if len(row_ids) > MAX_ROWS:
+        note(session, table, None, "reset")
+        return
+    for row_id in row_ids:
+        note(session, table, row_id, op)
+
+
+def _after_flush(session, flush_context):
+    for objs, op in ((session.new, "insert"), (session.dirty, "update"), (session.deleted, "delete")):
+        for obj in objs:
+            table = getattr(obj, "__tablename__", None)
+            if table not in FEED_TABLES:
+                continue
+            if op == "update" and not session.is_modified(obj):
+                continue
+            row_id = inspect(obj).mapper.primary_key_from_instance(obj)[0]
+            note(session, table, row_id, op)
+
+
+def _where_ids(where, pk, rows):
+    """
+    Ids named by a `pk = x` or `pk IN (...)` term of an AND-ed WHERE, else
+    None. `pk = bindparam("k")` takes "k" from the executemany rows.
+    """
+    if where is None:
+        return None
+    terms = where.clauses if isinstance(where, BooleanClauseList) and where.operator is operators.and_ else [where]
+    for term in terms:
+        if not (isinstance(term, BinaryExpression) and isinstance(term.right, BindParameter)):
+            continue
+        if not getattr(term.left, "shares_lineage", lambda c: False)(pk):
+            continue
+        if term.operator is operators.eq:
+            if term.right.value is None:
+                ids = [r.get(term.right.key) for r in rows]
+                return ids if ids and None not in ids else None
+            return [term.right.value]
+        if term.operator is operators.in_op:
+            return list(term.right.value)
+    return None
+
+
+def _do_orm_execute(orm_execute_state):
+    state = orm_execute_state
+    if not (state.is_insert or state.is_update or state.is_delete):
+        return None
+    table = getattr(state.statement, "table", None)
+    if table is None or table.name not in FEED_TABLES:
+        return None
+    session = state.session
+    pk = table.primary_key.columns[0]
+    params = state.parameters
+    rows = params if isinstance(params, list) else [params] if params else []
+
+    if state.is_insert:
+        ids = [r.get(pk.key) for r in rows]
+        if ids and None not in ids:
+            note_many(session, table.name, ids, "insert")
+            return None
+
+        returning = [d["name"] for d in state.statement.returning_column_descriptions]
+        if pk.key in returning and len(rows) <= MAX_ROWS:
+            # run it here to read the new ids; the caller gets a replay
+            frozen = state.invoke_statement().freeze()
+            i = returning.index(pk.key)
+            for row in frozen():
+                note(session, table.name, row[i], "insert")
+            return frozen()
+    else:
+        ids = _where_ids(state.statement.whereclause, pk, rows)
+        if ids is not None:
+            note_many(session, table.name, ids, "update" if state.is_update else "delete")
+            return None
+
+    note(session, table.name, None, "reset")
+    return None
+
+
+def _before_commit(session):
+    session.flush()
+    session.info.pop(ROWS_KEY, None)
+    pending = session.info.pop(INFO_KEY, None)
+    if not pending:
+        return
+    now = _utcnow()
+    session.execute(insert(ChangeLog), [
+        {"table_name": table, "row_id": row_id, "op": op, "changed_at": now}
+        for (table, row_id), op in pending.items()
+    ])
+    session.info[COMMITTED_KEY] = pending
+
+
+def _after_commit(session):
+    if session.info.pop(COMMITTED_KEY, None):
+        session.info[SEQUENCE_KEY] = True
+
+
+def _after_rollback(session):
+    for key in (INFO_KEY, ROWS_KEY, COMMITTED_KEY, SEQUENCE_KEY):
+        session.info.pop(key, None)
+
+
+def _after_transaction_end(session, transaction):
+    # the session has given its connection back: no second one held
+    if transaction.parent is None and session.info.pop(SEQUENCE_KEY, False):
+        sequence()
+
+
+def sequence() -> int:
+    """
+    Numbers the committed entries that have no seq yet, after the current
+    head, in their insertion order. Own transaction on the primary; also
+    bumps the version of change_log (ETags of GET /api/changes). Returns
+    how many entries it numbered.
+    """
+    t = ChangeLog.__table__
+    h = ChangeLogHorizon.__table__
+    with Session(db.engine) as session, session.begin():
+        if session.execute(select(t.c.id).where(t.c.seq.is_(None)).limit(1)).first() is None:
+            return 0
+        if session.get_bind().dialect.name == "postgresql":
+            session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOCK_KEY})
+        # one statement: the head and the first id come from the same snapshot
+        first = select(func.min(t.c.id)).where(t.c.seq.is_(None)).scalar_subquery()
+        base = func.coalesce(
+            select(func.max(t.c.seq)).scalar_subquery(),
+            select(h.c.purged_seq).where(h.c.nom == HORIZON).scalar_subquery(),
+            0,
+        )
+        numbered = session.execute(
+            update(t).where(t.c.seq.is_(None)).values(seq=base + 1 + t.c.id - first)
+        ).rowcount
+        if numbered:
+            versions.bump(session, [t.name])
+        return numbered
+
+
+def register_change_log(session):
+    """Call after register_versioning(): the feed rows then bump `change_log`'s version too."""
+    for name, fn, kwargs in (
+        ("after_flush", _after_flush, {}),
+        ("do_orm_execute", _do_orm_execute, {}),
+        # before versions._before_commit, which collects the tables written
+        ("before_commit", _before_commit, {"insert": True}),
+        ("after_commit", _after_commit, {}),
+        ("after_rollback", _after_rollback, {}),
+        ("after_transaction_end", _after_transaction_end, {}),
+    ):
+        if not event.contains(session, name, fn):
+            event.listen(session, name, fn, **kwargs)
+
+
+# -----------------------
+# Reading / compaction
+# -----------------------
+
+def horizon() -> int:
+    """Entries up to this seq were compacted away."""
+    state = db.session.get(ChangeLogHorizon, HORIZON)
+    return state.purged_seq if state else 0
+
+
+def head() -> int:
+    return db.session.execute(select(func.max(ChangeLog.seq))).scalar() or horizon()
+
+
+def changes_since(since: int, limit: int, tables=None, upto=None):
+    """
+    (entries after `since` (up to `upto`) in seq order, at most `limit`; more
+    entries follow?) Entries not numbered yet (sequence()) are left out.
+    """
+    stmt = select(ChangeLog).where(ChangeLog.seq > since).order_by(ChangeLog.seq).limit(limit + 1)
+    if tables:
+        stmt = stmt.where(ChangeLog.table_name.in_(tables))
+    if upto is not None:
+        stmt = stmt.where(ChangeLog.seq <= upto)
+    rows = db.session.execute(stmt).scalars().all()
+    return rows[:limit], len(rows) > limit
+
+
+def compact(days: int) -> dict:
+    """Delete the entries older than `days` days and move the horizon. Commits."""
+    cutoff = _utcnow() - timedelta(days=days)
+    state = db.session.get(ChangeLogHorizon, HORIZON, with_for_update=True)
+    if state is None:
+        state = ChangeLogHorizon(nom=HORIZON, purged_seq=0)
+        db.session.add(state)
+
+    upto = db.session.execute(
+        select(func.max(ChangeLog.seq)).where(ChangeLog.changed_at < cutoff)
+    ).scalar()
+    deleted = 0
+    if upto and upto > state.purged_seq:
+        deleted = db.session.execute(delete(ChangeLog).where(ChangeLog.seq <= upto)).rowcount
+        state.purged_seq = upto
+
+    state.date_maj = func.now()
+    db.session.commit()
+    return {"deleted": deleted, "horizon": state.purged_seq, "cutoff": cutoff.isoformat(timespec="seconds")}
@@ -0,0 +1,72 @@
+"""
+Flask CLI commands (registered in create_app).
+
+  flask catalog import FILE [--format csv|ndjson] [--chunk-size N]
+  flask stats refresh [--full]
+  flask stock reconcile [--fix]
+  flask changes compact [--days N]
+"""
+import json
+
+import click
+from flask.cli import AppGroup
+
+from app.catalog_import import CHUNK_SIZE, FORMATS, import_catalog
+from app.changes import compact
+from app.extensions import cache
+from app.stats import refresh_summary
+from app.stock import reconcile
+
+catalog_cli = AppGroup("catalog", help="Catalogue maintenance.")
+stats_cli = AppGroup("stats", help="Circulation statistics.")
+stock_cli = AppGroup("stock", help="Book availability counters.")
+changes_cli = AppGroup("changes", help="Change feed (GET /api/changes).")
+
+
+@catalog_cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(FORMATS), default=None,
+              help="Default: guessed from the file extension.")
+@click.option("--chunk-size", default=CHUNK_SIZE, show_default=True)
+def import_command(path, fmt, chunk_size):
+    """Import books/authors/categories from a CSV or NDJSON file."""
+    if fmt is None:
+        fmt = "csv" if path.lower().endswith(".csv") else "ndjson"
+
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        report = import_catalog(f, fmt, chunk_size)
+    cache.invalidate("categories")
+    cache.invalidate("authors")
+
+    click.echo(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+@stats_cli.command("refresh")
+@click.option("--full", is_flag=True, help="Rebuild the summary from scratch.")
+def refresh_command(full):
+    """Update the emprunt_stat summary table."""
+    click.echo(json.dumps(refresh_summary(full=full)))
+
+
+@stock_cli.command("reconcile")
+@click.option("--fix", is_flag=True, help="Rewrite the drifted counters.")
+def reconcile_command(fix):
+    """Compare livre counters with the open loans in emprunt."""
+    drift = reconcile(fix=fix)
+    click.echo(json.dumps({"drifted": len(drift), "fixed": fix, "books": drift}, indent=2))
+    if drift and not fix:
+        raise SystemExit(1)
+
+
+@changes_cli.command("compact")
+@click.option("--days", default=30, show_default=True, help="Keep the entries of the last N days.")
+def compact_command(days):
+    """Delete old change_log entries (clients behind them get 410 and reload)."""
+    click.echo(json.dumps(compact(days)))
+
+
+def register_cli(app):
+    app.cli.add_command(catalog_cli)
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(stock_cli)
+    app.cli.add_command(changes_cli)
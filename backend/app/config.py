@@ -1,9 +1,92 @@
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+
+def _load_dotenv():
+    """
+    Same lookup as python-dotenv's load_dotenv() (.env in this directory or a
+    parent), but python-dotenv is only imported when there is a file to read:
+    containers get their settings from the real environment.
+    """
+    path = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        candidate = os.path.join(path, ".env")
+        if os.path.isfile(candidate):
+            from dotenv import load_dotenv
+            load_dotenv(candidate)
+            return
+        parent = os.path.dirname(path)
+        if parent == path:
+            return
+        path = parent
+
+
+_load_dotenv()
+
+
+def engine_options(url):
+    """
+    Connection pool per worker process (see gunicorn.conf.py). SQLite keeps
+    SQLAlchemy's defaults: its pools take none of these options.
+    """
+    if not url or url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        # past the pool a request waits (pool_timeout) rather than open
+        # connections nobody budgeted for (gunicorn.conf.py)
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "0")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        # below the server/firewall idle timeouts
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        # drop connections killed by a database restart instead of failing a request
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1").lower() in ("1", "true", "yes"),
+    }
+
 
 class Config:
-    SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret")
+    # signs the bearer tokens (app/auth.py): required outside debug mode
+    SECRET_KEY = os.getenv("SECRET_KEY")
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+
+    # Read replicas (app/replicas.py), comma separated. Empty = primary only.
+    SQLALCHEMY_BINDS = {
+        f"replica_{i}": url.strip()
+        for i, url in enumerate(os.getenv("DATABASE_REPLICA_URLS", "").split(","), start=1)
+        if url.strip()
+    }
+    REPLICA_COOLDOWN = int(os.getenv("REPLICA_COOLDOWN", "30"))
+    REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "5"))
+
+    # Reference data cache (app/cache.py). Empty CACHE_REDIS_URL = in-process LRU.
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+    CACHE_TTL = int(os.getenv("CACHE_TTL", "300"))
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+
+    # Instrumentation (app/metrics.py). SLOW_QUERY_MS=0 turns the log off.
+    SLOW_QUERY_MS = int(os.getenv("SLOW_QUERY_MS", "200"))
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0").lower() in ("1", "true", "yes")
+
+    # Bearer tokens (app/auth.py)
+    AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "0").lower() in ("1", "true", "yes")
+    AUTH_ACCESS_TTL = int(os.getenv("AUTH_ACCESS_TTL", "900"))
+    AUTH_REFRESH_TTL = int(os.getenv("AUTH_REFRESH_TTL", str(7 * 24 * 3600)))
+    # a logout reaches the other workers within this delay (s)
+    AUTH_REVOKED_SYNC = int(os.getenv("AUTH_REVOKED_SYNC", "5"))
+
+    # Loans (app/stats.py)
+    LOAN_PERIOD_DAYS = int(os.getenv("LOAN_PERIOD_DAYS", "14"))
+    STATS_USE_SUMMARY = os.getenv("STATS_USE_SUMMARY", "0").lower() in ("1", "true", "yes")
+
+    # Live updates, GET /api/events (app/events.py). Limits are per worker.
+    EVENTS_PG_NOTIFY = os.getenv("EVENTS_PG_NOTIFY", "0").lower() in ("1", "true", "yes")
+    EVENTS_MAX_CLIENTS = int(os.getenv("EVENTS_MAX_CLIENTS", "50"))
+    EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "256"))
+    EVENTS_HEARTBEAT = int(os.getenv("EVENTS_HEARTBEAT", "15"))
+    EVENTS_MAX_BATCH = int(os.getenv("EVENTS_MAX_BATCH", "500"))
+
+    # Typeahead, GET /api/suggest (app/suggest.py): one index per worker
+    SUGGEST_REFRESH_SECONDS = float(os.getenv("SUGGEST_REFRESH_SECONDS", "1"))
+    SUGGEST_MAX_WORDS = int(os.getenv("SUGGEST_MAX_WORDS", "12"))
+    SUGGEST_MAX_WORD_LEN = int(os.getenv("SUGGEST_MAX_WORD_LEN", "20"))
@@ -0,0 +1,19 @@
+"""
+Small helpers for the few statements that differ between PostgreSQL
+(production) and SQLite (local runs).
+"""
+
+
+def upsert_insert(session):
+    """
+    The dialect's insert() construct supporting on_conflict_do_update,
+    or None when the dialect has none.
+    """
+    name = session.get_bind().dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
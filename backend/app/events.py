@@ -0,0 +1,337 @@
+"""
+Live stock and loan updates: GET /api/events (Server-Sent Events).
+
+Committed writes are turned into compact events, built from the entries of
+the change feed (app/changes.py):
+
+  event: stock  data: {"type": "stock", "id_livre": 2, "quantite": 1, "quantite_totale": 3, "nb_en_pret": 2}
+  event: loan   data: {"type": "loan", "op": "insert", "id_emprunt": 9, "livre_id": 2, "membre_id": 3,
+                       "date_emprunt": "2026-01-02", "date_retour": null}
+  event: reset  data: {"type": "reset", "table": "livre" | "emprunt" | null}
+
+"reset" means the stream lost events (bulk statement, more than
+EVENTS_MAX_BATCH rows in a commit, slow client, bridge reconnect): reload
+the lists, or catch up with GET /api/changes. Deleted rows come as
+{"type": ..., <id>: n, "deleted": true}.
+
+Delivery:
+  - in-process: an after_commit hook hands the events to the Broker of the
+    worker, which copies them to every subscriber's bounded queue
+  - EVENTS_PG_NOTIFY=1 (PostgreSQL): the events are sent with pg_notify in
+    the writing transaction instead; each worker LISTENs on one dedicated
+    connection (opened with its first subscriber) and feeds its Broker, so
+    every worker sees the writes of all of them
+
+Each stream sends a comment every EVENTS_HEARTBEAT seconds (keeps proxies
+from closing it, detects gone clients). A client whose queue
+(EVENTS_QUEUE_SIZE) is full gets its backlog dropped and one "reset".
+At most EVENTS_MAX_CLIENTS streams per worker (503 beyond): every stream
+holds a thread (gthread) or a greenlet (gevent), see gunicorn.conf.py.
+Without the bridge, a worker only builds events while it has streams.
+"""
+import json
+import logging
+import queue
+import select as io_select
+import threading
+import time
+
+from flask import Response, current_app, request
+from sqlalchemy import event, select, text
+
+from app.changes import COMMITTED_KEY
+from app.models.emprunt import Emprunt
+from app.models.livre import Livre
+from app.pagination import jsonable_row
+
+logger = logging.getLogger(__name__)
+
+EVENT_TYPES = ("stock", "loan", "reset")
+INFO_KEY = "events"
+CHANNEL = "lm_events"
+NOTIFY_MAX_BYTES = 7000  # pg_notify payloads are limited to 8000 bytes
+
+
+def frame(evt) -> str:
+    return f"event: {evt['type']}\ndata: {json.dumps(evt, separators=(',', ':'))}\n\n"
+
+
+class Subscriber:
+    def __init__(self, size):
+        self.queue = queue.Queue(size)
+        self.overflowed = False
+
+
+class Broker:
+    def __init__(self, queue_size=256, max_clients=50):
+        self.queue_size = queue_size
+        self.max_clients = max_clients
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self):
+        """A new Subscriber, or None when max_clients streams are open."""
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients:
+                return None
+            sub = Subscriber(self.queue_size)
+            self._subscribers.add(sub)
+            return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def publish(self, events):
+        if not events or not self._subscribers:
+            return
+        frames = [(evt["type"], frame(evt)) for evt in events]  # encoded once for all streams
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            if sub.overflowed:
+                continue
+            for item in frames:
+                try:
+                    sub.queue.put_nowait(item)
+                except queue.Full:
+                    sub.overflowed = True
+                    break
+
+
+class EventHub:
+    def __init__(self, broker, bridge, heartbeat, max_batch):
+        self.broker = broker
+        self.bridge = bridge
+        self.heartbeat = heartbeat
+        self.max_batch = max_batch
+
+
+# -----------------------
+# PostgreSQL LISTEN/NOTIFY bridge
+# -----------------------
+
+class PgBridge:
+    def __init__(self, engine, broker):
+        self.engine = engine
+        self.broker = broker
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def notify(self, session, events):
+        """pg_notify the events in the current transaction (delivered on commit)."""
+        chunk, size = [], 0
+        for evt in events:
+            raw = json.dumps(evt, separators=(",", ":"))
+            if chunk and size + len(raw) > NOTIFY_MAX_BYTES:
+                self._send(session, chunk)
+                chunk, size = [], 0
+            chunk.append(raw)
+            size += len(raw) + 1
+        if chunk:
+            self._send(session, chunk)
+
+    @staticmethod
+    def _send(session, chunk):
+        session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": CHANNEL, "payload": "[" + ",".join(chunk) + "]"},
+        )
+
+    def start(self):
+        """Start the listener thread of this worker (once)."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._listen, name="pg-events", daemon=True)
+                self._thread.start()
+
+    def _connect(self):
+        # not from the pool: held for the life of the worker
+        dialect = self.engine.dialect
+        cargs, cparams = dialect.create_connect_args(self.engine.url)
+        conn = dialect.loaded_dbapi.connect(*cargs, **cparams)
+        conn.autocommit = True
+        conn.cursor().execute(f"LISTEN {CHANNEL}")
+        return conn
+
+    def _listen(self):
+        connected_once = False
+        while True:
+            try:
+                conn = self._connect()
+            except Exception:
+                logger.exception("events: LISTEN connection failed, retrying")
+                time.sleep(5)
+                continue
+            if connected_once:
+                # notifications sent while disconnected are lost
+                self.broker.publish([{"type": "reset", "table": None}])
+            connected_once = True
+            try:
+                while True:
+                    if io_select.select([conn], [], [], 30) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self.broker.publish(json.loads(conn.notifies.pop(0).payload))
+            except Exception:
+                logger.exception("events: LISTEN connection lost, reconnecting")
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+                time.sleep(1)
+
+
+# -----------------------
+# Commit hooks
+# -----------------------
+
+def build_events(session, committed, max_batch) -> list[dict]:
+    """Stock / loan events for the {(table, row_id): op} of a commit (one SELECT per table)."""
+    events = []
+    for table, model, pk, kind, columns in (
+        ("livre", Livre, "id_livre", "stock",
+         (Livre.id_livre, Livre.quantite, Livre.quantite_totale, Livre.nb_en_pret)),
+        ("emprunt", Emprunt, "id_emprunt", "loan",
+         (Emprunt.id_emprunt, Emprunt.livre_id, Emprunt.membre_id, Emprunt.date_emprunt, Emprunt.date_retour)),
+    ):
+        ops = {row_id: op for (t, row_id), op in committed.items() if t == table}
+        if not ops:
+            continue
+        if None in ops or len(ops) > max_batch:
+            events.append({"type": "reset", "table": table})
+            continue
+
+        live = [row_id for row_id, op in ops.items() if op != "delete"]
+        rows = {}
+        if live:
+            key = getattr(model, pk)
+            for r in session.execute(select(*columns).where(key.in_(live))):
+                rows[r[0]] = jsonable_row(r._mapping)
+
+        for row_id, op in ops.items():
+            if row_id in rows:
+                evt = {"type": kind, **rows[row_id]}
+            else:
+                evt = {"type": kind, pk: row_id, "deleted": True}
+            if kind == "loan":
+                evt["op"] = op
+            events.append(evt)
+    return events
+
+
+def _hub():
+    try:
+        return current_app.extensions.get("events")
+    except RuntimeError:  # no app context
+        return None
+
+
+def _before_commit(session):
+    committed = session.info.get(COMMITTED_KEY)
+    if not committed:
+        return
+    hub = _hub()
+    if hub is None or not (hub.bridge or len(hub.broker)):
+        return
+    events = build_events(session, committed, hub.max_batch)
+    if not events:
+        return
+    if hub.bridge:
+        hub.bridge.notify(session, events)
+    else:
+        session.info[INFO_KEY] = events
+
+
+def _after_commit(session):
+    events = session.info.pop(INFO_KEY, None)
+    hub = _hub()
+    if events and hub is not None:
+        hub.broker.publish(events)
+
+
+def _after_rollback(session):
+    session.info.pop(INFO_KEY, None)
+
+
+# -----------------------
+# GET /api/events
+# -----------------------
+
+def _stream(hub, sub, types):
+    heartbeat = hub.heartbeat
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            if sub.overflowed:
+                while True:
+                    try:
+                        sub.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                sub.overflowed = False
+                yield frame({"type": "reset", "table": None})
+            try:
+                kind, data = sub.queue.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ": ping\n\n"
+                continue
+            if kind in types:
+                yield data
+    finally:
+        hub.broker.unsubscribe(sub)
+
+
+def events_response():
+    """
+    Optional query params:
+      - types=stock,loan   (reset is always sent)
+      - access_token=...   for EventSource, which cannot set headers
+    """
+    hub = current_app.extensions["events"]
+    types = {t.strip() for t in (request.args.get("types") or "").split(",") if t.strip()}
+    unknown = types - set(EVENT_TYPES)
+    if unknown:
+        return {"error": f"Unknown types: {', '.join(sorted(unknown))}"}, 400
+    types = (types or set(EVENT_TYPES)) | {"reset"}
+
+    sub = hub.broker.subscribe()
+    if sub is None:
+        return {"error": "Too many event streams, retry later"}, 503
+    if hub.bridge:
+        hub.bridge.start()
+
+    # no request context in the generator: the session is released (teardown)
+    # when the response starts, not when the stream ends
+    return Response(
+        _stream(hub, sub, types),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def init_events(app, db):
+    """Call after register_change_log(): the events are built from its entries."""
+    broker = Broker(app.config["EVENTS_QUEUE_SIZE"], app.config["EVENTS_MAX_CLIENTS"])
+    bridge = None
+    if app.config["EVENTS_PG_NOTIFY"]:
+        with app.app_context():
+            engine = db.engine
+        if engine.dialect.name != "postgresql":
+            raise RuntimeError("EVENTS_PG_NOTIFY needs a PostgreSQL DATABASE_URL")
+        bridge = PgBridge(engine, broker)
+    app.extensions["events"] = EventHub(
+        broker, bridge, app.config["EVENTS_HEARTBEAT"], app.config["EVENTS_MAX_BATCH"],
+    )
+
+    for name, fn in (
+        ("before_commit", _before_commit),
+        ("after_commit", _after_commit),
+        ("after_rollback", _after_rollback),
+    ):
+        if not event.contains(db.session, name, fn):
+            event.listen(db.session, name, fn)
@@ -0,0 +1,57 @@
+"""
+Streaming exports (NDJSON / CSV) for audits and BI dumps.
+
+Rows are read through a server-side cursor (yield_per) and written to the
+response batch by batch, so worker memory stays flat whatever the table size.
+"""
+import csv
+import io
+import json
+from datetime import date
+
+from flask import Response, stream_with_context
+
+from app.extensions import db
+
+BATCH_SIZE = 1000
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def iter_export(stmt, fmt: str, batch_size: int = BATCH_SIZE):
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+    columns = list(result.keys())
+
+    if fmt == "csv":
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(columns)
+        for batch in result.partitions():
+            writer.writerows(batch)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+        yield buf.getvalue()
+    else:
+        for batch in result.partitions():
+            yield "".join(
+                json.dumps(dict(zip(columns, row)), default=_json_default, ensure_ascii=False) + "\n"
+                for row in batch
+            )
+
+
+def export_response(stmt, fmt: str, filename: str):
+    """`stmt` must be a Core select of plain columns (no ORM entities)."""
+    return Response(
+        stream_with_context(iter_export(stmt, fmt)),
+        mimetype=FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
@@ -0,0 +1,227 @@
+"""
+Request instrumentation: wall time, SQL statement count and SQL time per
+request (SQLAlchemy before/after_cursor_execute on every engine).
+
+Exposed as:
+  - a Server-Timing header on every response
+      Server-Timing: app;dur=12.4, db;dur=3.1;desc="4 queries"
+  - GET /api/metrics, Prometheus text format: per-endpoint histograms of
+    request duration, SQL statements and SQL time + a request counter.
+    Each gunicorn worker keeps its own numbers (a scrape sees one worker).
+  - the "app.metrics" logger: statements slower than SLOW_QUERY_MS
+  - ?profile=1 (only with PROFILING_ENABLED=1): the response is replaced by
+    a cProfile report of that request (?profile=pyinstrument: HTML report,
+    needs `pip install pyinstrument`)
+"""
+import bisect
+import cProfile
+import io
+import logging
+import pstats
+import threading
+import time
+
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for labels, series in items:
+            cumulative = 0
+            for bound, n in zip((*self.buckets, "+Inf"), series[:-1]):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{_labels(labels, le=bound)} {cumulative}')
+            lines.append(f"{self.name}_sum{_labels(labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=()):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines += [f"{self.name}{_labels(labels)} {v}" for labels, v in items]
+        return lines
+
+
+def _labels(pairs, **extra):
+    pairs = (*pairs, *extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Metrics:
+    def __init__(self):
+        self.duration = Histogram(
+            "lm_http_request_duration_seconds", "Request wall time.", DURATION_BUCKETS)
+        self.sql_queries = Histogram(
+            "lm_http_request_sql_queries", "SQL statements per request.", QUERY_BUCKETS)
+        self.sql_time = Histogram(
+            "lm_http_request_sql_seconds", "SQL time per request.", DURATION_BUCKETS)
+        self.requests = Counter("lm_http_requests_total", "Requests served.")
+        self.slow_queries = Counter("lm_sql_slow_queries_total", "Statements slower than SLOW_QUERY_MS.")
+
+    def render(self) -> str:
+        lines = []
+        for metric in (self.requests, self.duration, self.sql_queries, self.sql_time, self.slow_queries):
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+# -----------------------
+# SQL events (every engine: primary + replicas)
+# -----------------------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._lm_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_lm_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+
+    if has_request_context():
+        g.sql_count = g.get("sql_count", 0) + 1
+        g.sql_time = g.get("sql_time", 0.0) + elapsed
+
+    threshold = _slow_query_seconds()
+    if threshold is not None and elapsed >= threshold:
+        where = f"{request.method} {request.path}" if has_request_context() else "-"
+        logger.warning("slow query (%.1f ms) [%s]: %s", elapsed * 1000, where, " ".join(statement.split())[:1000])
+        metrics = _metrics()
+        if metrics is not None:
+            metrics.slow_queries.inc()
+
+
+def _slow_query_seconds():
+    try:
+        ms = current_app.config.get("SLOW_QUERY_MS")
+    except RuntimeError:  # no app context
+        return None
+    return ms / 1000 if ms else None
+
+
+def _metrics():
+    try:
+        return current_app.extensions.get("metrics")
+    except RuntimeError:
+        return None
+
+
+event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# -----------------------
+# Request hooks
+# -----------------------
+
+def _start_request():
+    g.request_start = time.perf_counter()
+    g.sql_count = 0
+    g.sql_time = 0.0
+
+    mode = request.args.get("profile")
+    if mode and current_app.config["PROFILING_ENABLED"]:
+        if mode == "pyinstrument":
+            from pyinstrument import Profiler
+            g.profiler = Profiler()
+            g.profiler.start()
+        else:
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+
+def _end_request(response):
+    start = g.get("request_start")
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    sql_count = g.get("sql_count", 0)
+    sql_time = g.get("sql_time", 0.0)
+
+    endpoint = request.endpoint or "unmatched"
+    metrics = current_app.extensions["metrics"]
+    metrics.requests.inc((("endpoint", endpoint), ("method", request.method), ("status", response.status_code)))
+    labels = (("endpoint", endpoint),)
+    metrics.duration.observe(labels, elapsed)
+    metrics.sql_queries.observe(labels, sql_count)
+    metrics.sql_time.observe(labels, sql_time)
+
+    response.headers["Server-Timing"] = (
+        f"app;dur={elapsed * 1000:.1f}, db;dur={sql_time * 1000:.1f};desc=\"{sql_count} queries\""
+    )
+
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        return _profile_response(profiler, elapsed, sql_count, sql_time)
+    return response
+
+
+def _profile_response(profiler, elapsed, sql_count, sql_time):
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        out = io.StringIO()
+        out.write(
+            f"{request.method} {request.full_path}\n"
+            f"wall {elapsed * 1000:.1f} ms, SQL {sql_count} statements / {sql_time * 1000:.1f} ms\n\n"
+        )
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(60)
+        return Response(out.getvalue(), mimetype="text/plain")
+    profiler.stop()
+    return Response(profiler.output_html(), mimetype="text/html")
+
+
+def metrics_response():
+    return Response(
+        current_app.extensions["metrics"].render(),
+        mimetype="text/plain; version=0.0.4",
+    )
+
+
+def init_metrics(app):
+    """Register first: its after_request then runs last and times the others."""
+    app.extensions["metrics"] = Metrics()
+    app.before_request(_start_request)
+    app.after_request(_end_request)
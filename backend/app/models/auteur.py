@@ -4,6 +4,8 @@ Livre_Auteur = db.Table(
     "livre_auteur",
     db.Column("livre_id", db.Integer, db.ForeignKey("livre.id_livre"), primary_key=True),
     db.Column("auteur_id", db.Integer, db.ForeignKey("auteur.id_auteur"), primary_key=True),
+    # books of an author (search, app/search.py): the primary key starts with livre_id
+    db.Index("ix_livre_auteur_auteur_id", "auteur_id"),
 )
 
 class Auteur(db.Model):
@@ -0,0 +1,26 @@
+from app.extensions import db
+
+class ChangeLog(db.Model):
+    """Append-only feed of row changes, written by app/changes.py (GET /api/changes)."""
+    __tablename__ = "change_log"
+
+    id = db.Column("id", db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    # feed order, set after the writer's commit (app/changes.py:sequence()); NULL until then
+    seq = db.Column("seq", db.BigInteger, unique=True, index=True)
+    table_name = db.Column("table_name", db.String(64), nullable=False)
+    # NULL with op "reset": a bulk statement touched rows that could not be named
+    row_id = db.Column("row_id", db.Integer)
+    op = db.Column("op", db.String(8), nullable=False)  # insert | update | delete | reset
+    changed_at = db.Column("changed_at", db.DateTime, nullable=False)  # UTC
+
+    # never reuse the id of compacted rows
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class ChangeLogHorizon(db.Model):
+    """Compaction watermark: entries with seq <= purged_seq were deleted."""
+    __tablename__ = "change_log_horizon"
+
+    nom = db.Column("nom", db.String(64), primary_key=True)
+    purged_seq = db.Column("purged_seq", db.BigInteger, nullable=False, default=0)
+    date_maj = db.Column("date_maj", db.DateTime)
@@ -8,8 +8,21 @@ class Emprunt(db.Model):
     livre_id = db.Column("livre_id", db.Integer, db.ForeignKey("livre.id_livre"))
     membre_id = db.Column("membre_id", db.Integer, db.ForeignKey("membre.id_mbre"))
 
-    date_emprunt = db.Column("date_emprunt", db.Date)
+    date_emprunt = db.Column("date_emprunt", db.Date, index=True)
     date_retour = db.Column("date_retour", db.Date)
 
+    __table_args__ = (
+        # loan history of a member / a book, newest first (keyset pagination);
+        # also serve the plain livre_id / membre_id lookups
+        db.Index("ix_emprunt_membre_date", membre_id, date_emprunt, id_emprunt),
+        db.Index("ix_emprunt_livre_date", livre_id, date_emprunt, id_emprunt),
+        # open loans only (date_retour IS NULL): stock / availability lookups
+        db.Index(
+            "ix_emprunt_ouverts", livre_id,
+            postgresql_where=date_retour.is_(None),
+            sqlite_where=date_retour.is_(None),
+        ),
+    )
+
     livre = db.relationship("Livre")
     membre = db.relationship("Membre")
@@ -0,0 +1,32 @@
+from app.extensions import db
+
+class EmpruntStat(db.Model):
+    """Loans per day and book, maintained by app/stats.py:refresh_summary()."""
+    __tablename__ = "emprunt_stat"
+
+    jour = db.Column("jour", db.Date, primary_key=True)
+    livre_id = db.Column("livre_id", db.Integer, db.ForeignKey("livre.id_livre"), primary_key=True)
+    nb_emprunts = db.Column("nb_emprunts", db.Integer, nullable=False, default=0)
+
+
+class StatRefresh(db.Model):
+    """Refresh watermark: last change_log seq already counted."""
+    __tablename__ = "stat_refresh"
+
+    nom = db.Column("nom", db.String(64), primary_key=True)
+    # NULL: not built from the change feed yet, the next refresh is a full one
+    dernier_seq = db.Column("dernier_seq", db.BigInteger)
+    date_maj = db.Column("date_maj", db.DateTime)
+
+
+class EmpruntStatDirty(db.Model):
+    """
+    A (jour, livre_id) whose count changed other than by a new loan (loan
+    edited or deleted): recomputed by the next refresh. NULL/NULL: a key
+    that could not be read, the next refresh is a full one.
+    """
+    __tablename__ = "emprunt_stat_dirty"
+
+    id = db.Column("id", db.Integer, primary_key=True)
+    jour = db.Column("jour", db.Date)
+    livre_id = db.Column("livre_id", db.Integer)
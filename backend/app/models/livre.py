@@ -1,15 +1,35 @@
 from app.extensions import db
 from .auteur import Livre_Auteur
 
+
+def _initial_stock(context):
+    # a new book starts with all its copies on the shelf
+    return context.get_current_parameters().get("quantite") or 0
+
+
 class Livre(db.Model):
     __tablename__ = "livre"
 
     id_livre = db.Column("id_livre", db.Integer, primary_key=True)
-    isbn = db.Column("isbn", db.String(20))
+    isbn = db.Column("isbn", db.String(20), index=True)
     titre = db.Column("titre", db.String(255))
+    # availability: quantite (on the shelf) = quantite_totale - nb_en_pret
+    # kept in step by app/stock.py; `flask stock reconcile` repairs drift
     quantite = db.Column("quantite", db.Integer)
+    quantite_totale = db.Column("quantite_totale", db.Integer, nullable=False, default=_initial_stock, server_default="0")
+    nb_en_pret = db.Column("nb_en_pret", db.Integer, nullable=False, default=0, server_default="0")
+    # PostgreSQL also has a generated `search_vector` column (see app/search.py)
 
-    cat_id = db.Column("cat_id", db.Integer, db.ForeignKey("categorie.id_cat"))
+    cat_id = db.Column("cat_id", db.Integer, db.ForeignKey("categorie.id_cat"), index=True)
     categorie = db.relationship("Categorie")
 
     auteurs = db.relationship("Auteur", secondary=Livre_Auteur, backref="livres")
+
+    __table_args__ = (
+        # ?available=true on GET /api/books/books
+        db.Index(
+            "ix_livre_disponibles", id_livre,
+            postgresql_where=quantite > 0,
+            sqlite_where=quantite > 0,
+        ),
+    )
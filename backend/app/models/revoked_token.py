@@ -0,0 +1,13 @@
+from app.extensions import db
+
+class RevokedToken(db.Model):
+    """Tokens logged out (access, refresh) or rotated (refresh), written by app/auth.py."""
+    __tablename__ = "revoked_token"
+
+    jti = db.Column("jti", db.String(32), primary_key=True)
+    kind = db.Column("kind", db.String(8), nullable=False)  # access | refresh
+    # the token's own expiry (UTC): the row is useless after it
+    expires_at = db.Column("expires_at", db.DateTime, nullable=False)
+
+    # the workers' reload (access, unexpired) and the pruning (expired)
+    __table_args__ = (db.Index("ix_revoked_token_kind_expires", "kind", "expires_at"),)
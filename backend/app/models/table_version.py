@@ -0,0 +1,8 @@
+from app.extensions import db
+
+class TableVersion(db.Model):
+    __tablename__ = "table_version"
+
+    # bumped once per committed transaction that wrote to the table
+    table_name = db.Column("table_name", db.String(64), primary_key=True)
+    version = db.Column("version", db.BigInteger, nullable=False, default=0)
@@ -4,7 +4,7 @@ class Utilisateur(db.Model):
     __tablename__ = "utilisateur"
 
     id_user = db.Column("id_user", db.Integer, primary_key=True)
-    login = db.Column("login", db.String(100))
+    login = db.Column("login", db.String(100), unique=True, index=True)
     password = db.Column("password", db.String(100))
 
     profil_id = db.Column("profil_id", db.Integer, db.ForeignKey("profil.id_profil"))
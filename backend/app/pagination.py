@@ -0,0 +1,196 @@
+"""
+Keyset (cursor) pagination + field projection for the list endpoints.
+
+Optional query params understood by every list endpoint:
+  - limit=int   page size (1..MAX_LIMIT). When given, the response becomes
+                { "items": [...], "next_cursor": "..." | null }
+  - after=str   the next_cursor of the previous page
+  - fields=a,b  only return these fields. When they are all plain columns the
+                SELECT is narrowed to them (no ORM entities are loaded).
+
+Without limit/after the endpoints keep returning a plain JSON list.
+
+Multi-get (?ids=1,2,3 or a POST .../batch body {"ids": [...]}) fetches up to
+MAX_IDS records in one IN (...) query, see multi_get().
+"""
+from datetime import date
+
+from flask import request
+from sqlalchemy import tuple_
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+MAX_IDS = 500
+
+
+class ListArgsError(ValueError):
+    pass
+
+
+class ListArgs:
+    def __init__(self, limit=None, after=None, fields=None):
+        self.limit = limit
+        self.after = after
+        self.fields = fields
+
+
+def parse_list_args(allowed_fields) -> ListArgs:
+    limit = request.args.get("limit")
+    after = request.args.get("after") or None
+    fields = request.args.get("fields")
+
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ListArgsError("limit must be an integer")
+        if limit < 1 or limit > MAX_LIMIT:
+            raise ListArgsError(f"limit must be between 1 and {MAX_LIMIT}")
+    elif after is not None:
+        limit = DEFAULT_LIMIT
+
+    if fields:
+        fields = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in fields if f not in allowed_fields]
+        if unknown:
+            raise ListArgsError(f"Unknown fields: {', '.join(unknown)}")
+    else:
+        fields = None
+
+    return ListArgs(limit=limit, after=after, fields=fields)
+
+
+def encode_cursor(values) -> str:
+    return ",".join(v.isoformat() if isinstance(v, date) else str(v) for v in values)
+
+
+def decode_cursor(cursor: str, keys) -> list:
+    parts = cursor.split(",")
+    if len(parts) != len(keys):
+        raise ListArgsError("Invalid cursor")
+    values = []
+    try:
+        for raw, key in zip(parts, keys):
+            py_type = key.type.python_type
+            values.append(date.fromisoformat(raw) if py_type is date else py_type(raw))
+    except (ValueError, NotImplementedError):
+        raise ListArgsError("Invalid cursor")
+    return values
+
+
+def paginate(query, keys, args: ListArgs, descending=True):
+    """
+    Order `query` by `keys` (most significant first), skip everything up to
+    args.after and fetch at most args.limit rows.
+
+    Rows with a NULL in a nullable key column are left out, on every page:
+    the keyset comparison cannot place them after a cursor.
+
+    Returns (rows, next_cursor); rows are dicts of the selected (labelled)
+    columns.
+    """
+    keys = list(keys)
+    n = len(keys)
+
+    nullable = [k for k in keys if getattr(k.expression, "nullable", False)]
+    if nullable:
+        query = query.filter(*[k.is_not(None) for k in nullable])
+
+    if args.after is not None:
+        values = decode_cursor(args.after, keys)
+        lhs = keys[0] if n == 1 else tuple_(*keys)
+        rhs = values[0] if n == 1 else tuple_(*values)
+        query = query.filter(lhs < rhs if descending else lhs > rhs)
+
+    query = query.order_by(*[k.desc() if descending else k.asc() for k in keys])
+    query = query.add_columns(*[k.label(f"_key{i}") for i, k in enumerate(keys)])
+    if args.limit is not None:
+        query = query.limit(args.limit + 1)
+
+    rows = query.all()
+
+    next_cursor = None
+    if args.limit is not None and len(rows) > args.limit:
+        rows = rows[: args.limit]
+        next_cursor = encode_cursor(rows[-1][-n:])
+
+    return [dict(zip(r._fields[:-n], r[:-n])) for r in rows], next_cursor
+
+
+def jsonable_row(row: dict) -> dict:
+    return {k: v.isoformat() if isinstance(v, date) else v for k, v in row.items()}
+
+
+def list_page(query, keys, columns, nested=(), rows=None, serialize_rows=None, descending=True):
+    """
+    Run a list endpoint query with pagination + projection.
+    No ORM entities are loaded: the JSON is built from plain rows.
+
+    columns:        {field_name: column} plain fields, projectable in SQL
+    nested:         field names only produced by `serialize_rows` (relations)
+    rows:           query -> query selecting what `serialize_rows` needs
+    serialize_rows: [row dict] -> [item dict], called once per page
+    """
+    args = parse_list_args(set(columns) | set(nested))
+    fields = args.fields
+
+    if nested and (not fields or any(f in nested for f in fields)):
+        data, next_cursor = paginate(rows(query), keys, args, descending)
+        items = serialize_rows(data)
+        if fields:
+            items = [{f: it[f] for f in fields} for it in items]
+    else:
+        fields = fields or list(columns)
+        projected = query.with_entities(*[columns[f].label(f) for f in fields])
+        data, next_cursor = paginate(projected, keys, args, descending)
+        items = [jsonable_row(r) for r in data]
+
+    if args.limit is None:
+        return items
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def parse_ids(value) -> list[int]:
+    """"1,2,3" (query string) or [1, 2, 3] (JSON) -> [1, 2, 3], duplicates dropped."""
+    if isinstance(value, str):
+        value = [v.strip() for v in value.split(",") if v.strip()]
+    if not isinstance(value, list) or not value:
+        raise ListArgsError("ids must be a non-empty list of integers")
+    try:
+        ids = [int(v) for v in value if not isinstance(v, bool)]
+    except (TypeError, ValueError):
+        raise ListArgsError("ids must be a non-empty list of integers")
+    if len(ids) != len(value):
+        raise ListArgsError("ids must be a non-empty list of integers")
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > MAX_IDS:
+        raise ListArgsError(f"at most {MAX_IDS} ids per request")
+    return ids
+
+
+def multi_get(query, key, ids, columns, nested=(), rows=None, serialize_rows=None):
+    """
+    The records of `ids` with one "key IN (...)" SELECT (+ the collection
+    SELECTs of serialize_rows), in the order of `ids`:
+    { "items": [...], "missing": [ids not found] }
+
+    Same `fields` param and arguments as list_page(); `key` must be one of
+    `columns`.
+    """
+    args = parse_list_args(set(columns) | set(nested))
+    fields = args.fields
+    name = key.key
+    query = query.filter(key.in_(ids))
+
+    if nested and (not fields or any(f in nested for f in fields)):
+        items = serialize_rows([r._asdict() for r in rows(query)])
+    else:
+        selected = dict.fromkeys([name, *(fields or columns)])
+        projected = query.with_entities(*[columns[f].label(f) for f in selected])
+        items = [jsonable_row(r._asdict()) for r in projected]
+
+    found = {item[name]: item for item in items}
+    ordered = [found[i] for i in ids if i in found]
+    if fields:
+        ordered = [{f: item[f] for f in fields} for item in ordered]
+    return {"items": ordered, "missing": [i for i in ids if i not in found]}
@@ -0,0 +1,212 @@
+"""
+Shared query building blocks for the list/detail endpoints.
+
+Detail endpoints load entities with the loader options their serialize_*
+function needs (many-to-one joined, collections in one "IN (...)" SELECT).
+
+List endpoints skip ORM entities: they select plain columns (the related
+many-to-one columns through a LEFT JOIN, labelled "<relation>__<column>")
+and build the JSON from those rows; collections are fetched for the whole
+page with one extra SELECT.
+
+The loan history/counts of one member or one book are shared by the users
+and books blueprints (LOAN HISTORY below).
+"""
+from flask import request
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import joinedload, selectinload
+
+from app import stats
+from app.extensions import db
+from app.models.auteur import Auteur, Livre_Auteur
+from app.models.categorie import Categorie
+from app.models.emprunt import Emprunt
+from app.models.livre import Livre
+from app.models.membre import Membre
+from app.models.profil import Profil
+from app.models.utilisateur import Utilisateur
+from app.pagination import ListArgsError, jsonable_row, list_page
+
+
+def book_options():
+    # serialize_book -> b.categorie, b.auteurs
+    return (
+        joinedload(Livre.categorie),
+        selectinload(Livre.auteurs),
+    )
+
+
+def nested(row: dict, prefix: str) -> dict | None:
+    """{"categorie__id_cat": 1, ...} -> {"id_cat": 1, ...} (None for no match)"""
+    start = prefix + "__"
+    sub = {k[len(start):]: v for k, v in row.items() if k.startswith(start)}
+    if all(v is None for v in sub.values()):
+        return None
+    return sub
+
+
+# -----------------------
+# BOOKS
+# -----------------------
+
+def book_rows(query):
+    """Livre query -> rows of livre columns + its categorie."""
+    return query.outerjoin(Categorie, Categorie.id_cat == Livre.cat_id).with_entities(
+        Livre.id_livre,
+        Livre.isbn,
+        Livre.titre,
+        Livre.quantite,
+        Livre.quantite_totale,
+        Livre.nb_en_pret,
+        Livre.cat_id,
+        Categorie.id_cat.label("categorie__id_cat"),
+        Categorie.nom_cat.label("categorie__nom_cat"),
+        Categorie.champ.label("categorie__champ"),
+    )
+
+
+def authors_by_book(livre_ids) -> dict:
+    """{id_livre: [author dict, ...]} for all books in one SELECT."""
+    result = {}
+    if not livre_ids:
+        return result
+    rows = db.session.execute(
+        select(Livre_Auteur.c.livre_id, Auteur.id_auteur, Auteur.nom_auteur, Auteur.prenom_auteur)
+        .join(Auteur, Auteur.id_auteur == Livre_Auteur.c.auteur_id)
+        .where(Livre_Auteur.c.livre_id.in_(list(livre_ids)))
+        .order_by(Livre_Auteur.c.livre_id, Auteur.id_auteur)
+    ).all()
+    for livre_id, id_auteur, nom, prenom in rows:
+        result.setdefault(livre_id, []).append(
+            {"id_auteur": id_auteur, "nom_auteur": nom, "prenom_auteur": prenom}
+        )
+    return result
+
+
+# -----------------------
+# LOANS
+# -----------------------
+
+def emprunt_rows(query):
+    """Emprunt query -> rows of emprunt columns + livre/membre summary."""
+    return (
+        query.outerjoin(Livre, Livre.id_livre == Emprunt.livre_id)
+        .outerjoin(Membre, Membre.id_mbre == Emprunt.membre_id)
+        .with_entities(
+            Emprunt.id_emprunt,
+            Emprunt.livre_id,
+            Emprunt.membre_id,
+            Emprunt.date_emprunt,
+            Emprunt.date_retour,
+            Livre.id_livre.label("livre__id_livre"),
+            Livre.titre.label("livre__titre"),
+            Livre.isbn.label("livre__isbn"),
+            Membre.id_mbre.label("membre__id_mbre"),
+            Membre.nom_mbre.label("membre__nom_mbre"),
+            Membre.prenom_mbre.label("membre__prenom_mbre"),
+            Membre.email_mbre.label("membre__email_mbre"),
+        )
+    )
+
+
+EMPRUNT_COLUMNS = {
+    "id_emprunt": Emprunt.id_emprunt,
+    "livre_id": Emprunt.livre_id,
+    "membre_id": Emprunt.membre_id,
+    "date_emprunt": Emprunt.date_emprunt,
+    "date_retour": Emprunt.date_retour,
+}
+EMPRUNT_NESTED = ("livre", "membre")
+
+
+def serialize_emprunt_rows(rows):
+    """serialize_emprunt for a page of emprunt_rows() rows"""
+    return [
+        {
+            "id_emprunt": r["id_emprunt"],
+            "livre_id": r["livre_id"],
+            "membre_id": r["membre_id"],
+            "date_emprunt": r["date_emprunt"],
+            "date_retour": r["date_retour"],
+            "livre": nested(r, "livre"),
+            "membre": nested(r, "membre"),
+        }
+        for r in map(jsonable_row, rows)
+    ]
+
+
+# -----------------------
+# LOAN HISTORY
+# of one member / one book
+# (GET /api/users/members/<id>/loans, GET /api/books/books/<id>/loans)
+# Most recent first, keyset on (date_emprunt, id_emprunt): served by the
+# ix_emprunt_membre_date / ix_emprunt_livre_date indexes. Loans without a
+# date_emprunt (the API always sets one, older rows may not have it) are not
+# listed; loan_counts() still counts them.
+# -----------------------
+LOAN_STATUSES = ("open", "returned", "overdue")
+
+
+def loan_history(*criteria):
+    """
+    Page of the loans matching `criteria`. Optional query params:
+      - status=open|returned|overdue
+      - limit/after/fields (see app/pagination.py)
+    Raises ListArgsError for invalid params.
+    """
+    status = request.args.get("status")
+    query = Emprunt.query.filter(*criteria)
+
+    if status == "open":
+        query = query.filter(Emprunt.date_retour.is_(None))
+    elif status == "returned":
+        query = query.filter(Emprunt.date_retour.is_not(None))
+    elif status == "overdue":
+        query = query.filter(Emprunt.date_retour.is_(None), Emprunt.date_emprunt < stats.overdue_cutoff())
+    elif status is not None:
+        raise ListArgsError(f"status must be one of {', '.join(LOAN_STATUSES)}")
+
+    return list_page(
+        query, [Emprunt.date_emprunt, Emprunt.id_emprunt], EMPRUNT_COLUMNS,
+        nested=EMPRUNT_NESTED, rows=emprunt_rows, serialize_rows=serialize_emprunt_rows,
+    )
+
+
+def loan_counts(*criteria) -> dict:
+    """{total, open, returned, overdue} in one aggregate (no rows fetched)."""
+    is_open = Emprunt.date_retour.is_(None)
+    row = db.session.execute(
+        select(
+            func.count(),
+            func.sum(case((is_open, 1), else_=0)),
+            func.sum(case((is_open & (Emprunt.date_emprunt < stats.overdue_cutoff()), 1), else_=0)),
+        ).where(*criteria)
+    ).one()
+    total, open_, overdue = row[0], int(row[1] or 0), int(row[2] or 0)
+    return {"total": total, "open": open_, "returned": total - open_, "overdue": overdue}
+
+
+# -----------------------
+# ACCOUNTS
+# -----------------------
+
+def utilisateur_rows(query):
+    """Utilisateur query -> rows of utilisateur columns + profil/membre."""
+    return (
+        query.outerjoin(Profil, Profil.id_profil == Utilisateur.profil_id)
+        .outerjoin(Membre, Membre.id_mbre == Utilisateur.mbre_id)
+        .with_entities(
+            Utilisateur.id_user,
+            Utilisateur.login,
+            Utilisateur.profil_id,
+            Utilisateur.mbre_id,
+            Profil.id_profil.label("profil__id_profil"),
+            Profil.nom_p.label("profil__nom_p"),
+            Profil.description_p.label("profil__description_p"),
+            Membre.id_mbre.label("membre__id_mbre"),
+            Membre.nom_mbre.label("membre__nom_mbre"),
+            Membre.prenom_mbre.label("membre__prenom_mbre"),
+            Membre.email_mbre.label("membre__email_mbre"),
+            Membre.date_adhesion.label("membre__date_adhesion"),
+        )
+    )
@@ -0,0 +1,139 @@
+"""
+Read replicas (optional): GET requests read from a replica, everything else
+from the primary (DATABASE_URL).
+
+DATABASE_REPLICA_URLS="postgresql://...@replica1/db,postgresql://...@replica2/db"
+becomes the SQLALCHEMY_BINDS "replica_1", "replica_2" (app/config.py).
+RoutingSession.get_bind() then picks the engine for each statement:
+
+  - flushes, INSERT/UPDATE/DELETE and SELECT ... FOR UPDATE -> primary
+  - once a session has written, all its reads -> primary (read-your-writes)
+  - other reads in a GET/HEAD request -> one replica per transaction, unless
+    the request is pinned (X-Read-Primary header or lm_primary cookie) -> primary
+  - outside requests (CLI, shell) -> primary
+
+A request that wrote answers with `X-Read-Primary: <REPLICA_PIN_SECONDS>`
+(exposed to cross-origin scripts by CORS) and the pin cookie, so the
+client's next reads also see its writes despite replication lag. The
+frontend runs on another origin and sends no credentials: it echoes the
+header on its requests for that many seconds (frontend/src/api/client.js).
+The cookie covers same-origin clients that do not.
+
+Replicas are picked round-robin. A replica whose connection fails is skipped
+for REPLICA_COOLDOWN seconds (the request that hit the failure still fails);
+with no healthy replica left, reads go to the primary.
+"""
+import itertools
+import threading
+import time
+
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.dml import UpdateBase
+
+PIN_HEADER = "X-Read-Primary"
+PIN_COOKIE = "lm_primary"
+READ_METHODS = ("GET", "HEAD")
+
+
+class ReplicaPicker:
+    def __init__(self, engines, cooldown=30):
+        self.engines = dict(engines)  # name -> Engine
+        self.cooldown = cooldown
+        self._names = list(self.engines)
+        self._next = itertools.count()
+        self._down_until = {}  # name -> monotonic time
+        self._lock = threading.Lock()
+
+    def pick(self):
+        """(name, engine) of the next healthy replica, or None."""
+        now = time.monotonic()
+        for _ in range(len(self._names)):
+            name = self._names[next(self._next) % len(self._names)]
+            if self._down_until.get(name, 0) <= now:
+                return name, self.engines[name]
+        return None
+
+    def mark_down(self, name):
+        with self._lock:
+            self._down_until[name] = time.monotonic() + self.cooldown
+
+    def status(self):
+        now = time.monotonic()
+        return {
+            name: "down" if self._down_until.get(name, 0) > now else "up"
+            for name in self._names
+        }
+
+
+def picker():
+    return current_app.extensions.get("replicas")
+
+
+def _is_write(clause):
+    if isinstance(clause, UpdateBase):
+        return True
+    return isinstance(clause, Select) and clause._for_update_arg is not None
+
+
+def _wants_replica():
+    if not has_request_context() or request.method not in READ_METHODS:
+        return False
+    return PIN_HEADER not in request.headers and PIN_COOKIE not in request.cookies
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return bind
+        primary = super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+        if self._flushing or _is_write(clause):
+            self.info["wrote"] = True
+            return primary
+        if self.info.get("wrote") or not _wants_replica():
+            return primary
+
+        replicas = picker()
+        if replicas is None:
+            return primary
+        # one replica for the whole transaction (consistent snapshot)
+        if "replica" not in self.info:
+            picked = replicas.pick()
+            self.info["replica"] = picked[1] if picked else None
+        return self.info["replica"] or primary
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _after_transaction_end(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("replica", None)
+
+
+def _pin_after_write(response):
+    session = current_app.extensions["sqlalchemy"].session
+    if session.info.get("wrote") and response.status_code < 400:
+        seconds = current_app.config["REPLICA_PIN_SECONDS"]
+        response.headers[PIN_HEADER] = str(seconds)
+        response.set_cookie(PIN_COOKIE, "1", max_age=seconds, httponly=True, samesite="Lax")
+    return response
+
+
+def init_replicas(app, db):
+    with app.app_context():
+        engines = {key: engine for key, engine in db.engines.items() if key and key.startswith("replica")}
+    if not engines:
+        return
+
+    replicas = ReplicaPicker(engines, cooldown=app.config["REPLICA_COOLDOWN"])
+    for name, engine in engines.items():
+        def on_error(context, name=name):
+            # connection refused / dropped: not a bad query
+            if context.is_disconnect or context.connection is None:
+                replicas.mark_down(name)
+        event.listen(engine, "handle_error", on_error)
+
+    app.extensions["replicas"] = replicas
+    app.after_request(_pin_after_write)
@@ -0,0 +1,83 @@
+"""
+Book catalogue search (the `q` param of GET /api/books/books).
+
+PostgreSQL: prefix full-text search on the generated `search_vector` columns
+of livre/auteur (GIN indexes), plus pg_trgm indexes so substring matches on
+titre/isbn/author names stay index-backed. Results are ranked.
+See migrations/versions/3d6deb4b84cf_book_search_index.py.
+
+The matching ids are a UNION of two selects, one per table, each an OR of
+indexed predicates (a BitmapOr); the authors' go through livre_auteur by
+auteur_id. An OR with a correlated EXISTS on the authors could use none
+of the livre indexes: every search would scan livre.
+
+Other dialects (SQLite for local runs): the original ILIKE search.
+"""
+import re
+
+from sqlalchemy import Float, func, literal_column, or_, select, type_coerce, union
+
+from app.extensions import db
+from app.models.auteur import Auteur, Livre_Auteur
+from app.models.livre import Livre
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def prefix_tsquery(q: str) -> str | None:
+    """'les mis' -> 'les:* & mis:*' (None if q has no word characters)"""
+    tokens = _TOKEN_RE.findall(q)
+    if not tokens:
+        return None
+    return " & ".join(f"{t}:*" for t in tokens)
+
+
+def search_books(query, q: str):
+    """
+    Filter a Livre query on `q`.
+    Returns (query, keys) where keys are the pagination/ordering keys.
+    """
+    like = f"%{q}%"
+    ts = prefix_tsquery(q)
+
+    if db.engine.dialect.name != "postgresql" or ts is None:
+        query = query.outerjoin(Livre.auteurs).filter(
+            or_(
+                Livre.titre.ilike(like),
+                Livre.isbn.ilike(like),
+                Auteur.nom_auteur.ilike(like),
+                Auteur.prenom_auteur.ilike(like),
+            )
+        ).distinct()
+        return query, [Livre.id_livre]
+
+    tsq = func.to_tsquery("simple", ts)
+    livre_vec = literal_column("livre.search_vector")
+    auteur_vec = literal_column("auteur.search_vector")
+
+    book_hits = select(Livre.id_livre.label("id_livre")).where(
+        or_(
+            livre_vec.op("@@")(tsq),
+            Livre.titre.ilike(like),
+            Livre.isbn.ilike(like),
+        )
+    )
+    author_hits = (
+        select(Livre_Auteur.c.livre_id)
+        .join(Auteur, Auteur.id_auteur == Livre_Auteur.c.auteur_id)
+        .where(
+            or_(
+                auteur_vec.op("@@")(tsq),
+                Auteur.nom_auteur.ilike(like),
+                Auteur.prenom_auteur.ilike(like),
+            )
+        )
+    )
+    hits = union(book_hits, author_hits).subquery("hits")
+    query = query.join(hits, hits.c.id_livre == Livre.id_livre)
+
+    rank = type_coerce(
+        func.ts_rank(livre_vec, tsq) + func.similarity(Livre.titre, q),
+        Float,
+    )
+    return query, [rank, Livre.id_livre]
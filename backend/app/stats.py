@@ -0,0 +1,276 @@
+"""
+Circulation statistics computed in SQL (GROUP BY / window functions), for
+the GET /api/loans/stats/* endpoints.
+
+top_books() and categories() can read the `emprunt_stat` summary (loans per
+day and book) instead of scanning `emprunt`: set STATS_USE_SUMMARY=1 and run
+`flask stats refresh` periodically. A refresh only adds the loans inserted
+since the previous one, read from the change feed (app/changes.py), and
+recounts the (day, book) pairs that loans were moved from/to or deleted
+from since then (emprunt_stat_dirty, written at flush time).
+"""
+from datetime import date, timedelta
+
+from flask import current_app
+from sqlalchemy import case, delete, event, func, inspect, or_, select, tuple_
+
+from app.changes import head, horizon, sequence
+from app.dialects import upsert_insert
+from app.extensions import db
+from app.models.categorie import Categorie
+from app.models.change_log import ChangeLog
+from app.models.emprunt import Emprunt
+from app.models.emprunt_stat import EmpruntStat, EmpruntStatDirty, StatRefresh
+from app.models.livre import Livre
+from app.models.membre import Membre
+
+SUMMARY = "emprunt_stat"
+
+
+def overdue_cutoff() -> date:
+    """Open loans started before this date are overdue."""
+    return date.today() - timedelta(days=current_app.config["LOAN_PERIOD_DAYS"])
+
+
+def _in_range(stmt, column, d_from, d_to):
+    if d_from:
+        stmt = stmt.where(column >= d_from)
+    if d_to:
+        stmt = stmt.where(column <= d_to)
+    return stmt
+
+
+def loans_per_book(d_from=None, d_to=None):
+    """Subquery (livre_id, nb) from the summary or from emprunt."""
+    if current_app.config.get("STATS_USE_SUMMARY"):
+        stmt = select(
+            EmpruntStat.livre_id.label("livre_id"),
+            func.sum(EmpruntStat.nb_emprunts).label("nb"),
+        ).group_by(EmpruntStat.livre_id)
+        return _in_range(stmt, EmpruntStat.jour, d_from, d_to).subquery()
+
+    stmt = (
+        select(Emprunt.livre_id.label("livre_id"), func.count().label("nb"))
+        .where(Emprunt.livre_id.is_not(None))
+        .group_by(Emprunt.livre_id)
+    )
+    return _in_range(stmt, Emprunt.date_emprunt, d_from, d_to).subquery()
+
+
+def top_books(d_from=None, d_to=None, limit=10):
+    counts = loans_per_book(d_from, d_to)
+    stmt = (
+        select(
+            func.rank().over(order_by=counts.c.nb.desc()).label("rang"),
+            Livre.id_livre,
+            Livre.titre,
+            Livre.isbn,
+            counts.c.nb.label("nb_emprunts"),
+        )
+        .join(Livre, Livre.id_livre == counts.c.livre_id)
+        .order_by(counts.c.nb.desc(), Livre.id_livre)
+        .limit(limit)
+    )
+    return [dict(r._mapping) for r in db.session.execute(stmt)]
+
+
+def categories(d_from=None, d_to=None):
+    counts = loans_per_book(d_from, d_to)
+    per_cat = (
+        select(Livre.cat_id.label("cat_id"), func.sum(counts.c.nb).label("nb"))
+        .join(Livre, Livre.id_livre == counts.c.livre_id)
+        .group_by(Livre.cat_id)
+        .subquery()
+    )
+    stmt = (
+        select(
+            per_cat.c.cat_id.label("id_cat"),
+            Categorie.nom_cat,
+            per_cat.c.nb.label("nb_emprunts"),
+            func.sum(per_cat.c.nb).over().label("total"),
+        )
+        .select_from(per_cat)
+        .outerjoin(Categorie, Categorie.id_cat == per_cat.c.cat_id)
+        .order_by(per_cat.c.nb.desc())
+    )
+    return [
+        {
+            "id_cat": r.id_cat,
+            "nom_cat": r.nom_cat,
+            "nb_emprunts": int(r.nb_emprunts),
+            "part": round(float(r.nb_emprunts) / float(r.total), 4) if r.total else 0.0,
+        }
+        for r in db.session.execute(stmt)
+    ]
+
+
+def active_members(d_from=None, d_to=None, limit=10):
+    nb = func.count(Emprunt.id_emprunt)
+    stmt = (
+        select(
+            Membre.id_mbre,
+            Membre.nom_mbre,
+            Membre.prenom_mbre,
+            nb.label("nb_emprunts"),
+            func.sum(case((Emprunt.date_retour.is_(None), 1), else_=0)).label("nb_en_cours"),
+            func.max(Emprunt.date_emprunt).label("dernier_emprunt"),
+        )
+        .join(Emprunt, Emprunt.membre_id == Membre.id_mbre)
+        .group_by(Membre.id_mbre, Membre.nom_mbre, Membre.prenom_mbre)
+    )
+    stmt = _in_range(stmt, Emprunt.date_emprunt, d_from, d_to)
+    stmt = stmt.order_by(nb.desc(), Membre.id_mbre).limit(limit)
+    return [
+        {
+            **r._mapping,
+            "nb_en_cours": int(r.nb_en_cours or 0),
+            "dernier_emprunt": r.dernier_emprunt.isoformat() if r.dernier_emprunt else None,
+        }
+        for r in db.session.execute(stmt)
+    ]
+
+
+def _feed(since, upto):
+    return (
+        ChangeLog.table_name == Emprunt.__tablename__,
+        ChangeLog.seq > since,
+        ChangeLog.seq <= upto,
+    )
+
+
+def refresh_summary(full: bool = False) -> dict:
+    """
+    Add the loans inserted since the last refresh to emprunt_stat, with one
+    INSERT ... SELECT ... GROUP BY ... ON CONFLICT DO UPDATE, and recount
+    the dirty (jour, livre_id) pairs. Commits.
+
+    The watermark is a change_log seq, not an emprunt id: ids are handed out
+    before commit, so a loan committing after a refresh could have an id
+    below the one it stopped at; an entry never gets a seq below the head
+    (app/changes.py:sequence()). The summary is rebuilt when the feed cannot
+    name the new loans: first refresh, entries compacted away, or a "reset"
+    entry (bulk statement).
+    """
+    insert = upsert_insert(db.session)
+    if insert is None:
+        raise RuntimeError("emprunt_stat refresh needs PostgreSQL or SQLite")
+
+    sequence()
+    state = db.session.get(StatRefresh, SUMMARY, with_for_update=True)
+    if state is None:
+        state = StatRefresh(nom=SUMMARY)
+        db.session.add(state)
+
+    upto = head()
+    since = state.dernier_seq
+    dirty = db.session.execute(
+        select(EmpruntStatDirty.id, EmpruntStatDirty.jour, EmpruntStatDirty.livre_id)
+    ).all()
+    keys = {(jour, livre_id) for _, jour, livre_id in dirty}
+    if since is None or since < horizon() or (None, None) in keys:
+        full = True
+    elif not full:
+        reset = db.session.execute(
+            select(ChangeLog.seq).where(*_feed(since, upto), ChangeLog.row_id.is_(None)).limit(1)
+        ).first()
+        full = reset is not None
+
+    loans = select(Emprunt.date_emprunt, Emprunt.livre_id, func.count()).where(
+        Emprunt.date_emprunt.is_not(None),
+        Emprunt.livre_id.is_not(None),
+    )
+    inserted = select(ChangeLog.row_id).where(ChangeLog.op == "insert")
+    # loans numbered after head() was read, or not yet, are left to the next refresh
+    later = inserted.where(
+        ChangeLog.table_name == Emprunt.__tablename__,
+        or_(ChangeLog.seq > upto, ChangeLog.seq.is_(None)),
+    )
+    counted = loans.where(Emprunt.id_emprunt.not_in(later))
+    key = tuple_(Emprunt.date_emprunt, Emprunt.livre_id)
+
+    if full:
+        db.session.execute(delete(EmpruntStat))
+        _add_counts(insert, counted)
+    else:
+        if keys:
+            db.session.execute(delete(EmpruntStat).where(tuple_(EmpruntStat.jour, EmpruntStat.livre_id).in_(keys)))
+            _add_counts(insert, counted.where(key.in_(keys)))
+        if upto > since:
+            new = loans.where(Emprunt.id_emprunt.in_(inserted.where(*_feed(since, upto))))
+            if keys:
+                new = new.where(key.not_in(keys))  # recounted above
+            _add_counts(insert, new)
+
+    if dirty:
+        db.session.execute(delete(EmpruntStatDirty).where(EmpruntStatDirty.id.in_([d.id for d in dirty])))
+    state.dernier_seq = upto
+    state.date_maj = func.now()
+    db.session.commit()
+    return {
+        "from_seq": None if full else since,
+        "to_seq": upto,
+        "full": full,
+        "recounted": 0 if full else len(keys),
+    }
+
+
+def _add_counts(insert, loans):
+    t = EmpruntStat.__table__
+    stmt = insert(t).from_select(
+        [t.c.jour, t.c.livre_id, t.c.nb_emprunts],
+        loans.group_by(Emprunt.date_emprunt, Emprunt.livre_id),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[t.c.jour, t.c.livre_id],
+        set_={"nb_emprunts": t.c.nb_emprunts + stmt.excluded.nb_emprunts},
+    )
+    db.session.execute(stmt)
+
+
+# -----------------------
+# Edited / deleted loans (emprunt_stat_dirty)
+# -----------------------
+
+KEY_COLUMNS = ("date_emprunt", "livre_id")
+UNKNOWN = (None, None)
+
+
+def _old_key(attrs):
+    values = []
+    for name in KEY_COLUMNS:
+        history = attrs[name].history
+        old = history.deleted or history.unchanged
+        if not old:
+            return UNKNOWN  # changed (or deleted) without being loaded first
+        values.append(old[0])
+    return tuple(values)
+
+
+def _after_flush(session, flush_context):
+    """Old and new (jour, livre_id) of the loans this flush moved or deleted."""
+    keys = set()
+    for obj in session.dirty:
+        if not isinstance(obj, Emprunt):
+            continue
+        attrs = inspect(obj).attrs
+        if not any(attrs[name].history.has_changes() for name in KEY_COLUMNS):
+            continue
+        keys.add(_old_key(attrs))
+        keys.add(tuple(attrs[name].value for name in KEY_COLUMNS))
+    for obj in session.deleted:
+        if isinstance(obj, Emprunt):
+            keys.add(_old_key(inspect(obj).attrs))
+
+    # loans without a day or a book are not counted
+    rows = [
+        {"jour": jour, "livre_id": livre_id}
+        for jour, livre_id in keys
+        if (jour, livre_id) == UNKNOWN or (jour is not None and livre_id is not None)
+    ]
+    if rows:
+        session.execute(EmpruntStatDirty.__table__.insert(), rows)
+
+
+def register_summary_tracking(session):
+    if not event.contains(session, "after_flush", _after_flush):
+        event.listen(session, "after_flush", _after_flush)
@@ -0,0 +1,191 @@
+"""
+Stock changes: livre.quantite (copies on the shelf) and livre.nb_en_pret
+(open loans), with livre.quantite_totale = quantite + nb_en_pret.
+
+Each change is a single conditional UPDATE run inside the caller's
+transaction, so concurrent workers can never push quantite below zero:
+the row lock taken by the UPDATE serialises competing checkouts and the
+`quantite > 0` predicate is re-checked against the committed value.
+"""
+from collections import Counter
+
+from sqlalchemy import case, func, select, update
+
+from app.extensions import db
+from app.models.emprunt import Emprunt
+from app.models.livre import Livre
+
+
+def take_copy(livre_id: int) -> bool:
+    """
+    UPDATE livre SET quantite = quantite - 1, nb_en_pret = nb_en_pret + 1
+    WHERE id_livre = :id AND quantite > 0
+
+    Returns False if no copy was available (or the book does not exist).
+    Nothing is committed here.
+    """
+    res = db.session.execute(
+        update(Livre)
+        .where(Livre.id_livre == livre_id, Livre.quantite > 0)
+        .values(quantite=Livre.quantite - 1, nb_en_pret=Livre.nb_en_pret + 1)
+    )
+    return res.rowcount == 1
+
+
+def take_copies(counts: dict) -> bool:
+    """
+    {livre_id: n} -> quantite -= n, for all books in one UPDATE guarded by
+    quantite >= n. Returns False (and changes nothing visible once the caller
+    rolls back) if any book had fewer than n copies left.
+    """
+    if not counts:
+        return True
+    wanted = case(counts, value=Livre.id_livre, else_=0)
+    res = db.session.execute(
+        update(Livre)
+        .where(Livre.id_livre.in_(list(counts)), Livre.quantite >= wanted)
+        .values(quantite=Livre.quantite - wanted, nb_en_pret=Livre.nb_en_pret + wanted)
+    )
+    return res.rowcount == len(counts)
+
+
+def put_back(counts: dict) -> None:
+    """
+    {livre_id: n} -> quantite += n, for all books in one UPDATE.
+    """
+    if not counts:
+        return
+    n = case(counts, value=Livre.id_livre, else_=0)
+    db.session.execute(
+        update(Livre)
+        .where(Livre.id_livre.in_(list(counts)))
+        .values(
+            quantite=func.coalesce(Livre.quantite, 0) + n,
+            nb_en_pret=Livre.nb_en_pret - n,
+        )
+    )
+
+
+def set_total(livre_id: int, total: int) -> bool:
+    """
+    Change the number of copies owned; the shelf count follows.
+    Returns False if more than `total` copies are out on loan.
+    """
+    res = db.session.execute(
+        update(Livre)
+        .where(Livre.id_livre == livre_id, Livre.nb_en_pret <= total)
+        .values(quantite_totale=total, quantite=total - Livre.nb_en_pret)
+    )
+    return res.rowcount == 1
+
+
+def set_available(livre_id: int, available: int) -> None:
+    """Legacy PUT {"quantite": n}: n copies on the shelf, plus those on loan."""
+    db.session.execute(
+        update(Livre)
+        .where(Livre.id_livre == livre_id)
+        .values(quantite=available, quantite_totale=available + Livre.nb_en_pret)
+    )
+
+
+def return_loans(emprunt_ids, d_retour) -> list[int]:
+    """
+    Close the loans of `emprunt_ids` that are still open and put their
+    copies back in stock. Already returned loans are skipped, so calling
+    this twice for the same loan is harmless.
+
+    Returns the ids that were actually closed. Nothing is committed here.
+    """
+    rows = db.session.execute(
+        update(Emprunt)
+        .where(Emprunt.id_emprunt.in_(list(emprunt_ids)), Emprunt.date_retour.is_(None))
+        .values(date_retour=d_retour)
+        .returning(Emprunt.id_emprunt, Emprunt.livre_id)
+    ).all()
+
+    put_back(Counter(livre_id for _, livre_id in rows if livre_id is not None))
+    return [emprunt_id for emprunt_id, _ in rows]
+
+
+# -----------------------
+# Reconciliation (flask stock reconcile)
+# -----------------------
+
+def _open_loans():
+    return (
+        select(Emprunt.livre_id.label("livre_id"), func.count().label("nb"))
+        .where(Emprunt.date_retour.is_(None), Emprunt.livre_id.is_not(None))
+        .group_by(Emprunt.livre_id)
+        .subquery()
+    )
+
+
+def find_drift() -> list[dict]:
+    """
+    Books whose counters disagree with the open loans in `emprunt`, with the
+    values reconcile(fix=True) would write. One aggregate over open loans
+    (ix_emprunt_ouverts) joined to livre.
+    """
+    ouverts = _open_loans()
+    actual = func.coalesce(ouverts.c.nb, 0)
+    # the copies owned are trusted unless fewer than the copies out
+    total = case((Livre.quantite_totale < actual, actual), else_=Livre.quantite_totale)
+    rows = db.session.execute(
+        select(
+            Livre.id_livre,
+            Livre.quantite,
+            Livre.quantite_totale,
+            Livre.nb_en_pret,
+            actual.label("nb_en_pret_reel"),
+            total.label("quantite_totale_corrigee"),
+        )
+        .outerjoin(ouverts, ouverts.c.livre_id == Livre.id_livre)
+        .where(
+            (Livre.nb_en_pret != actual)
+            | (Livre.quantite.is_(None))
+            | (Livre.quantite != Livre.quantite_totale - Livre.nb_en_pret)
+            | (Livre.quantite_totale < actual)
+        )
+        .order_by(Livre.id_livre)
+    ).all()
+    return [
+        {
+            "id_livre": r.id_livre,
+            "found": {
+                "quantite": r.quantite,
+                "quantite_totale": r.quantite_totale,
+                "nb_en_pret": r.nb_en_pret,
+            },
+            "expected": {
+                "quantite": r.quantite_totale_corrigee - r.nb_en_pret_reel,
+                "quantite_totale": r.quantite_totale_corrigee,
+                "nb_en_pret": r.nb_en_pret_reel,
+            },
+        }
+        for r in rows
+    ]
+
+
+def reconcile(fix: bool = False) -> list[dict]:
+    """Report (and with fix=True, repair and commit) counter drift."""
+    drift = find_drift()
+    if fix and drift:
+        # recounted inside the UPDATE, in case a checkout ran meanwhile
+        actual = (
+            select(func.count())
+            .where(Emprunt.livre_id == Livre.id_livre, Emprunt.date_retour.is_(None))
+            .scalar_subquery()
+        )
+        short = Livre.quantite_totale < actual
+        db.session.execute(
+            update(Livre)
+            .where(Livre.id_livre.in_([d["id_livre"] for d in drift]))
+            .values(
+                nb_en_pret=actual,
+                quantite_totale=case((short, actual), else_=Livre.quantite_totale),
+                quantite=case((short, 0), else_=Livre.quantite_totale - actual),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    return drift
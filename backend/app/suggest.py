@@ -0,0 +1,286 @@
+"""
+Typeahead for the front desk: GET /api/suggest?q=&kind=book|author|member.
+
+Each worker keeps one in-memory prefix index per kind:
+  book    livre.titre
+  author  auteur.nom_auteur + prenom_auteur
+  member  membre.nom_mbre + prenom_mbre + email_mbre
+
+Text is folded (accents, ligatures, case: "Éloïse Cœur" -> "eloise coeur")
+and split into words. An index is two parallel sorted arrays (word, id):
+a query word is a bisect to the first word it prefixes, then a forward
+scan until k distinct rows are found; with several query words the
+longest drives the scan and every other word must prefix a word of the
+row. No SQL on the query path.
+
+Memory is bounded per row: at most SUGGEST_MAX_WORDS words of at most
+SUGGEST_MAX_WORD_LEN characters (longer words are cut, so are query
+words), the words themselves are interned, the ids are an array.
+
+The index is built on a worker's first call (one SELECT per kind), then
+kept current from the change feed (app/changes.py): at most every
+SUGGEST_REFRESH_SECONDS a call reads the livre/auteur/membre entries
+since the last sync and re-reads only the rows they name, whichever worker
+(or CLI) wrote them. A "reset" entry, a compacted feed or a large backlog
+rebuilds the kind from scratch.
+"""
+import bisect
+import re
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+
+from flask import current_app, request
+from sqlalchemy import select
+
+from app.changes import changes_since, head, horizon
+from app.extensions import db
+from app.models.auteur import Auteur
+from app.models.livre import Livre
+from app.models.membre import Membre
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+MAX_QUERY_LEN = 100
+MAX_SCAN = 2000  # rows examined per multi-word query
+MAX_BACKLOG = 5000  # feed entries replayed before a rebuild is cheaper
+
+_WORD_RE = re.compile(r"\w+")
+_LIGATURES = str.maketrans({"œ": "oe", "Œ": "oe", "æ": "ae", "Æ": "ae"})
+
+
+def fold(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.translate(_LIGATURES))
+    return "".join(c for c in text if not unicodedata.combining(c)).casefold()
+
+
+class PrefixIndex:
+    def __init__(self, max_words=12, max_word_len=20):
+        self.max_words = max_words
+        self.max_word_len = max_word_len
+        self.words = []  # sorted
+        self.ids = array("q")  # ids[i] is the row of words[i]
+        self.labels = {}  # id -> label
+
+    def __len__(self):
+        return len(self.labels)
+
+    def tokens(self, text) -> list[str]:
+        out = []
+        for word in _WORD_RE.findall(fold(text)):
+            word = word[: self.max_word_len]
+            if word not in out:
+                out.append(word)
+                if len(out) == self.max_words:
+                    break
+        return out
+
+    def load(self, rows):
+        """rows: (id, label); the label is what gets indexed"""
+        pairs = []
+        labels = {}
+        for row_id, label in rows:
+            labels[row_id] = label
+            pairs += [(word, row_id) for word in self.tokens(label)]
+        pairs.sort()
+        self.words = [sys.intern(word) for word, _ in pairs]
+        self.ids = array("q", [row_id for _, row_id in pairs])
+        self.labels = labels
+
+    def add(self, row_id, label):
+        self.labels[row_id] = label
+        for word in self.tokens(label):
+            i = bisect.bisect_right(self.words, word)
+            self.words.insert(i, sys.intern(word))
+            self.ids.insert(i, row_id)
+
+    def remove(self, row_id):
+        label = self.labels.pop(row_id, None)
+        if label is None:
+            return
+        for word in self.tokens(label):
+            lo = bisect.bisect_left(self.words, word)
+            hi = bisect.bisect_right(self.words, word, lo)
+            try:
+                i = self.ids.index(row_id, lo, hi)
+            except ValueError:
+                continue
+            del self.words[i]
+            del self.ids[i]
+
+    def search(self, query_words, k) -> list[int]:
+        query_words = [w[: self.max_word_len] for w in query_words]
+        j = max(range(len(query_words)), key=lambda n: len(query_words[n]))
+        driver, others = query_words[j], query_words[:j] + query_words[j + 1:]
+
+        found, seen = [], set()
+        i = bisect.bisect_left(self.words, driver)
+        scanned = 0
+        while i < len(self.words) and len(found) < k and scanned < MAX_SCAN:
+            if not self.words[i].startswith(driver):
+                break
+            row_id = self.ids[i]
+            i += 1
+            if row_id in seen:
+                continue
+            seen.add(row_id)
+            if others:
+                scanned += 1
+                words = self.tokens(self.labels[row_id])
+                if not all(any(w.startswith(o) for w in words) for o in others):
+                    continue
+            found.append(row_id)
+        return found
+
+
+# -----------------------
+# Kinds: what is indexed, and how it is read
+# -----------------------
+
+def _book_rows(ids=None):
+    stmt = select(Livre.id_livre, Livre.titre)
+    if ids is not None:
+        stmt = stmt.where(Livre.id_livre.in_(ids))
+    return [(i, t or "") for i, t in db.session.execute(stmt)]
+
+
+def _author_rows(ids=None):
+    stmt = select(Auteur.id_auteur, Auteur.nom_auteur, Auteur.prenom_auteur)
+    if ids is not None:
+        stmt = stmt.where(Auteur.id_auteur.in_(ids))
+    return [(i, " ".join(p for p in (nom, prenom) if p)) for i, nom, prenom in db.session.execute(stmt)]
+
+
+def _member_rows(ids=None):
+    stmt = select(Membre.id_mbre, Membre.nom_mbre, Membre.prenom_mbre, Membre.email_mbre)
+    if ids is not None:
+        stmt = stmt.where(Membre.id_mbre.in_(ids))
+    rows = []
+    for i, nom, prenom, email in db.session.execute(stmt):
+        name = " ".join(p for p in (nom, prenom) if p)
+        rows.append((i, f"{name} ({email})" if email else name))
+    return rows
+
+
+# kind -> (feed table, rows loader)
+KINDS = {
+    "book": ("livre", _book_rows),
+    "author": ("auteur", _author_rows),
+    "member": ("membre", _member_rows),
+}
+TABLE_KINDS = {table: kind for kind, (table, _) in KINDS.items()}
+
+
+class Suggester:
+    def __init__(self, refresh_seconds=1.0, max_words=12, max_word_len=20):
+        self.refresh_seconds = refresh_seconds
+        self.indexes = {kind: PrefixIndex(max_words, max_word_len) for kind in KINDS}
+        self.seq = None  # change feed position, None = not built
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def _rebuild(self, kinds):
+        for kind in kinds:
+            _, rows = KINDS[kind]
+            self.indexes[kind].load(rows())
+
+    def _apply(self, kind, ids):
+        index = self.indexes[kind]
+        _, rows = KINDS[kind]
+        for row_id in ids:
+            index.remove(row_id)
+        for row_id, label in rows(list(ids)):
+            index.add(row_id, label)
+
+    def sync(self):
+        """Build the indexes, or replay the change feed since the last sync."""
+        now = time.monotonic()
+        if self.seq is not None and now - self._checked < self.refresh_seconds:
+            return
+        upto = head()  # read first: later commits are replayed next time
+        if self.seq is None or self.seq < horizon():
+            self._rebuild(KINDS)
+            self.seq, self._checked = upto, now
+            return
+
+        changed = {kind: set() for kind in KINDS}
+        reset = set()
+        since, backlog = self.seq, 0
+        while True:
+            entries, more = changes_since(since, 500, list(TABLE_KINDS), upto=upto)
+            for entry in entries:
+                kind = TABLE_KINDS[entry.table_name]
+                if entry.row_id is None:
+                    reset.add(kind)
+                else:
+                    changed[kind].add(entry.row_id)
+            backlog += len(entries)
+            if not more:
+                break
+            since = entries[-1].seq
+            if backlog > MAX_BACKLOG:
+                reset.update(kind for kind, ids in changed.items() if ids)
+                break
+
+        self._rebuild(reset)
+        for kind, ids in changed.items():
+            if ids and kind not in reset:
+                self._apply(kind, ids)
+        self.seq, self._checked = upto, now
+
+    def suggest(self, q, kinds, k):
+        query_words = _WORD_RE.findall(fold(q))
+        if not query_words:
+            return []
+        with self._lock:
+            self.sync()
+            items = []
+            for kind in kinds:
+                index = self.indexes[kind]
+                items += [
+                    {"kind": kind, "id": row_id, "label": index.labels[row_id]}
+                    for row_id in index.search(query_words, k)
+                ]
+        return items
+
+    def stats(self):
+        return {
+            kind: {"rows": len(index), "words": len(index.words)}
+            for kind, index in self.indexes.items()
+        }
+
+
+def suggest_response():
+    """
+    Query params:
+      - q=str        what was typed so far (every word is a prefix)
+      - kind=book|author|member (comma separated; default: all three)
+      - limit=int    matches per kind, 1..MAX_LIMIT (default DEFAULT_LIMIT)
+    Response: { "items": [{kind, id, label}] }, kinds in the requested order
+    """
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return {"error": "q is required"}, 400
+    if len(q) > MAX_QUERY_LEN:
+        return {"error": f"q is limited to {MAX_QUERY_LEN} characters"}, 400
+
+    kinds = [k.strip() for k in (request.args.get("kind") or "").split(",") if k.strip()] or list(KINDS)
+    unknown = [k for k in kinds if k not in KINDS]
+    if unknown:
+        return {"error": f"kind must be one of {', '.join(KINDS)}"}, 400
+
+    limit = request.args.get("limit", DEFAULT_LIMIT, type=int)
+    if not 1 <= limit <= MAX_LIMIT:
+        return {"error": f"limit must be between 1 and {MAX_LIMIT}"}, 400
+
+    return {"items": current_app.extensions["suggest"].suggest(q, list(dict.fromkeys(kinds)), limit)}
+
+
+def init_suggest(app):
+    app.extensions["suggest"] = Suggester(
+        refresh_seconds=app.config["SUGGEST_REFRESH_SECONDS"],
+        max_words=app.config["SUGGEST_MAX_WORDS"],
+        max_word_len=app.config["SUGGEST_MAX_WORD_LEN"],
+    )
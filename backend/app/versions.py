@@ -0,0 +1,187 @@
+"""
+Per-table change versions + conditional GET (ETag / If-None-Match).
+
+Every committed transaction that wrote to a table bumps that table's row in
+`table_version`. Writes are collected from:
+  - the unit of work (session.new / dirty / deleted, after_flush)
+  - bulk DML statements run through the session (do_orm_execute)
+
+The bump runs right after the writer's commit, in a short transaction of
+its own: bumped in the writer's transaction, the table_version rows stayed
+locked until its commit and every writer of the same table (each checkout
+writes livre and emprunt) queued on them. Between the two commits readers
+still get the old version: a 304 or a cached body may predate the write
+for that moment. A worker dying in between leaves the version behind until
+the table's next write.
+
+GET handlers decorated with @etagged("livre", ...) derive a strong ETag from
+the versions of the tables they read; a matching If-None-Match gets a 304
+after a single SELECT on table_version.
+
+versioned_key() tags a cache key (app/cache.py) with the same versions: a
+commit on any worker moves the key, so no worker serves an entry that
+predates it, whatever the cache backend. The versions are read once per
+request (g), and again after the request's own commit.
+"""
+import hashlib
+from datetime import date
+from functools import wraps
+
+from flask import Response, g, has_app_context, make_response, request
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from app.dialects import upsert_insert
+from app.extensions import db
+from app.models.table_version import TableVersion
+
+INFO_KEY = "changed_tables"
+COMMIT_KEY = "committing_tables"  # session.info: written by the transaction being committed
+BUMP_KEY = "committed_tables"  # session.info: committed, version not bumped yet
+VERSIONS_KEY = "table_versions"  # g: versions read during this request
+
+# writing these also changes the many-to-many table
+SECONDARY_TABLES = {"livre": ("livre_auteur",)}
+
+
+def track(session, *tables):
+    session.info.setdefault(INFO_KEY, set()).update(tables)
+
+
+def _after_flush(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            track(session, table, *SECONDARY_TABLES.get(table, ()))
+
+
+def _do_orm_execute(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is not None and table.name != TableVersion.__tablename__:
+        track(orm_execute_state.session, table.name)
+
+
+def _before_commit(session):
+    session.flush()
+    tables = session.info.pop(INFO_KEY, None)
+    if tables:
+        session.info[COMMIT_KEY] = tables
+
+
+def _after_commit(session):
+    tables = session.info.pop(COMMIT_KEY, None)
+    if tables:
+        session.info.setdefault(BUMP_KEY, set()).update(tables)
+
+
+def _after_rollback(session):
+    for key in (INFO_KEY, COMMIT_KEY):
+        session.info.pop(key, None)
+
+
+def _after_transaction_end(session, transaction):
+    # the session has given its connection back: no second one held
+    if transaction.parent is None:
+        tables = session.info.pop(BUMP_KEY, None)
+        if tables:
+            bump_committed(tables)
+
+
+def bump_committed(tables):
+    """Bump `tables` in a transaction of their own (after the writer's commit)."""
+    with Session(db.engine) as session, session.begin():
+        bump(session, tables)
+    if has_app_context():
+        g.pop(VERSIONS_KEY, None)
+
+
+def bump(session, tables):
+    tables = sorted(tables)  # fixed lock order
+    t = TableVersion.__table__
+    insert = upsert_insert(session)
+
+    if insert is not None:
+        stmt = insert(t).values([{"table_name": name, "version": 1} for name in tables])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[t.c.table_name],
+            set_={"version": t.c.version + 1},
+        )
+        session.execute(stmt)
+        return
+
+    res = session.execute(update(t).where(t.c.table_name.in_(tables)).values(version=t.c.version + 1))
+    if res.rowcount < len(tables):
+        known = set(session.execute(select(t.c.table_name).where(t.c.table_name.in_(tables))).scalars())
+        session.execute(t.insert(), [{"table_name": n, "version": 1} for n in tables if n not in known])
+
+
+def current_versions(tables) -> dict:
+    t = TableVersion.__table__
+    rows = db.session.execute(
+        select(t.c.table_name, t.c.version).where(t.c.table_name.in_(list(tables)))
+    ).all()
+    versions = dict.fromkeys(tables, 0)
+    versions.update(rows)
+    return versions
+
+
+def request_versions(tables) -> dict:
+    """current_versions(), read once per request."""
+    known = g.setdefault(VERSIONS_KEY, {})
+    missing = [name for name in tables if name not in known]
+    if missing:
+        known.update(current_versions(missing))
+    return {name: known[name] for name in tables}
+
+
+def versioned_key(key: str, *tables) -> str:
+    """`key` + the versions of `tables` (which must cover what the cached value reads)."""
+    versions = request_versions(tables)
+    return key + "@" + ",".join(str(versions[name]) for name in tables)
+
+
+def compute_etag(tables, daily=False) -> str:
+    versions = request_versions(tables)
+    raw = "|".join(
+        [request.path, request.query_string.decode()]
+        + [f"{name}={versions[name]}" for name in sorted(versions)]
+        + ([date.today().isoformat()] if daily else [])
+    )
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def etagged(*tables, daily=False):
+    """
+    Conditional GET for a handler that only reads `tables`.
+    daily=True: the result also depends on today's date.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            tag = compute_etag(tables, daily)
+            if request.if_none_match.contains(tag):
+                resp = Response(status=304)
+                resp.set_etag(tag)
+                return resp
+
+            resp = make_response(view(*args, **kwargs))
+            if resp.status_code == 200:
+                resp.set_etag(tag)
+            return resp
+        return wrapper
+    return decorator
+
+
+def register_versioning(session):
+    for name, fn in (
+        ("after_flush", _after_flush),
+        ("do_orm_execute", _do_orm_execute),
+        ("before_commit", _before_commit),
+        ("after_commit", _after_commit),
+        ("after_rollback", _after_rollback),
+        ("after_transaction_end", _after_transaction_end),
+    ):
+        if not event.contains(session, name, fn):
+            event.listen(session, name, fn)
@@ -0,0 +1,101 @@
+"""
+Authenticated request throughput: password on every call vs bearer token.
+
+  password: POST /api/users/login (check_password_hash) before each call,
+            which is what the frontend did before tokens existed
+  token:    the same call with "Authorization: Bearer <access_token>"
+
+Also times auth.verify() alone. Usage (from backend/):
+  python -m benchmarks.bench_auth [--requests 200] [--url /api/books/categories]
+
+Runs against an in-memory SQLite database unless DATABASE_URL is set
+(an account is created, so use a throwaway database). AUTH_REQUIRED is on.
+"""
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "bench-only-secret")
+os.environ["AUTH_REQUIRED"] = "1"
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from app import auth, create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models.profil import Profil  # noqa: E402
+from app.models.utilisateur import Utilisateur  # noqa: E402
+
+LOGIN = "bench"
+PASSWORD = "bench-password"
+
+
+def seed():
+    Utilisateur.query.filter_by(login=LOGIN).delete()
+    profil = Profil(nom_p="BENCH")
+    db.session.add(profil)
+    db.session.flush()
+    db.session.add(Utilisateur(login=LOGIN, password=generate_password_hash(PASSWORD), profil_id=profil.id_profil))
+    db.session.commit()
+
+
+def rate(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--url", default="/api/books/categories")
+    args = parser.parse_args()
+
+    app = create_app()
+    client = app.test_client()
+    credentials = {"login": LOGIN, "password": PASSWORD}
+
+    with app.app_context():
+        db.create_all()
+        seed()
+
+    def password_call():
+        tokens = client.post("/api/users/login", json=credentials).get_json()
+        r = client.get(args.url, headers={"Authorization": f"Bearer {tokens['access_token']}"})
+        assert r.status_code == 200, r.status_code
+
+    access = client.post("/api/users/login", json=credentials).get_json()["access_token"]
+    headers = {"Authorization": f"Bearer {access}"}
+
+    def token_call():
+        r = client.get(args.url, headers=headers)
+        assert r.status_code == 200, r.status_code
+
+    # warm-up (caches, first connection)
+    password_call()
+    token_call()
+
+    password_rps = rate(password_call, args.requests)
+    token_rps = rate(token_call, args.requests)
+
+    with app.app_context():
+        n = args.requests * 50
+        start = time.perf_counter()
+        for _ in range(n):
+            auth.verify(auth.ACCESS, access)
+        verify_us = (time.perf_counter() - start) / n * 1e6
+
+    print(json.dumps({
+        "url": args.url,
+        "requests": args.requests,
+        "password_rps": round(password_rps, 1),
+        "token_rps": round(token_rps, 1),
+        "speedup": round(token_rps / password_rps, 1),
+        "verify_microseconds": round(verify_us, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
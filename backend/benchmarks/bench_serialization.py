@@ -0,0 +1,105 @@
+"""
+Old vs new list serialization for GET /api/books/books.
+
+  old: ORM entities (eager-loaded) -> serialize_book -> stdlib json
+  new: plain rows -> serialize_book_rows -> app JSON provider (orjson)
+
+Usage (from backend/):
+  python -m benchmarks.bench_serialization [--rows 10000 100000] [--repeat 3]
+
+Runs against an in-memory SQLite database unless DATABASE_URL is set
+(the tables are created and filled, so use a throwaway database).
+"""
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "bench-only-secret")
+
+from sqlalchemy import delete, insert  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.blueprints.books.routes import BOOK_COLUMNS, BOOK_NESTED, serialize_book, serialize_book_rows  # noqa: E402
+from app.models.auteur import Auteur, Livre_Auteur  # noqa: E402
+from app.models.categorie import Categorie  # noqa: E402
+from app.models.livre import Livre  # noqa: E402
+from app.pagination import list_page  # noqa: E402
+from app.queries import book_options, book_rows  # noqa: E402
+
+
+def seed(n_books):
+    for table in (Livre_Auteur, Livre.__table__, Auteur.__table__, Categorie.__table__):
+        db.session.execute(delete(table))
+    db.session.execute(insert(Categorie), [{"id_cat": i, "nom_cat": f"Cat {i}", "champ": "x"} for i in range(1, 21)])
+    db.session.execute(
+        insert(Auteur),
+        [{"id_auteur": i, "nom_auteur": f"Nom {i}", "prenom_auteur": f"Prénom {i}"} for i in range(1, 1001)],
+    )
+    db.session.execute(
+        insert(Livre),
+        [
+            {"id_livre": i, "isbn": f"978{i:010d}", "titre": f"Titre {i}", "quantite": i % 5, "cat_id": i % 20 + 1}
+            for i in range(1, n_books + 1)
+        ],
+    )
+    db.session.execute(
+        insert(Livre_Auteur),
+        [{"livre_id": i, "auteur_id": a} for i in range(1, n_books + 1) for a in {i % 1000 + 1, (i * 7) % 1000 + 1}],
+    )
+    db.session.commit()
+
+
+def old_path(app):
+    books = Livre.query.options(*book_options()).order_by(Livre.id_livre.desc()).all()
+    body = json.dumps([serialize_book(b) for b in books], ensure_ascii=False, sort_keys=True)
+    db.session.expunge_all()
+    return body
+
+
+def new_path(app):
+    items = list_page(
+        Livre.query, [Livre.id_livre], BOOK_COLUMNS,
+        nested=BOOK_NESTED, rows=book_rows, serialize_rows=serialize_book_rows,
+    )
+    return app.json.dumps(items)
+
+
+def best_of(fn, app, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(app)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    app = create_app()
+    results = []
+    with app.app_context():
+        db.create_all()
+        for n in args.rows:
+            seed(n)
+            with app.test_request_context("/api/books/books"):
+                old = best_of(old_path, app, args.repeat)
+                new = best_of(new_path, app, args.repeat)
+            results.append({
+                "rows": n,
+                "old_seconds": round(old, 4),
+                "new_seconds": round(new, 4),
+                "speedup": round(old / new, 2),
+            })
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+HTTP load test: throughput/latency curve per gunicorn configuration.
+
+  # start gunicorn (gunicorn.conf.py) once per config and load it
+  python -m benchmarks.load_test --configs sync:1 gthread:2x4 gevent:2 \\
+      --concurrency 1 4 16 64 --duration 10
+
+  # or load a server that is already running
+  python -m benchmarks.load_test --url http://localhost:8000
+
+Config syntax: <worker_class>:<workers>[x<threads>]. The spawned servers use
+the current environment (DATABASE_URL, DB_POOL_SIZE, ...), so point
+DATABASE_URL at a seeded database. Every concurrency level runs for
+--duration seconds with that many client threads, each holding a
+keep-alive connection and cycling through --path. Prints a JSON list of
+{config, concurrency, rps, p50_ms, p95_ms, p99_ms, errors}.
+
+The client runs in this Python process: past a few thousand req/s it is the
+bottleneck, so run it from another machine (or several) for fast configs.
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def run_level(base_url, paths, concurrency, duration):
+    parts = urlsplit(base_url)
+    deadline = time.perf_counter() + duration
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def client(offset):
+        conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+        mine = []
+        failed = 0
+        i = offset
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path)
+                res = conn.getresponse()
+                res.read()
+                if res.status >= 400:
+                    failed += 1
+                else:
+                    mine.append(time.perf_counter() - start)
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    ms = lambda v: round(v * 1000, 2) if v is not None else None  # noqa: E731
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "mean_ms": ms(statistics.fmean(latencies)) if latencies else None,
+        "errors": errors[0],
+    }
+
+
+def parse_config(spec):
+    worker_class, _, size = spec.partition(":")
+    workers, _, threads = (size or "1").partition("x")
+    return worker_class, int(workers), int(threads or 1)
+
+
+def wait_ready(base_url, timeout=30, interval=0.2):
+    parts = urlsplit(base_url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=1)
+            conn.request("GET", "/api/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(interval)
+    raise RuntimeError(f"server at {base_url} did not start")
+
+
+def spawn(spec, port, **extra_env):
+    worker_class, workers, threads = parse_config(spec)
+    env = dict(
+        os.environ,
+        **extra_env,
+        GUNICORN_BIND=f"127.0.0.1:{port}",
+        GUNICORN_WORKER_CLASS=worker_class,
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_THREADS=str(threads),
+        GUNICORN_ACCESS_LOG="",
+    )
+    env.setdefault("SECRET_KEY", "bench-only-secret")
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:create_app()"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="load this running server instead of spawning gunicorn")
+    parser.add_argument("--configs", nargs="+", default=["sync:1", "gthread:2x4"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--path", nargs="+", default=["/api/books/books?limit=20", "/api/books/categories"])
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    results = []
+    if args.url:
+        for c in args.concurrency:
+            results.append({"config": args.url, **run_level(args.url, args.path, c, args.duration)})
+    else:
+        for spec in args.configs:
+            base_url = f"http://127.0.0.1:{args.port}"
+            server = spawn(spec, args.port)
+            try:
+                wait_ready(base_url)
+                for c in args.concurrency:
+                    results.append({"config": spec, **run_level(base_url, args.path, c, args.duration)})
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Latency benchmarks of the hot endpoints against a seeded database
+(python -m benchmarks.seed first).
+
+  python -m benchmarks.run [--mode client|http] [--url http://localhost:8000]
+                           [--requests 200] [--scenarios list_books login ...]
+                           [--out results.json] [--baseline old.json]
+
+  client: the Flask app in this process, through app.test_client()
+  http:   a running server (--url), one keep-alive connection
+
+Each scenario does --warmup requests, then --requests timed ones, one at a
+time, with request parameters drawn from a fixed RNG seed. Reported per
+scenario: p50/p95/p99/mean latency (ms), req/s and SQL statements per
+request (from the Server-Timing header, app/metrics.py).
+
+The JSON output carries the git commit, the dataset row counts and the
+settings, so runs of different commits on the same dataset can be compared
+(--baseline prints the p50/p95 change against an earlier output file).
+create_emprunt returns the loans it created at the end, so stock is back
+where it was; the (returned) loans stay, so reseed with --reset before
+runs that must match exactly.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timezone
+from urllib.parse import urlsplit
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.abspath("bench.db"))
+os.environ.setdefault("SECRET_KEY", "bench-only-secret")
+
+from benchmarks.load_test import percentile  # noqa: E402
+from benchmarks.seed import BENCH_LOGIN, BENCH_PASSWORD, WORDS  # noqa: E402
+
+SCENARIOS = ("list_books", "list_books_q", "list_emprunts", "create_emprunt", "login")
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+
+# -----------------------
+# Transports
+# -----------------------
+
+class ClientTransport:
+    def __init__(self):
+        from app import create_app
+        self.app = create_app()
+        self.client = self.app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        res = self.client.open(path, method=method, json=body, headers=headers or {})
+        return res.status_code, res.get_json(silent=True), res.headers.get("Server-Timing", "")
+
+    def dataset(self):
+        from benchmarks.seed import dataset_summary
+        with self.app.app_context():
+            return dataset_summary()
+
+    def describe(self):
+        return {"mode": "client", "database": self.app.config["SQLALCHEMY_DATABASE_URI"].split(":", 1)[0]}
+
+
+class HttpTransport:
+    def __init__(self, url):
+        self.url = url
+        parts = urlsplit(url)
+        self.conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        self.conn.request(method, path, body=payload, headers=headers)
+        res = self.conn.getresponse()
+        raw = res.read()
+        try:
+            data = json.loads(raw) if raw else None
+        except ValueError:
+            data = None
+        return res.status, data, res.getheader("Server-Timing", "")
+
+    def dataset(self):
+        return None  # unknown from the outside; record it with --note
+
+    def describe(self):
+        return {"mode": "http", "url": self.url}
+
+
+# -----------------------
+# Scenarios: (method, path, body) generators
+# -----------------------
+
+def scenario_requests(name, rng, ctx):
+    if name == "list_books":
+        return lambda: ("GET", "/api/books/books?limit=50", None)
+    if name == "list_books_q":
+        return lambda: ("GET", f"/api/books/books?q={rng.choice(WORDS)}&limit=50", None)
+    if name == "list_emprunts":
+        return lambda: ("GET", "/api/loans/?limit=50", None)
+    if name == "login":
+        return lambda: ("POST", "/api/users/login", {"login": BENCH_LOGIN, "password": BENCH_PASSWORD})
+    if name == "create_emprunt":
+        return lambda: ("POST", "/api/loans/", {
+            "livre_id": rng.choice(ctx["available_books"]),
+            "membre_id": rng.randint(1, ctx["members"]),
+            "date_emprunt": date(2026, 1, 2).isoformat(),
+        })
+    raise ValueError(f"unknown scenario {name}")
+
+
+def available_books(transport, headers, limit=500):
+    _, data, _ = transport.request("GET", f"/api/books/books?available=true&fields=id_livre&limit={limit}", headers=headers)
+    return [b["id_livre"] for b in data["items"]]
+
+
+def run_scenario(transport, name, n, warmup, rng_seed, headers, ctx):
+    rng = random.Random(rng_seed)
+    make = scenario_requests(name, rng, ctx)
+    created = []
+    latencies, queries, errors = [], [], 0
+
+    for i in range(warmup + n):
+        method, path, body = make()
+        start = time.perf_counter()
+        status, data, timing = transport.request(method, path, body, headers)
+        elapsed = time.perf_counter() - start
+        if status >= 400:
+            errors += 1
+            continue
+        if name == "create_emprunt" and data:
+            created.append(data["id_emprunt"])
+        if i < warmup:
+            continue
+        latencies.append(elapsed)
+        m = QUERIES_RE.search(timing)
+        if m:
+            queries.append(int(m.group(1)))
+
+    if created:
+        transport.request("POST", "/api/loans/return", {"ids": created}, headers)
+
+    latencies.sort()
+    ms = lambda v: round(v * 1000, 2) if v is not None else None  # noqa: E731
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "mean_ms": ms(statistics.fmean(latencies)) if latencies else None,
+        "rps": round(len(latencies) / sum(latencies), 1) if latencies else None,
+        "queries_per_request": round(statistics.fmean(queries), 2) if queries else None,
+    }
+
+
+# -----------------------
+# Report
+# -----------------------
+
+def git_info():
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def compare(baseline, results):
+    old = {r["scenario"]: r for r in baseline["results"]}
+    lines = []
+    for r in results:
+        b = old.get(r["scenario"])
+        if not b or not b["p50_ms"] or not r["p50_ms"]:
+            continue
+        lines.append(
+            f"{r['scenario']:<16} p50 {b['p50_ms']:>8} -> {r['p50_ms']:>8} ms ({(r['p50_ms'] / b['p50_ms'] - 1) * 100:+.0f}%)"
+            f"   p95 {b['p95_ms']:>8} -> {r['p95_ms']:>8} ms ({(r['p95_ms'] / b['p95_ms'] - 1) * 100:+.0f}%)"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("client", "http"), default="client")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="also write the JSON report to this file")
+    parser.add_argument("--baseline", help="earlier report to compare with (printed to stderr)")
+    parser.add_argument("--note", default="", help="free text stored in the report")
+    args = parser.parse_args()
+
+    transport = ClientTransport() if args.mode == "client" else HttpTransport(args.url)
+
+    # bearer token, in case AUTH_REQUIRED is on
+    status, data, _ = transport.request("POST", "/api/users/login", {"login": BENCH_LOGIN, "password": BENCH_PASSWORD})
+    if status != 200:
+        sys.exit(f"login as {BENCH_LOGIN!r} failed ({status}): seed the database with benchmarks.seed")
+    headers = {"Authorization": f"Bearer {data['access_token']}"} if data.get("access_token") else {}
+
+    dataset = transport.dataset()
+    ctx = {
+        "available_books": available_books(transport, headers),
+        "members": (dataset or {}).get("members") or 500,
+    }
+
+    results = [
+        run_scenario(transport, name, args.requests, args.warmup, args.seed, headers, ctx)
+        for name in args.scenarios
+    ]
+
+    report = {
+        "meta": {
+            **git_info(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            **transport.describe(),
+            "dataset": dataset,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "note": args.note,
+        },
+        "results": results,
+    }
+
+    out = json.dumps(report, indent=2)
+    print(out)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(out + "\n")
+    if args.baseline:
+        with open(args.baseline) as f:
+            print(compare(json.load(f), results), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Synthetic dataset for benchmarks: categorie, auteur, livre, livre_auteur,
+membre, emprunt (+ one login account), bulk-inserted in batches.
+
+  python -m benchmarks.seed --loans 100000 [--seed 42] [--reset]
+
+Scale is driven by --loans (10k .. 10M); the other tables follow:
+books = loans / 10, members = loans / 20, authors = books / 5 (with
+minimums). The same --loans/--seed always produce the same rows, so
+results from benchmarks.run are comparable across commits.
+
+Loans are spread over three years ending on 2026-01-01; the most recent 3%
+are still open, as long as the book has a copy left. livre counters
+(quantite / quantite_totale / nb_en_pret) are consistent with them.
+
+Writes to DATABASE_URL (default: sqlite:///bench.db in the current
+directory). --reset deletes existing rows first.
+"""
+import argparse
+import json
+import os
+import random
+import time
+from datetime import date, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.abspath("bench.db"))
+os.environ.setdefault("SECRET_KEY", "bench-only-secret")
+
+from sqlalchemy import bindparam, delete, func, insert, select, text, update  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models.auteur import Auteur, Livre_Auteur  # noqa: E402
+from app.models.categorie import Categorie  # noqa: E402
+from app.models.emprunt import Emprunt  # noqa: E402
+from app.models.livre import Livre  # noqa: E402
+from app.models.membre import Membre  # noqa: E402
+from app.models.profil import Profil  # noqa: E402
+from app.models.utilisateur import Utilisateur  # noqa: E402
+
+BATCH = 10_000
+END = date(2026, 1, 1)
+SPAN_DAYS = 3 * 365
+OPEN_SHARE = 0.03
+N_CATEGORIES = 50
+
+BENCH_LOGIN = "bench"
+BENCH_PASSWORD = "bench-password"
+
+# titles are built from these so that ?q= has matches
+WORDS = (
+    "histoire monde guerre amour nuit mer ville temps roi jardin voyage secret "
+    "ombre lumière enfant maison science data python réseau système analyse "
+    "programmation algorithme économie philosophie poésie roman musique art"
+).split()
+FIRST_NAMES = "Alice Karim Sofia Yassine Léa Omar Inès Hugo Nora Samir Emma Adam".split()
+LAST_NAMES = "Martin Benali Dubois Haddad Moreau Alaoui Laurent Idrissi Simon Tazi Michel Amrani".split()
+
+
+def sizes(n_loans):
+    books = max(1_000, n_loans // 10)
+    return {
+        "categories": N_CATEGORIES,
+        "authors": max(200, books // 5),
+        "books": books,
+        "members": max(500, n_loans // 20),
+        "loans": n_loans,
+    }
+
+
+def batched(rows, size=BATCH):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bulk(table, rows):
+    n = 0
+    for batch in batched(rows):
+        db.session.execute(insert(table), batch)
+        n += len(batch)
+    return n
+
+
+def reset():
+    for table in (
+        Emprunt.__table__, Utilisateur.__table__, Livre_Auteur, Livre.__table__,
+        Auteur.__table__, Categorie.__table__, Membre.__table__, Profil.__table__,
+    ):
+        db.session.execute(delete(table))
+    db.session.commit()
+
+
+def fix_sequences():
+    """Explicit ids bypass the PostgreSQL identity sequences: move them past max(id)."""
+    if db.engine.dialect.name != "postgresql":
+        return
+    for table, column in (
+        ("categorie", "id_cat"), ("auteur", "id_auteur"), ("livre", "id_livre"),
+        ("membre", "id_mbre"), ("emprunt", "id_emprunt"), ("profil", "id_profil"),
+        ("utilisateur", "id_user"),
+    ):
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), "
+            f"coalesce((SELECT max({column}) FROM {table}), 0) + 1, false)"
+        ))
+
+
+def seed(n_loans, rng_seed=42):
+    n = sizes(n_loans)
+    rng = random.Random(rng_seed)
+    start = END - timedelta(days=SPAN_DAYS)
+
+    bulk(Categorie.__table__, (
+        {"id_cat": i, "nom_cat": f"{WORDS[i % len(WORDS)].capitalize()} {i}", "champ": "bench"}
+        for i in range(1, n["categories"] + 1)
+    ))
+    bulk(Auteur.__table__, (
+        {"id_auteur": i, "nom_auteur": f"{rng.choice(LAST_NAMES)}{i}", "prenom_auteur": rng.choice(FIRST_NAMES)}
+        for i in range(1, n["authors"] + 1)
+    ))
+
+    totals = [0] + [rng.randint(1, 8) for _ in range(n["books"])]  # index = id_livre
+    bulk(Livre.__table__, (
+        {
+            "id_livre": i,
+            "isbn": f"978{i:010d}",
+            "titre": " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))).capitalize(),
+            "quantite": totals[i],
+            "quantite_totale": totals[i],
+            "nb_en_pret": 0,
+            "cat_id": rng.randint(1, n["categories"]),
+        }
+        for i in range(1, n["books"] + 1)
+    ))
+    bulk(Livre_Auteur, (
+        {"livre_id": i, "auteur_id": a}
+        for i in range(1, n["books"] + 1)
+        for a in sorted({rng.randint(1, n["authors"]) for _ in range(rng.randint(1, 3))})
+    ))
+    bulk(Membre.__table__, (
+        {
+            "id_mbre": i,
+            "nom_mbre": rng.choice(LAST_NAMES),
+            "prenom_mbre": rng.choice(FIRST_NAMES),
+            "email_mbre": f"membre{i}@bench.test",
+            "date_adhesion": start - timedelta(days=rng.randint(0, 2000)),
+        }
+        for i in range(1, n["members"] + 1)
+    ))
+
+    # loans in date order; the last OPEN_SHARE are open while copies remain
+    on_loan = {}
+    first_open = int(n_loans * (1 - OPEN_SHARE))
+
+    def loans():
+        for i in range(1, n_loans + 1):
+            livre_id = rng.randint(1, n["books"])
+            d_emprunt = start + timedelta(days=(i - 1) * SPAN_DAYS // n_loans)
+            is_open = i > first_open and on_loan.get(livre_id, 0) < totals[livre_id]
+            if is_open:
+                on_loan[livre_id] = on_loan.get(livre_id, 0) + 1
+            yield {
+                "id_emprunt": i,
+                "livre_id": livre_id,
+                "membre_id": rng.randint(1, n["members"]),
+                "date_emprunt": d_emprunt,
+                "date_retour": None if is_open else d_emprunt + timedelta(days=rng.randint(1, 30)),
+            }
+
+    bulk(Emprunt.__table__, loans())
+
+    t = Livre.__table__
+    for batch in batched({"b_id": k, "b_n": v} for k, v in on_loan.items()):
+        db.session.execute(
+            update(t)
+            .where(t.c.id_livre == bindparam("b_id"))
+            .values(nb_en_pret=bindparam("b_n"), quantite=t.c.quantite_totale - bindparam("b_n")),
+            batch,
+        )
+
+    profil = Profil(id_profil=1, nom_p="ADMIN", description_p="benchmarks")
+    db.session.add(profil)
+    db.session.add(Utilisateur(
+        id_user=1, login=BENCH_LOGIN, password=generate_password_hash(BENCH_PASSWORD),
+        profil_id=1, mbre_id=1,
+    ))
+
+    fix_sequences()
+    db.session.commit()
+    return {**n, "open_loans": sum(on_loan.values()), "seed": rng_seed}
+
+
+def dataset_summary():
+    """Row counts of the seeded tables (stored with every benchmark result)."""
+    counts = {}
+    for name, table in (
+        ("categories", Categorie.__table__), ("authors", Auteur.__table__),
+        ("books", Livre.__table__), ("members", Membre.__table__), ("loans", Emprunt.__table__),
+    ):
+        counts[name] = db.session.execute(select(func.count()).select_from(table)).scalar()
+    counts["open_loans"] = db.session.execute(
+        select(func.count()).select_from(Emprunt.__table__).where(Emprunt.date_retour.is_(None))
+    ).scalar()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loans", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="delete existing rows first")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        if args.reset:
+            reset()
+        started = time.perf_counter()
+        summary = seed(args.loans, args.seed)
+        summary["seconds"] = round(time.perf_counter() - started, 1)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
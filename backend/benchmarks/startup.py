@@ -0,0 +1,213 @@
+"""
+Startup time report: where the import time goes, how long create_app() and
+the first requests take, and (--gunicorn) how fast gunicorn serves its
+first request and how much memory its workers share, with and without
+preload (gunicorn.conf.py, GUNICORN_PRELOAD).
+
+  python -m benchmarks.startup [--repeat 5] [--path /api/books/books?limit=20]
+                               [--gunicorn sync:4] [--out startup.json]
+                               [--baseline old.json]
+
+Every measurement runs in a fresh interpreter (medians over --repeat runs):
+  process_ms        python start -> exit, for the whole script below
+  import_app_ms     from app import create_app
+  create_app_ms     create_app()
+  first_request_ms  first GET --path through app.test_client()
+  second_request_ms the same request again (warm)
+  imports           python -X importtime: total, the heaviest top-level
+                    packages (self time) and app modules (cumulative)
+  gunicorn          per preload setting: ms from spawning gunicorn to the
+                    first 200 on /api/health, and the workers' RSS / PSS
+                    (Linux /proc; PSS counts shared pages once)
+
+Uses DATABASE_URL like the other benchmarks (default sqlite:///bench.db;
+python -m benchmarks.seed first, or --path /api/health).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.abspath("bench.db"))
+os.environ.setdefault("SECRET_KEY", "bench-only-secret")
+
+from benchmarks.load_test import BACKEND_DIR, spawn, wait_ready  # noqa: E402
+from benchmarks.run import git_info  # noqa: E402
+
+PHASES = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+app = create_app()
+t2 = time.perf_counter()
+client = app.test_client()
+status = client.get(sys.argv[1]).status_code
+t3 = time.perf_counter()
+client.get(sys.argv[1])
+t4 = time.perf_counter()
+ms = lambda s: round(s * 1000, 2)
+print(json.dumps({
+    "import_app_ms": ms(t1 - t0), "create_app_ms": ms(t2 - t1),
+    "first_request_ms": ms(t3 - t2), "second_request_ms": ms(t4 - t3), "status": status,
+}))
+"""
+
+
+def run_python(args):
+    return subprocess.run(
+        [sys.executable, *args], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+
+
+# -----------------------
+# In-process phases
+# -----------------------
+
+def phases(path, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = run_python(["-c", PHASES, path])
+        run = json.loads(out.stdout.strip().splitlines()[-1])
+        run["process_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        runs.append(run)
+    result = {key: statistics.median(r[key] for r in runs) for key in runs[0] if key != "status"}
+    result["status"] = runs[-1]["status"]
+    return result
+
+
+def imports(top=12):
+    """python -X importtime breakdown of `from app import create_app; create_app()`."""
+    err = run_python(["-X", "importtime", "-c", "from app import create_app; create_app()"]).stderr
+    by_package, app_modules, total = {}, {}, 0
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = [p.strip() for p in line[len("import time:"):].split("|")]
+        self_us, cumulative_us = int(self_us), int(cumulative_us)
+        total += self_us
+        package = name.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+        if package == "app":
+            app_modules[name] = max(app_modules.get(name, 0), cumulative_us)
+
+    ms = lambda us: round(us / 1000, 1)  # noqa: E731
+    heaviest = sorted(by_package.items(), key=lambda kv: -kv[1])[:top]
+    own = sorted(app_modules.items(), key=lambda kv: -kv[1])[:top]
+    return {
+        "total_ms": ms(total),
+        "packages_ms": {name: ms(us) for name, us in heaviest},
+        "app_modules_cumulative_ms": {name: ms(us) for name, us in own},
+    }
+
+
+# -----------------------
+# gunicorn
+# -----------------------
+
+def _children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def _memory_kb(pid):
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("Rss", "Pss"):
+                    values[key] = int(rest.split()[0])
+    except OSError:
+        pass
+    return values
+
+
+def gunicorn_startup(spec, port, settle):
+    results = []
+    for preload in ("0", "1"):
+        start = time.perf_counter()
+        server = spawn(spec, port, GUNICORN_PRELOAD=preload)
+        try:
+            wait_ready(f"http://127.0.0.1:{port}", interval=0.01)
+            ready_ms = round((time.perf_counter() - start) * 1000, 1)
+            time.sleep(settle)  # let the other workers finish booting
+            workers = [_memory_kb(pid) for pid in _children(server.pid)]
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+        mb = lambda key: round(sum(w.get(key, 0) for w in workers) / 1024, 1) if workers else None  # noqa: E731
+        results.append({
+            "config": spec,
+            "preload": preload == "1",
+            "first_request_ms": ready_ms,
+            "workers": len(workers),
+            "workers_rss_mb": mb("Rss"),
+            "workers_pss_mb": mb("Pss"),
+        })
+    return results
+
+
+# -----------------------
+# Report
+# -----------------------
+
+def compare(baseline, report):
+    lines = []
+    for key, value in report["phases"].items():
+        old = baseline.get("phases", {}).get(key)
+        if isinstance(value, (int, float)) and isinstance(old, (int, float)) and old:
+            lines.append(f"{key:<18} {old:>9} -> {value:>9} ms ({(value / old - 1) * 100:+.0f}%)")
+    old_total = baseline.get("imports", {}).get("total_ms")
+    if old_total:
+        new_total = report["imports"]["total_ms"]
+        lines.append(f"{'imports total':<18} {old_total:>9} -> {new_total:>9} ms ({(new_total / old_total - 1) * 100:+.0f}%)")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--path", default="/api/books/books?limit=20")
+    parser.add_argument("--gunicorn", metavar="CONFIG", help="also time gunicorn, e.g. sync:4 or gthread:2x4")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds before reading worker memory")
+    parser.add_argument("--out", help="also write the JSON report to this file")
+    parser.add_argument("--baseline", help="earlier report to compare with (printed to stderr)")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            **git_info(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "database": os.environ["DATABASE_URL"].split(":", 1)[0],
+            "path": args.path,
+            "repeat": args.repeat,
+        },
+        "phases": phases(args.path, args.repeat),
+        "imports": imports(),
+    }
+    if args.gunicorn:
+        report["gunicorn"] = gunicorn_startup(args.gunicorn, args.port, args.settle)
+
+    out = json.dumps(report, indent=2)
+    print(out)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(out + "\n")
+    if args.baseline:
+        with open(args.baseline) as f:
+            print(compare(json.load(f), report), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
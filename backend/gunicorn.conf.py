@@ -0,0 +1,139 @@
+"""
+Gunicorn settings for production (dockerfile: gunicorn -c gunicorn.conf.py "app:create_app()").
+
+Environment variables:
+  GUNICORN_BIND           default 0.0.0.0:8000
+  GUNICORN_WORKER_CLASS   gthread (default) | sync | gevent
+  WEB_CONCURRENCY         worker processes, default 2 * CPUs + 1 (CPUs of
+                          the container's quota), capped by the
+                          connection budget below
+  GUNICORN_THREADS        threads per gthread worker, default 4
+  GUNICORN_CONNECTIONS    greenlets per gevent worker, default 100
+  GUNICORN_TIMEOUT        default 30 (s)
+  GUNICORN_ACCESS_LOG     default "-" (stdout), empty = off
+  GUNICORN_PRELOAD        1 (default, 0 for gevent): import and build the
+                          app once in the master, then fork the workers
+
+gevent needs `pip install gevent psycogreen` (psycopg2 is made cooperative
+in post_fork).
+
+Every worker has its own SQLAlchemy pool (app/config.py). Unless
+DB_POOL_SIZE is set, it gets one connection per thread (gthread) or a
+fixed 10 (gevent), so a request never waits for a connection held by an
+idle thread, and no overflow (DB_MAX_OVERFLOW=0). With EVENTS_PG_NOTIFY
+each worker also holds a LISTEN connection. All workers together must
+stay below the PostgreSQL max_connections:
+  DB_MAX_CONNECTIONS      the server's max_connections, default 100
+  DB_RESERVED_CONNECTIONS left to migrations, psql, other clients, default 10
+The default worker count is capped to fit; an explicit WEB_CONCURRENCY
+or pool size that does not fit is logged as a warning at startup.
+"""
+import gc
+import math
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read().strip()
+
+
+def cpu_count():
+    """CPUs this container may use: its cgroup quota, else its affinity mask."""
+    try:
+        quota, period = _read("/sys/fs/cgroup/cpu.max").split()  # cgroup v2
+    except (OSError, ValueError):
+        try:  # cgroup v1
+            quota = _read("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+            period = _read("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+        except OSError:
+            quota = period = "max"
+    if quota not in ("max", "-1"):
+        return max(1, math.ceil(int(quota) / int(period)))
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return multiprocessing.cpu_count()
+
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "4")) if worker_class == "gthread" else 1
+worker_connections = int(os.getenv("GUNICORN_CONNECTIONS", "100"))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = 30
+keepalive = 5
+
+# recycle workers now and then (slow leaks, fragmentation)
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-") or None
+errorlog = "-"
+
+# Preload: a worker (and every max_requests replacement) starts as a fork of
+# the loaded master instead of importing Flask/SQLAlchemy and running
+# create_app() again, and the workers share the master's memory pages
+# copy-on-write. The app disposes the inherited engine pools in the child
+# (app/__init__.py). Code changes need a restart (not HUP). Off by default
+# with gevent, which must monkey-patch before the app is imported.
+preload_app = os.getenv(
+    "GUNICORN_PRELOAD", "0" if worker_class == "gevent" else "1"
+).lower() in ("1", "true", "yes")
+if preload_app:
+    # a collection touches (writes to) every tracked object: none before the fork
+    gc.disable()
+
+# read by app/config.py when the app is imported (in each worker)
+if worker_class == "gevent":
+    os.environ.setdefault("DB_POOL_SIZE", "10")
+else:
+    os.environ.setdefault("DB_POOL_SIZE", str(threads))
+os.environ.setdefault("DB_MAX_OVERFLOW", "0")
+
+# connection budget: the pool at its fullest (+ the LISTEN connection)
+connections_per_worker = (
+    int(os.environ["DB_POOL_SIZE"])
+    + int(os.environ["DB_MAX_OVERFLOW"])
+    + (os.getenv("EVENTS_PG_NOTIFY", "0").lower() in ("1", "true", "yes"))
+)
+connection_budget = int(os.getenv("DB_MAX_CONNECTIONS", "100")) - int(os.getenv("DB_RESERVED_CONNECTIONS", "10"))
+if "WEB_CONCURRENCY" in os.environ:
+    workers = int(os.environ["WEB_CONCURRENCY"])
+else:
+    workers = max(1, min(cpu_count() * 2 + 1, connection_budget // connections_per_worker))
+
+# an open /api/events stream holds a thread (gthread) / greenlet (gevent):
+# leave most of them to regular requests; a sync worker would be blocked
+if worker_class == "gevent":
+    os.environ.setdefault("EVENTS_MAX_CLIENTS", str(worker_connections // 2))
+elif worker_class == "gthread":
+    os.environ.setdefault("EVENTS_MAX_CLIENTS", str(threads // 2))
+else:
+    os.environ.setdefault("EVENTS_MAX_CLIENTS", "0")
+
+
+def on_starting(server):
+    if workers * connections_per_worker > connection_budget:
+        server.log.warning(
+            "%d workers x %d connections = %d, above the budget of %d "
+            "(DB_MAX_CONNECTIONS - DB_RESERVED_CONNECTIONS): requests will fail "
+            "with 'too many clients' under load",
+            workers, connections_per_worker, workers * connections_per_worker, connection_budget,
+        )
+
+
+def when_ready(server):
+    # after the preload, before the first fork: move everything loaded so far
+    # out of the collector's reach so the workers keep sharing those pages
+    if preload_app:
+        gc.freeze()
+        gc.enable()
+
+
+def post_fork(server, worker):
+    if worker_class == "gevent":
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
@@ -0,0 +1,33 @@
+"""revoked tokens
+
+Logged-out and rotated tokens, shared by all workers (app/auth.py).
+
+Revision ID: 07f8b9e38961
+Revises: c6fcfd2a4914
+Create Date: 2026-10-18 03:27:14.742643
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '07f8b9e38961'
+down_revision = 'c6fcfd2a4914'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "revoked_token",
+        sa.Column("jti", sa.String(32), primary_key=True),
+        sa.Column("kind", sa.String(8), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_revoked_token_kind_expires", "revoked_token", ["kind", "expires_at"])
+
+
+def downgrade():
+    op.drop_index("ix_revoked_token_kind_expires", table_name="revoked_token")
+    op.drop_table("revoked_token")
@@ -0,0 +1,76 @@
+"""book search index
+
+Full-text + trigram search for the book catalogue (PostgreSQL only).
+The tables themselves come from library_management_db.sql.
+
+Revision ID: 3d6deb4b84cf
+Revises: 
+Create Date: 2026-10-18 02:32:22.771294
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3d6deb4b84cf'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # books of the matching authors
+    op.create_index("ix_livre_auteur_auteur_id", "livre_auteur", ["auteur_id"])
+
+    # SQLite (local runs) keeps the ILIKE fallback in app/search.py
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.execute(
+        "ALTER TABLE livre ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "to_tsvector('simple'::regconfig, coalesce(titre, '') || ' ' || coalesce(isbn, ''))"
+        ") STORED"
+    )
+    op.execute(
+        "ALTER TABLE auteur ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "to_tsvector('simple'::regconfig, coalesce(nom_auteur, '') || ' ' || coalesce(prenom_auteur, ''))"
+        ") STORED"
+    )
+
+    op.create_index("ix_livre_search_vector", "livre", ["search_vector"], postgresql_using="gin")
+    op.create_index("ix_auteur_search_vector", "auteur", ["search_vector"], postgresql_using="gin")
+
+    # substring (ILIKE '%q%') matches
+    for table, column in (
+        ("livre", "titre"),
+        ("livre", "isbn"),
+        ("auteur", "nom_auteur"),
+        ("auteur", "prenom_auteur"),
+    ):
+        op.create_index(
+            f"ix_{table}_{column}_trgm", table, [column],
+            postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"},
+        )
+
+
+def downgrade():
+    op.drop_index("ix_livre_auteur_auteur_id", table_name="livre_auteur")
+
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    for table, column in (
+        ("livre", "titre"),
+        ("livre", "isbn"),
+        ("auteur", "nom_auteur"),
+        ("auteur", "prenom_auteur"),
+    ):
+        op.drop_index(f"ix_{table}_{column}_trgm", table_name=table)
+
+    op.drop_index("ix_auteur_search_vector", table_name="auteur")
+    op.drop_index("ix_livre_search_vector", table_name="livre")
+    op.drop_column("auteur", "search_vector")
+    op.drop_column("livre", "search_vector")
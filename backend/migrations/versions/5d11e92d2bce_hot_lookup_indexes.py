@@ -0,0 +1,43 @@
+"""hot lookup indexes
+
+Revision ID: 5d11e92d2bce
+Revises: 3d6deb4b84cf
+Create Date: 2026-10-18 02:33:06.581901
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d11e92d2bce'
+down_revision = '3d6deb4b84cf'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # loan history of a member / a book (keyset on date_emprunt, id_emprunt);
+    # also serve the plain membre_id / livre_id lookups
+    op.create_index("ix_emprunt_membre_date", "emprunt", ["membre_id", "date_emprunt", "id_emprunt"])
+    op.create_index("ix_emprunt_livre_date", "emprunt", ["livre_id", "date_emprunt", "id_emprunt"])
+    op.create_index(
+        "ix_emprunt_ouverts", "emprunt", ["livre_id"],
+        postgresql_where=sa.text("date_retour IS NULL"),
+        sqlite_where=sa.text("date_retour IS NULL"),
+    )
+    op.create_index("ix_livre_cat_id", "livre", ["cat_id"])
+    op.create_index("ix_livre_isbn", "livre", ["isbn"])
+    op.create_index("ix_membre_email_mbre", "membre", ["email_mbre"])
+    # fails if duplicate logins already exist: clean them up first
+    op.create_index("ix_utilisateur_login", "utilisateur", ["login"], unique=True)
+
+
+def downgrade():
+    op.drop_index("ix_utilisateur_login", table_name="utilisateur")
+    op.drop_index("ix_membre_email_mbre", table_name="membre")
+    op.drop_index("ix_livre_isbn", table_name="livre")
+    op.drop_index("ix_livre_cat_id", table_name="livre")
+    op.drop_index("ix_emprunt_ouverts", table_name="emprunt")
+    op.drop_index("ix_emprunt_livre_date", table_name="emprunt")
+    op.drop_index("ix_emprunt_membre_date", table_name="emprunt")
@@ -0,0 +1,46 @@
+"""book availability counters
+
+livre.quantite_totale (copies owned) and livre.nb_en_pret (open loans),
+backfilled from the open loans; livre.quantite stays the shelf count.
+
+Revision ID: bc10e8156ea4
+Revises: f3209c7c8690
+Create Date: 2026-10-18 02:43:12.759005
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bc10e8156ea4'
+down_revision = 'f3209c7c8690'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("livre", sa.Column("quantite_totale", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("livre", sa.Column("nb_en_pret", sa.Integer(), nullable=False, server_default="0"))
+
+    op.execute(
+        "UPDATE livre SET nb_en_pret = ("
+        "SELECT count(*) FROM emprunt"
+        " WHERE emprunt.livre_id = livre.id_livre AND emprunt.date_retour IS NULL"
+        ")"
+    )
+    op.execute("UPDATE livre SET quantite = coalesce(quantite, 0)")
+    op.execute("UPDATE livre SET quantite_totale = quantite + nb_en_pret")
+
+    op.create_index(
+        "ix_livre_disponibles", "livre", ["id_livre"],
+        postgresql_where=sa.text("quantite > 0"),
+        sqlite_where=sa.text("quantite > 0"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_livre_disponibles", table_name="livre")
+    with op.batch_alter_table("livre") as batch:
+        batch.drop_column("nb_en_pret")
+        batch.drop_column("quantite_totale")
@@ -0,0 +1,44 @@
+"""change feed
+
+change_log (GET /api/changes) and its compaction watermark.
+
+Revision ID: c6fcfd2a4914
+Revises: bc10e8156ea4
+Create Date: 2026-10-18 02:56:24.572667
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6fcfd2a4914'
+down_revision = 'bc10e8156ea4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "change_log",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), primary_key=True),
+        sa.Column("seq", sa.BigInteger()),
+        sa.Column("table_name", sa.String(64), nullable=False),
+        sa.Column("row_id", sa.Integer()),
+        sa.Column("op", sa.String(8), nullable=False),
+        sa.Column("changed_at", sa.DateTime(), nullable=False),
+        sqlite_autoincrement=True,
+    )
+    op.create_index("ix_change_log_seq", "change_log", ["seq"], unique=True)
+    op.create_table(
+        "change_log_horizon",
+        sa.Column("nom", sa.String(64), primary_key=True),
+        sa.Column("purged_seq", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("date_maj", sa.DateTime()),
+    )
+
+
+def downgrade():
+    op.drop_table("change_log_horizon")
+    op.drop_index("ix_change_log_seq", table_name="change_log")
+    op.drop_table("change_log")
@@ -0,0 +1,28 @@
+"""table version counters
+
+Revision ID: e4d941c3154a
+Revises: 5d11e92d2bce
+Create Date: 2026-10-18 02:37:17.282698
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4d941c3154a'
+down_revision = '5d11e92d2bce'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "table_version",
+        sa.Column("table_name", sa.String(64), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade():
+    op.drop_table("table_version")
@@ -0,0 +1,47 @@
+"""loan stats summary
+
+Revision ID: f3209c7c8690
+Revises: e4d941c3154a
+Create Date: 2026-10-18 02:40:29.102794
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3209c7c8690'
+down_revision = 'e4d941c3154a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_emprunt_date_emprunt", "emprunt", ["date_emprunt"])
+
+    op.create_table(
+        "emprunt_stat",
+        sa.Column("jour", sa.Date(), primary_key=True),
+        sa.Column("livre_id", sa.Integer(), sa.ForeignKey("livre.id_livre"), primary_key=True),
+        sa.Column("nb_emprunts", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_table(
+        "emprunt_stat_dirty",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("jour", sa.Date()),
+        sa.Column("livre_id", sa.Integer()),
+    )
+    # dernier_seq: change_log seq (app/stats.py), NULL until the first refresh
+    op.create_table(
+        "stat_refresh",
+        sa.Column("nom", sa.String(64), primary_key=True),
+        sa.Column("dernier_seq", sa.BigInteger()),
+        sa.Column("date_maj", sa.DateTime()),
+    )
+
+
+def downgrade():
+    op.drop_table("stat_refresh")
+    op.drop_table("emprunt_stat_dirty")
+    op.drop_table("emprunt_stat")
+    op.drop_index("ix_emprunt_date_emprunt", table_name="emprunt")
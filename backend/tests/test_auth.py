@@ -0,0 +1,107 @@
+import threading
+import time
+
+import click
+import pytest
+
+from app import auth, create_app
+from app.config import Config
+
+THREADS = 8
+
+
+def test_app_refuses_to_start_without_secret_key(monkeypatch):
+    monkeypatch.setattr(Config, "SECRET_KEY", None)
+    monkeypatch.delenv("FLASK_DEBUG", raising=False)
+    with pytest.raises(RuntimeError, match="SECRET_KEY"):
+        create_app()
+
+
+def test_debug_app_gets_a_random_secret_key(monkeypatch):
+    monkeypatch.setattr(Config, "SECRET_KEY", None)
+    monkeypatch.setenv("FLASK_DEBUG", "1")
+    keys = {create_app().config["SECRET_KEY"] for _ in range(2)}
+    assert len(keys) == 2 and None not in keys
+
+
+def refresh(client, token):
+    return client.post("/api/users/refresh", json={"refresh_token": token})
+
+
+def test_refresh_token_rotates_once(app, client, seed):
+    seed(1)
+    token = auth.issue_pair(1)["refresh_token"]
+    assert refresh(client, token).status_code == 200
+    resp = refresh(client, token)
+    assert (resp.status_code, resp.json["error"]) == (401, "token revoked")
+
+
+def test_refresh_token_used_on_other_worker_is_revoked(app, client, other_worker, seed):
+    seed(1)
+    token = auth.issue_pair(1)["refresh_token"]
+    assert refresh(other_worker, token).status_code == 200
+    assert refresh(client, token).status_code == 401
+
+
+def test_concurrent_refreshes_issue_one_pair(app, seed):
+    seed(1)
+    token = auth.issue_pair(1)["refresh_token"]
+    barrier = threading.Barrier(THREADS)
+    statuses = []
+
+    def worker():
+        client = app.test_client()
+        barrier.wait()
+        statuses.append(refresh(client, token).status_code)
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(statuses) == [200] + [401] * (THREADS - 1)
+
+
+def test_logout_revokes_refresh_token_for_all_workers(app, client, other_worker, seed):
+    seed(1)
+    pair = auth.issue_pair(1)
+    resp = client.post(
+        "/api/users/logout",
+        json={"refresh_token": pair["refresh_token"]},
+        headers={"Authorization": f"Bearer {pair['access_token']}"},
+    )
+    assert resp.status_code == 200
+    assert refresh(other_worker, pair["refresh_token"]).status_code == 401
+
+
+def test_logout_reaches_other_workers(app, client, seed, monkeypatch, request):
+    monkeypatch.setattr(Config, "AUTH_REVOKED_SYNC", 0)
+    other_worker = request.getfixturevalue("other_worker")
+    seed(1)
+    bearer = {"Authorization": f"Bearer {auth.issue_pair(1)['access_token']}"}
+    assert other_worker.get("/api/users/me", headers=bearer).status_code == 200
+
+    assert client.post("/api/users/logout", headers=bearer).status_code == 200
+    resp = other_worker.get("/api/users/me", headers=bearer)
+    assert (resp.status_code, resp.json["error"]) == (401, "token revoked")
+
+
+def test_revocations_reload_after_the_sync_delay(app, seed):
+    seed(1)
+    revocations = auth.Revocations(sync=60)
+    assert not revocations.is_revoked("a" * 32)
+    assert auth.claim(auth.ACCESS, "a" * 32, time.time() + 60)
+    assert not revocations.is_revoked("a" * 32)  # loaded less than 60 s ago
+    revocations.sync = 0
+    assert revocations.is_revoked("a" * 32)
+
+
+def test_flask_run_refuses_to_start_without_secret_key(monkeypatch):
+    monkeypatch.setattr(Config, "SECRET_KEY", None)
+    monkeypatch.delenv("FLASK_DEBUG", raising=False)
+    with click.Context(click.Command("run"), info_name="run"):
+        with pytest.raises(RuntimeError, match="SECRET_KEY"):
+            create_app()
+    # other commands issue no token
+    with click.Context(click.Command("upgrade"), info_name="upgrade"):
+        assert create_app().config["SECRET_KEY"] is None
@@ -0,0 +1,54 @@
+"""
+`client` and `other_worker` stand for two gunicorn workers, each with its
+own in-process cache: a write on one must be seen by the other.
+"""
+import pytest
+
+
+def test_new_category_is_known_to_other_workers(client, other_worker, seed):
+    seed(1)
+    book = {"titre": "T", "quantite": 1, "cat_id": 4}
+    assert other_worker.post("/api/books/books", json=book).status_code == 400
+
+    assert client.post("/api/books/categories", json={"nom_cat": "Nouvelle"}).json["id_cat"] == 4
+    assert other_worker.post("/api/books/books", json=book).status_code == 201
+
+
+def test_deleted_category_is_unknown_to_other_workers(client, other_worker, seed):
+    seed(1)
+    cat_id = client.post("/api/books/categories", json={"nom_cat": "Éphémère"}).json["id_cat"]
+    # checks (and caches) the category, then fails on the author
+    resp = other_worker.post("/api/books/books", json={"titre": "T", "cat_id": cat_id, "auteur_ids": [99]})
+    assert resp.json["error"] == "Some auteur_ids do not exist"
+
+    assert client.delete(f"/api/books/categories/{cat_id}").status_code == 200
+    resp = other_worker.post("/api/books/books", json={"titre": "T", "cat_id": cat_id})
+    assert (resp.status_code, resp.json["error"]) == (400, "cat_id does not exist")
+
+
+def test_new_profil_is_known_to_other_workers(client, other_worker, seed):
+    seed(1)
+    account = {"login": "nouveau", "password": "secret", "profil_id": 2}
+    assert other_worker.post("/api/users/accounts", json=account).status_code == 400
+
+    assert client.post("/api/users/profils", json={"nom_p": "LECTEUR"}).json["id_profil"] == 2
+    assert other_worker.post("/api/users/accounts", json=account).status_code == 201
+
+
+@pytest.mark.parametrize("url, create", [
+    ("/api/books/categories", ("/api/books/categories", {"nom_cat": "Nouvelle"})),
+    ("/api/books/authors", ("/api/books/authors", {"nom_auteur": "Sand", "prenom_auteur": "George"})),
+    ("/api/users/profils", ("/api/users/profils", {"nom_p": "LECTEUR"})),
+])
+def test_cached_list_follows_writes_of_other_workers(client, other_worker, seed, url, create):
+    seed(1)
+    before = other_worker.get(url)
+    assert len(before.json) == len(other_worker.get(url).json)  # now cached
+
+    assert client.post(create[0], json=create[1]).status_code == 201
+    after = other_worker.get(url, headers={"If-None-Match": before.headers["ETag"]})
+    assert after.status_code == 200
+    assert len(after.json) == len(before.json) + 1
+    # the new ETag goes with the new body
+    assert after.headers["ETag"] == client.get(url).headers["ETag"]
+    assert other_worker.get(url, headers={"If-None-Match": after.headers["ETag"]}).status_code == 304
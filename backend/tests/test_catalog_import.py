@@ -0,0 +1,71 @@
+import io
+import json
+
+import pytest
+
+from sqlalchemy.exc import OperationalError
+
+from app.catalog_import import CatalogImporter, import_catalog
+from app.models.livre import Livre
+
+
+def ndjson(*records):
+    return io.StringIO("\n".join(json.dumps(r) for r in records) + "\n")
+
+
+def book(titre, isbn, nom_cat="Roman"):
+    return {"titre": titre, "isbn": isbn, "nom_cat": nom_cat,
+            "auteurs": [{"nom_auteur": "Hugo", "prenom_auteur": "Victor"}]}
+
+
+def test_rejected_chunk_does_not_mark_its_isbns_as_seen(app, monkeypatch):
+    create_authors = CatalogImporter.create_authors
+    calls = []
+
+    def failing_once(self, records):
+        calls.append(len(records))
+        if len(calls) == 1:
+            raise OperationalError("INSERT", {}, Exception("connection lost"))
+        return create_authors(self, records)
+
+    monkeypatch.setattr(CatalogImporter, "create_authors", failing_once)
+    report = import_catalog(
+        ndjson(book("A", "111"), book("B", "222"), book("A again", "111"), book("B again", "222")),
+        "ndjson", chunk_size=2,
+    )
+
+    assert [e["line"] for e in report["errors"]] == [1, 2]
+    assert all("rejected" in e["error"] for e in report["errors"])
+    assert report["books_created"] == 2
+    # counted once, for the chunk that was committed
+    assert report["categories_created"] == 1
+    assert report["authors_created"] == 1
+    assert sorted(b.titre for b in Livre.query.all()) == ["A again", "B again"]
+
+
+def test_duplicate_isbns_in_file_and_in_chunk(app):
+    report = import_catalog(
+        ndjson(book("A", "111"), book("A twice", "111"), book("C", "333"), book("A thrice", "111")),
+        "ndjson", chunk_size=3,
+    )
+    assert report["books_created"] == 2
+    assert [(e["line"], e["error"]) for e in report["errors"]] == [
+        (2, "duplicate isbn 111"), (4, "duplicate isbn 111"),
+    ]
+
+
+def test_reimport_is_not_a_client_error(client):
+    body = ndjson(book("A", "111"), book("B", "222")).getvalue()
+    first = client.post("/api/books/import", data=body, content_type="application/x-ndjson")
+    assert (first.status_code, first.json["books_created"]) == (201, 2)
+
+    again = client.post("/api/books/import", data=body, content_type="application/x-ndjson")
+    assert (again.status_code, again.json["books_created"]) == (200, 0)
+    assert [e["error"] for e in again.json["errors"]] == ["duplicate isbn 111", "duplicate isbn 222"]
+
+
+@pytest.mark.parametrize("body", ["", "not json\n{also not json\n", json.dumps({"isbn": "1"}) + "\n"])
+def test_unreadable_import_is_a_client_error(client, body):
+    resp = client.post("/api/books/import", data=body, content_type="application/x-ndjson")
+    assert resp.status_code == 400
+    assert resp.json["books_created"] == 0
@@ -0,0 +1,69 @@
+from datetime import date, datetime
+
+from sqlalchemy import insert, select
+
+from app import changes
+from app.changes import head, sequence
+from app.extensions import db
+from app.models.change_log import ChangeLog
+from app.models.emprunt import Emprunt
+
+
+def entries(table):
+    return db.session.execute(
+        select(ChangeLog.row_id, ChangeLog.op).where(ChangeLog.table_name == table).order_by(ChangeLog.id)
+    ).all()
+
+
+def test_entries_are_numbered_after_the_commit(client, seed):
+    seed(1)
+    since = head()
+    cat_id = client.post("/api/books/categories", json={"nom_cat": "Nouvelle"}).json["id_cat"]
+    items = client.get(f"/api/changes?since={since}").json["items"]
+    assert [(c["table"], c["id"], c["op"]) for c in items] == [("categorie", cat_id, "insert")]
+    assert db.session.execute(select(ChangeLog).where(ChangeLog.seq.is_(None))).first() is None
+
+
+def test_late_entry_is_numbered_after_the_head(client, seed):
+    seed(1)
+    client.post("/api/books/categories", json={"nom_cat": "Nouvelle"})
+    seen = head()
+    # an entry with an early id whose writer committed late and died before numbering it
+    db.session.execute(insert(ChangeLog).values(
+        id=0, table_name="membre", row_id=1, op="update", changed_at=datetime(2026, 1, 1),
+    ))
+    db.session.commit()
+
+    # numbered by the next writer, above what readers have already seen
+    resp = client.get(f"/api/changes?since={seen}")
+    client.post("/api/books/categories", json={"nom_cat": "Autre"})
+    resp = client.get(f"/api/changes?since={seen}", headers={"If-None-Match": resp.headers["ETag"]})
+    assert resp.status_code == 200
+    assert [c["table"] for c in resp.json["items"]] == ["membre", "categorie"]
+    assert sequence() == 0
+
+
+def loans(first_id, n):
+    return [
+        {"id_emprunt": first_id + i, "livre_id": 1, "membre_id": 1, "date_emprunt": date(2026, 1, 5)}
+        for i in range(n)
+    ]
+
+
+def test_small_bulk_insert_names_its_rows(app, seed):
+    seed(1)
+    db.session.execute(insert(Emprunt), loans(100, 3))
+    db.session.commit()
+    assert entries("emprunt")[-3:] == [(100, "insert"), (101, "insert"), (102, "insert")]
+
+
+def test_large_bulk_insert_logs_one_reset(app, seed, monkeypatch):
+    monkeypatch.setattr(changes, "MAX_ROWS", 50)
+    seed(1)
+    before = len(entries("emprunt"))
+    # batches of one commit add up: 3 x 20 > 50
+    for first_id in (100, 200, 300):
+        db.session.execute(insert(Emprunt), loans(first_id, 20))
+    db.session.execute(insert(Emprunt), loans(400, 60))
+    db.session.commit()
+    assert entries("emprunt")[before:] == [(None, "reset")]
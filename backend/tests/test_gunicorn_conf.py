@@ -0,0 +1,40 @@
+"""gunicorn.conf.py keeps all workers' pools within PostgreSQL's max_connections."""
+import logging
+import os
+import runpy
+from pathlib import Path
+from types import SimpleNamespace
+
+CONF = str(Path(__file__).parent.parent / "gunicorn.conf.py")
+
+
+def load(monkeypatch, **env):
+    # no preload: it would turn the collector off in the test process
+    monkeypatch.setattr(os, "environ", {"GUNICORN_PRELOAD": "0", **env})
+    return runpy.run_path(CONF)
+
+
+def test_default_workers_fit_the_connection_budget(monkeypatch):
+    conf = load(monkeypatch, DB_MAX_CONNECTIONS="30")
+    assert os.environ["DB_MAX_OVERFLOW"] == "0"
+    assert conf["connections_per_worker"] == 4
+    assert 1 <= conf["workers"] <= 5  # (30 - 10) // 4
+
+
+def test_default_workers_follow_the_cpus(monkeypatch):
+    conf = load(monkeypatch)
+    assert conf["workers"] == min(conf["cpu_count"]() * 2 + 1, 90 // 4)
+
+
+def test_listen_connection_counts(monkeypatch):
+    conf = load(monkeypatch, EVENTS_PG_NOTIFY="1", GUNICORN_THREADS="8")
+    assert conf["connections_per_worker"] == 9
+
+
+def test_explicit_settings_over_budget_warn(monkeypatch, caplog):
+    conf = load(monkeypatch, WEB_CONCURRENCY="9", DB_POOL_SIZE="4", DB_MAX_OVERFLOW="10")
+    assert conf["workers"] == 9
+    server = SimpleNamespace(log=logging.getLogger("gunicorn.error"))
+    with caplog.at_level(logging.WARNING):
+        conf["on_starting"](server)
+    assert "9 workers x 14 connections = 126, above the budget of 90" in caplog.text
@@ -0,0 +1,113 @@
+"""
+The filtered list queries must use the indexes declared on the models
+(ix_* in app/models, shipped by the migrations): the SQL an endpoint
+actually sends is captured and run through EXPLAIN (QUERY PLAN).
+
+PostgreSQL prefers a sequential scan on tables this small, so the
+PostgreSQL variant turns enable_seqscan off: the test checks that the
+index can serve the query, not the planner's cost estimates.
+"""
+import importlib.util
+import re
+from pathlib import Path
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import event
+
+from app.extensions import db
+from app.stock import find_drift
+
+CASES = [
+    # (id, call, table the statement reads, index it must use)
+    ("books-by-category", lambda c: c.get("/api/books/books?catId=2"), "livre", "ix_livre_cat_id"),
+    ("books-available", lambda c: c.get("/api/books/books?available=true"), "livre", "ix_livre_disponibles"),
+    ("member-loans", lambda c: c.get("/api/users/members/3/loans"), "emprunt", "ix_emprunt_membre_date"),
+    ("book-loans", lambda c: c.get("/api/books/books/3/loans"), "emprunt", "ix_emprunt_livre_date"),
+    ("login", lambda c: c.post("/api/users/login", json={"login": "user3", "password": "?"}),
+     "utilisateur", "ix_utilisateur_login"),
+    ("open-loans", lambda c: find_drift(), "emprunt", "ix_emprunt_ouverts"),
+]
+
+
+def captured_select(call, client, table):
+    """(statement, parameters) of the first SELECT reading `table` sent by call(client)."""
+    seen = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        seen.append((statement, parameters))
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        call(client)
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+
+    pattern = re.compile(rf"\bFROM\s+{table}\b", re.IGNORECASE)
+    for statement, parameters in seen:
+        if statement.lstrip().upper().startswith("SELECT") and pattern.search(statement):
+            return statement, parameters
+    raise AssertionError(f"no SELECT on {table} in {[s for s, _ in seen]}")
+
+
+def query_plan(statement, parameters) -> str:
+    with db.engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            rows = conn.exec_driver_sql("EXPLAIN " + statement, parameters).all()
+        else:
+            rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+        conn.rollback()
+    return "\n".join(str(r[-1]) for r in rows)
+
+
+def check_index_used(client, seed, call, table, index):
+    seed(30)
+    db.session.remove()
+    statement, parameters = captured_select(call, client, table)
+    plan = query_plan(statement, parameters)
+    assert index in plan, f"{index} not used:\n{statement}\n{plan}"
+
+
+@pytest.mark.parametrize("call, table, index", [c[1:] for c in CASES], ids=[c[0] for c in CASES])
+def test_sqlite_query_plan_uses_index(app, client, seed, call, table, index):
+    if db.engine.dialect.name != "sqlite":
+        pytest.skip("SQLite only (TEST_DATABASE_URL is set)")
+    check_index_used(client, seed, call, table, index)
+
+
+@pytest.mark.parametrize("call, table, index", [c[1:] for c in CASES], ids=[c[0] for c in CASES])
+def test_postgresql_query_plan_uses_index(app, client, seed, call, table, index):
+    if db.engine.dialect.name != "postgresql":
+        pytest.skip("needs TEST_DATABASE_URL=postgresql://...")
+    check_index_used(client, seed, call, table, index)
+
+
+def apply_search_migration():
+    """The search columns and indexes only exist through their migration, not create_all."""
+    path = Path(__file__).parents[1] / "migrations/versions/3d6deb4b84cf_book_search_index.py"
+    spec = importlib.util.spec_from_file_location("book_search_index", path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+
+    with db.engine.begin() as conn:
+        # already created with the model
+        conn.exec_driver_sql("DROP INDEX ix_livre_auteur_auteur_id")
+        with Operations.context(MigrationContext.configure(conn)):
+            migration.upgrade()
+
+
+def test_postgresql_search_uses_indexes(app, client, seed):
+    if db.engine.dialect.name != "postgresql":
+        pytest.skip("needs TEST_DATABASE_URL=postgresql://...")
+    apply_search_migration()
+    seed(30)
+    db.session.remove()
+
+    statement, parameters = captured_select(lambda c: c.get("/api/books/books?q=Nom1"), client, "livre")
+    plan = query_plan(statement, parameters)
+    assert "Seq Scan" not in plan, f"search scans a table:\n{statement}\n{plan}"
+    for index in ("ix_livre_search_vector", "ix_auteur_search_vector"):
+        assert index in plan, f"{index} not used:\n{statement}\n{plan}"
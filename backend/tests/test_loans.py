@@ -0,0 +1,130 @@
+from datetime import date
+
+import pytest
+
+from app.extensions import db
+from app.models.emprunt import Emprunt
+from app.models.livre import Livre
+from app.stock import find_drift
+
+
+@pytest.mark.parametrize("atomic", ["false", "0", 1, None])
+def test_bulk_atomic_must_be_a_boolean(client, seed, atomic):
+    seed(2)
+    resp = client.post("/api/loans/bulk", json={
+        "atomic": atomic,
+        "loans": [{"livre_id": 1, "membre_id": 1, "date_emprunt": "2026-01-05"}],
+    })
+    assert resp.status_code == 400
+    assert "atomic" in resp.json["error"]
+    assert db.session.get(Livre, 1).nb_en_pret == 0
+
+
+def test_bulk_rejects_boolean_ids(client, seed):
+    seed(2)
+    resp = client.post("/api/loans/bulk", json={
+        "loans": [
+            {"livre_id": True, "membre_id": 1, "date_emprunt": "2026-01-05"},
+            {"livre_id": 2, "membre_id": 2, "date_emprunt": "2026-01-05"},
+        ],
+    })
+    assert resp.status_code == 201
+    assert [e["index"] for e in resp.json["errors"]] == [0]
+    assert len(resp.json["created"]) == 1
+
+
+@pytest.mark.parametrize("ids", [[True], [1, False], ["1"], "1,2"])
+def test_return_rejects_non_integer_ids(client, seed, ids):
+    seed(2)
+    resp = client.post("/api/loans/return", json={"ids": ids})
+    assert resp.status_code == 400
+
+
+def stock(livre_id):
+    db.session.remove()
+    livre = db.session.get(Livre, livre_id)
+    return livre.quantite, livre.nb_en_pret
+
+
+def open_loan(client, livre_id=1, membre_id=1):
+    resp = client.post("/api/loans/", json={"livre_id": livre_id, "membre_id": membre_id, "date_emprunt": "2026-01-05"})
+    assert resp.status_code == 201
+    return resp.json["id_emprunt"]
+
+
+def test_put_closing_and_reopening_a_loan_moves_stock(client, seed):
+    seed(2, copies=1)
+    loan = open_loan(client)
+    assert stock(1) == (0, 1)
+
+    assert client.put(f"/api/loans/{loan}", json={"date_retour": "2026-01-10"}).status_code == 200
+    assert stock(1) == (1, 0)
+    # closing it again (other date) gives nothing back twice
+    assert client.put(f"/api/loans/{loan}", json={"date_retour": "2026-01-11"}).status_code == 200
+    assert stock(1) == (1, 0)
+
+    assert client.put(f"/api/loans/{loan}", json={"date_retour": None}).status_code == 200
+    assert stock(1) == (0, 1)
+    assert db.session.get(Emprunt, loan).date_retour is None
+    assert find_drift() == []
+
+
+def test_put_moving_an_open_loan_to_another_book(client, seed):
+    seed(2, copies=1)
+    loan = open_loan(client, livre_id=1)
+
+    assert client.put(f"/api/loans/{loan}", json={"livre_id": 2}).status_code == 200
+    assert stock(1) == (1, 0)
+    assert stock(2) == (0, 1)
+
+    # book 2 has no copy left for a second loan moved onto it
+    other = open_loan(client, livre_id=1, membre_id=2)
+    resp = client.put(f"/api/loans/{other}", json={"livre_id": 2})
+    assert (resp.status_code, resp.json["error"]) == (400, "Aucune quantité disponible pour ce livre")
+    assert db.session.get(Emprunt, other).livre_id == 1
+    assert find_drift() == []
+
+
+def test_put_reopen_without_stock_is_rejected(client, seed):
+    seed(2, copies=1)
+    closed = 1  # seeded loans are returned
+    open_loan(client, livre_id=1, membre_id=2)
+
+    resp = client.put(f"/api/loans/{closed}", json={"date_retour": ""})
+    assert resp.status_code == 400
+    assert db.session.get(Emprunt, closed).date_retour is not None
+    assert stock(1) == (0, 1)
+    assert find_drift() == []
+
+
+def test_put_closing_and_moving_returns_the_old_copy(client, seed):
+    seed(2, copies=1)
+    loan = open_loan(client, livre_id=1)
+
+    resp = client.put(f"/api/loans/{loan}", json={"livre_id": 2, "date_retour": "2026-01-10"})
+    assert resp.status_code == 200
+    assert stock(1) == (1, 0)
+    assert stock(2) == (1, 0)
+    assert find_drift() == []
+
+
+def test_history_pages_skip_undated_loans(client, seed):
+    seed(3)
+    db.session.add_all([
+        Emprunt(livre_id=2, membre_id=1, date_emprunt=date(2024, 3, 1)),
+        Emprunt(livre_id=3, membre_id=1, date_emprunt=None),
+        Emprunt(livre_id=3, membre_id=1, date_emprunt=date(2024, 2, 1)),
+    ])
+    db.session.commit()
+
+    ids, after = [], ""
+    while True:
+        page = client.get(f"/api/users/members/1/loans?limit=1&after={after}").json
+        ids += [item["id_emprunt"] for item in page["items"]]
+        if page["next_cursor"] is None:
+            break
+        after = page["next_cursor"]
+
+    # newest first, the same loans as the unpaged list
+    assert ids == [4, 6, 1]
+    assert [item["id_emprunt"] for item in client.get("/api/users/members/1/loans").json] == ids
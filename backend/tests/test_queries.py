@@ -0,0 +1,47 @@
+"""
+N+1 guard: the number of SQL statements a list endpoint sends must not grow
+with the number of rows it returns (relationships are eager-loaded or
+fetched with one IN (...) per relation).
+"""
+import pytest
+
+from app.extensions import db
+
+URLS = (
+    "/api/books/books?limit=500",
+    "/api/books/books/1",
+    "/api/books/categories",
+    "/api/books/authors",
+    "/api/books/books/1/loans",
+    "/api/users/members?limit=500",
+    "/api/users/members/1/loans",
+    "/api/users/accounts?limit=500",
+    "/api/users/profils",
+    "/api/loans/?limit=500",
+)
+
+
+def statements_per_url(make_app, seed, count_statements, n):
+    app = make_app()
+    client = app.test_client()
+    with app.app_context():
+        seed(n)
+        db.session.remove()
+        counts = {}
+        for url in URLS:
+            resp, counts[url] = count_statements(lambda: client.get(url))
+            assert resp.status_code == 200, url
+        return counts
+
+
+def test_statement_count_does_not_grow_with_rows(make_app, seed, count_statements):
+    small = statements_per_url(make_app, seed, count_statements, 3)
+    large = statements_per_url(make_app, seed, count_statements, 40)
+    assert large == small
+
+
+@pytest.mark.parametrize("url", ["/api/books/books?limit=500", "/api/loans/?limit=500"])
+def test_list_statement_budget(make_app, seed, count_statements, url):
+    counts = statements_per_url(make_app, seed, count_statements, 40)
+    # ETag versions + page (+ one IN (...) per nested relation)
+    assert counts[url] <= 4
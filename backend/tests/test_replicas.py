@@ -0,0 +1,46 @@
+"""
+Read-your-writes through a replica that never catches up: an empty SQLite
+file stands for a lagging replica.
+"""
+import pytest
+
+from app.config import Config
+from app.extensions import db
+from app.replicas import PIN_HEADER
+
+MEMBER = {"nom_mbre": "Curie", "prenom_mbre": "Marie", "email_mbre": "marie@example.org"}
+
+
+@pytest.fixture
+def client(make_app, monkeypatch, tmp_path):
+    if not Config.SQLALCHEMY_DATABASE_URI.startswith("sqlite"):
+        pytest.skip("the stale replica is a SQLite file")
+    monkeypatch.setattr(Config, "SQLALCHEMY_BINDS", {"replica_1": f"sqlite:///{tmp_path / 'replica.db'}"})
+    app = make_app()
+    with app.app_context():
+        db.metadata.create_all(db.engines["replica_1"])
+    yield app.test_client()
+    # db is shared by all the apps: forget the bind for the next tests
+    db.metadatas.pop("replica_1", None)
+
+
+def test_write_pins_reads_to_the_primary(client):
+    resp = client.post("/api/users/members", json=MEMBER, headers={"Origin": "http://localhost:5173"})
+    assert resp.status_code == 201
+    assert resp.headers[PIN_HEADER] == "5"
+    # readable by the cross-origin frontend
+    assert PIN_HEADER in resp.headers["Access-Control-Expose-Headers"]
+
+    url = f"/api/users/members/{resp.json['id_mbre']}"
+    client.delete_cookie("lm_primary")  # cross-origin: no cookie comes back
+    assert client.get(url).status_code == 404  # the replica
+    assert client.get(url, headers={PIN_HEADER: "1"}).status_code == 200
+
+
+def test_preflight_allows_the_pin_header(client):
+    resp = client.options("/api/users/members/1", headers={
+        "Origin": "http://localhost:5173",
+        "Access-Control-Request-Method": "GET",
+        "Access-Control-Request-Headers": "authorization, x-read-primary",
+    })
+    assert "x-read-primary" in resp.headers["Access-Control-Allow-Headers"].lower()
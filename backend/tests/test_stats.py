@@ -0,0 +1,104 @@
+from datetime import date
+
+from sqlalchemy import func, select, update
+
+from app.extensions import db
+from app.models.emprunt import Emprunt
+from app.models.emprunt_stat import EmpruntStat
+from app.stats import refresh_summary
+
+
+def summary_total():
+    return db.session.execute(select(func.coalesce(func.sum(EmpruntStat.nb_emprunts), 0))).scalar()
+
+
+def add_loan(**values):
+    db.session.add(Emprunt(livre_id=1, membre_id=1, date_emprunt=date(2026, 1, 5), **values))
+    db.session.commit()
+
+
+def test_refresh_counts_new_loans_once(app, seed):
+    seed(5)
+    assert refresh_summary()["full"] is True
+    assert summary_total() == 5
+
+    add_loan()
+    add_loan()
+    report = refresh_summary()
+    assert report["full"] is False
+    assert summary_total() == 7
+
+    assert refresh_summary()["full"] is False
+    assert summary_total() == 7
+
+
+def test_loan_committed_late_with_a_lower_id_is_counted(app, seed):
+    seed(5)
+    add_loan(id_emprunt=5000)
+    refresh_summary()
+    assert summary_total() == 6
+
+    # id handed out before the refresh, committed after it
+    add_loan(id_emprunt=4000)
+    refresh_summary()
+    assert summary_total() == 7
+
+
+def test_bulk_statement_rebuilds_the_summary(app, seed):
+    seed(5)
+    refresh_summary()
+    db.session.execute(update(Emprunt).values(date_emprunt=date(2026, 2, 1)))
+    db.session.commit()
+
+    report = refresh_summary()
+    assert report["full"] is True
+    assert summary_total() == 5
+    assert db.session.execute(select(EmpruntStat.jour).distinct()).scalars().all() == [date(2026, 2, 1)]
+
+
+def summary():
+    rows = db.session.execute(
+        select(EmpruntStat.jour, EmpruntStat.livre_id, EmpruntStat.nb_emprunts).where(EmpruntStat.nb_emprunts > 0)
+    )
+    return {(jour, livre_id): n for jour, livre_id, n in rows}
+
+
+def recount():
+    rows = db.session.execute(
+        select(Emprunt.date_emprunt, Emprunt.livre_id, func.count()).group_by(Emprunt.date_emprunt, Emprunt.livre_id)
+    )
+    return {(jour, livre_id): n for jour, livre_id, n in rows}
+
+
+def test_edited_loan_moves_its_count(client, seed):
+    seed(5)
+    refresh_summary()
+    resp = client.put("/api/loans/1", json={"livre_id": 2, "date_emprunt": "2026-03-01"})
+    assert resp.status_code == 200
+
+    report = refresh_summary()
+    assert (report["full"], report["recounted"]) == (False, 2)
+    assert summary() == recount()
+    assert summary()[(date(2026, 3, 1), 2)] == 1
+
+
+def test_loan_edited_before_its_first_count_is_counted_once(client, seed):
+    seed(5)
+    refresh_summary()
+    add_loan()
+    client.put(f"/api/loans/{Emprunt.query.count()}", json={"date_emprunt": "2026-03-01"})
+
+    assert refresh_summary()["full"] is False
+    assert summary() == recount()
+    assert summary_total() == 6
+
+
+def test_deleted_loan_leaves_the_summary(app, seed):
+    seed(5)
+    refresh_summary()
+    db.session.delete(db.session.get(Emprunt, 1))
+    db.session.commit()
+
+    assert refresh_summary()["full"] is False
+    assert summary() == recount()
+    assert summary_total() == 4
@@ -0,0 +1,99 @@
+"""
+Concurrent checkouts of the last copies of a book: exactly `quantite` of
+them may succeed, and the counters must still match the open loans.
+
+SQLite lets one writer in at a time and fails a transaction that would
+have to wait on another one ("database is locked"); those requests are
+retried, as a client would. PostgreSQL (TEST_DATABASE_URL) waits on the
+row lock instead and needs no retry.
+"""
+import threading
+
+from app.extensions import db
+from app.models.emprunt import Emprunt
+from app.models.livre import Livre
+from app.stock import find_drift
+
+THREADS = 100
+COPIES = 3
+BOOK_ID = 1
+
+
+def post_with_retry(client, url, body, attempts=20):
+    for _ in range(attempts):
+        resp = client.post(url, json=body)
+        if resp.status_code != 500 or "locked" not in str(resp.json.get("details")):
+            return resp
+    raise AssertionError(f"{url}: database still locked after {attempts} attempts")
+
+
+def run_concurrently(app, request):
+    """request(client, i) in THREADS threads started together; returns their responses."""
+    barrier = threading.Barrier(THREADS)
+    results = [None] * THREADS
+
+    def worker(i):
+        client = app.test_client()
+        barrier.wait()
+        try:
+            results[i] = request(client, i)
+        except BaseException as e:  # reported by the assertion below
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    errors = [r for r in results if isinstance(r, BaseException)]
+    assert not errors, errors
+    return results
+
+
+def assert_stock(expected_out):
+    db.session.remove()
+    livre = db.session.get(Livre, BOOK_ID)
+    open_loans = db.session.query(Emprunt).filter(
+        Emprunt.livre_id == BOOK_ID, Emprunt.date_retour.is_(None)
+    ).count()
+    assert livre.quantite == COPIES - expected_out
+    assert livre.quantite >= 0
+    assert livre.nb_en_pret == expected_out == open_loans
+    assert livre.quantite_totale == COPIES
+    assert find_drift() == []
+
+
+def test_concurrent_checkouts_never_oversell(app, seed):
+    seed(THREADS, copies=COPIES)
+    db.session.remove()
+
+    responses = run_concurrently(app, lambda client, i: post_with_retry(client, "/api/loans/", {
+        "livre_id": BOOK_ID, "membre_id": i + 1, "date_emprunt": "2026-01-05",
+    }))
+
+    statuses = sorted(r.status_code for r in responses)
+    assert statuses.count(201) == COPIES
+    assert statuses.count(400) == THREADS - COPIES
+    assert all(
+        r.json["error"] == "Aucune quantité disponible pour ce livre" for r in responses if r.status_code == 400
+    )
+    assert_stock(COPIES)
+
+
+def test_concurrent_bulk_checkouts_never_oversell(app, seed):
+    seed(THREADS, copies=COPIES)
+    db.session.remove()
+
+    # every request wants 2 copies of the book, all or nothing
+    responses = run_concurrently(app, lambda client, i: post_with_retry(client, "/api/loans/bulk", {
+        "atomic": True,
+        "loans": [
+            {"livre_id": BOOK_ID, "membre_id": i + 1, "date_emprunt": "2026-01-05"},
+            {"livre_id": BOOK_ID, "membre_id": (i + 1) % THREADS + 1, "date_emprunt": "2026-01-05"},
+        ],
+    }))
+
+    created = [r for r in responses if r.status_code == 201]
+    assert len(created) == COPIES // 2
+    assert all(r.status_code in (201, 400, 409) for r in responses)
+    assert_stock(2 * len(created))
@@ -0,0 +1,36 @@
+from sqlalchemy import event
+
+from app.extensions import db
+from app.versions import current_versions
+
+
+def test_versions_are_bumped_after_the_writers_commit(client, seed):
+    seed(2)
+    db.session.remove()
+    before = current_versions(["emprunt", "livre"])
+    log = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        log.append(statement.lstrip())
+
+    def on_commit(conn):
+        log.append("COMMIT")
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", on_execute)
+    event.listen(engine, "commit", on_commit)
+    try:
+        resp = client.post("/api/loans/", json={"livre_id": 1, "membre_id": 2, "date_emprunt": "2026-01-05"})
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+        event.remove(engine, "commit", on_commit)
+    assert resp.status_code == 201
+
+    insert = next(i for i, s in enumerate(log) if s.startswith("INSERT INTO emprunt"))
+    commit = log.index("COMMIT", insert)
+    # the writer's transaction does not lock table_version rows
+    assert not any("table_version" in s for s in log[insert:commit])
+    assert any("table_version" in s for s in log[commit:])
+
+    after = current_versions(["emprunt", "livre"])
+    assert all(after[name] == before[name] + 1 for name in after)
@@ -1,9 +1,63 @@
 import axios from "axios";
+import { clearUser, loadTokens, saveTokens } from "../auth/auth";
 
 export const api = axios.create({
   baseURL: import.meta.env.VITE_API_URL,
 });
 
+// Read-your-writes with read replicas (see backend/app/replicas.py): after a
+// write the API answers X-Read-Primary: <seconds>, echoed on our requests
+// for that long so they read from the primary (no cookie cross-origin)
+const PIN_HEADER = "X-Read-Primary";
+let primaryUntil = 0;
+
+function pinReads(res) {
+  const seconds = Number(res.headers[PIN_HEADER.toLowerCase()]);
+  if (seconds > 0) {
+    primaryUntil = Math.max(primaryUntil, Date.now() + seconds * 1000);
+  }
+  return res;
+}
+
+// Bearer token on every call (see backend/app/auth.py)
+api.interceptors.request.use((config) => {
+  const tokens = loadTokens();
+  if (tokens?.access_token && !config.headers.Authorization) {
+    config.headers.Authorization = `Bearer ${tokens.access_token}`;
+  }
+  if (Date.now() < primaryUntil) {
+    config.headers[PIN_HEADER] = "1";
+  }
+  return config;
+});
+
+// Expired access token: get a new pair once, then replay the request
+let refreshing = null;
+api.interceptors.response.use(
+  pinReads,
+  async (error) => {
+    const original = error.config;
+    const tokens = loadTokens();
+    if (error.response?.status !== 401 || !tokens?.refresh_token || original._retried
+        || original.url === "/api/users/refresh") {
+      throw error;
+    }
+    original._retried = true;
+    try {
+      refreshing = refreshing || api.post("/api/users/refresh", { refresh_token: tokens.refresh_token });
+      const res = await refreshing;
+      saveTokens(res.data);
+    } catch (e) {
+      clearUser();
+      throw error;
+    } finally {
+      refreshing = null;
+    }
+    original.headers.Authorization = `Bearer ${loadTokens().access_token}`;
+    return api(original);
+  }
+);
+
 export async function get(url, config) {
   const res = await api.get(url, config);
   return res.data;
@@ -20,3 +74,15 @@ export async function del(url, config) {
   const res = await api.delete(url, config);
   return res.data;
 }
+
+// Revoke both tokens server-side, then forget them
+export async function logout() {
+  const tokens = loadTokens();
+  if (tokens?.access_token) {
+    await api
+      .post("/api/users/logout", { refresh_token: tokens.refresh_token },
+        { headers: { Authorization: `Bearer ${tokens.access_token}` }, _retried: true })
+      .catch(() => {});
+  }
+  clearUser();
+}
@@ -1,4 +1,5 @@
 const KEY = "lm_user";
+const TOKENS_KEY = "lm_tokens";
 
 export function saveUser(user) {
   localStorage.setItem(KEY, JSON.stringify(user));
@@ -9,7 +10,20 @@ export function loadUser() {
 }
 export function clearUser() {
   localStorage.removeItem(KEY);
+  localStorage.removeItem(TOKENS_KEY);
 }
 export function isAdmin(user) {
   return user?.profil?.nom_p === "ADMIN";
 }
+
+// { access_token, refresh_token } from /api/users/login and /api/users/refresh
+export function saveTokens(tokens) {
+  localStorage.setItem(
+    TOKENS_KEY,
+    JSON.stringify({ access_token: tokens.access_token, refresh_token: tokens.refresh_token })
+  );
+}
+export function loadTokens() {
+  const raw = localStorage.getItem(TOKENS_KEY);
+  return raw ? JSON.parse(raw) : null;
+}
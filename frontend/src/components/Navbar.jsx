@@ -1,5 +1,6 @@
 import { Link, useLocation, useNavigate } from "react-router-dom";
-import { clearUser, loadUser } from "../auth/auth";
+import { loadUser } from "../auth/auth";
+import { logout } from "../api/client";
 import { Button } from "./ui/button";
 import { Badge } from "./ui/badge";
 
@@ -40,7 +41,7 @@ export default function Navbar() {
               <Badge variant="secondary">
                 {user.login} • {user?.profil?.nom_p}
               </Badge>
-              <Button variant="outline" size="sm" onClick={() => { clearUser(); nav("/login"); }}>
+              <Button variant="outline" size="sm" onClick={async () => { await logout(); nav("/login"); }}>
                 Logout
               </Button>
             </>
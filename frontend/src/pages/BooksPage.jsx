@@ -200,7 +200,7 @@ export default function BooksPage() {
                   <TableHead>ID</TableHead>
                   <TableHead>Title</TableHead>
                   <TableHead>ISBN</TableHead>
-                  <TableHead>Qty</TableHead>
+                  <TableHead>Available / Total</TableHead>
                   <TableHead>Category</TableHead>
                   <TableHead>Authors</TableHead>
                 </TableRow>
@@ -211,7 +211,7 @@ export default function BooksPage() {
                     <TableCell className="font-medium">{b.id_livre}</TableCell>
                     <TableCell>{b.titre}</TableCell>
                     <TableCell>{b.isbn}</TableCell>
-                    <TableCell>{b.quantite}</TableCell>
+                    <TableCell>{b.quantite} / {b.quantite_totale}</TableCell>
                     <TableCell>{b.categorie?.nom_cat || "-"}</TableCell>
                     <TableCell>
                       {(b.auteurs || []).map(a => `${a.nom_auteur} ${a.prenom_auteur}`).join(", ") || "-"}
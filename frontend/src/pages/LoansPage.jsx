@@ -22,8 +22,8 @@ export default function LoansPage() {
     setError("");
     try {
       const [b, m, l] = await Promise.all([
-        get("/api/books/books"),
-        get("/api/users/members"),
+        get("/api/books/books", { params: { fields: "id_livre,titre,quantite" } }),
+        get("/api/users/members", { params: { fields: "id_mbre,nom_mbre,prenom_mbre" } }),
         get("/api/loans/"),
       ]);
       setBooks(b);
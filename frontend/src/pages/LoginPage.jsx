@@ -1,7 +1,7 @@
 import { useState } from "react";
 import { useNavigate } from "react-router-dom";
 import { post } from "../api/client";
-import { saveUser } from "../auth/auth";
+import { saveTokens, saveUser } from "../auth/auth";
 
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from "../components/ui/card";
 import { Button } from "../components/ui/button";
@@ -20,6 +20,7 @@ export default function LoginPage() {
     try {
       const res = await post("/api/users/login", { login, password });
       saveUser(res.user);
+      saveTokens(res);
       nav("/");
     } catch (err) {
       setError(err?.response?.data?.error || err.message);